@@ -0,0 +1,92 @@
+"""Measure upload throughput of a texture repainted every frame. Compares re-creating the whole
+image with glTexImage2D, as a plain Texture has to, against DynamicTexture streaming only the
+dirty region through it's pixel buffers. Needs a GL context so opens a hidden window.
+
+    python benchmarks/bench_dynamic_texture.py --size 1024 --frames 200
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+import glfw
+import numpy as np
+from OpenGL.GL import *
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from gamejam.graphics import Graphics
+from gamejam.texture import DynamicTexture
+
+
+def create_context():
+    if not glfw.init():
+        raise RuntimeError("Could not initialise glfw")
+    glfw.window_hint(glfw.VISIBLE, False)
+    glfw.window_hint(glfw.CONTEXT_VERSION_MAJOR, 3)
+    glfw.window_hint(glfw.CONTEXT_VERSION_MINOR, 3)
+    glfw.window_hint(glfw.OPENGL_FORWARD_COMPAT, GL_TRUE)
+    glfw.window_hint(glfw.OPENGL_PROFILE, glfw.OPENGL_CORE_PROFILE)
+    window = glfw.create_window(64, 64, "bench", None, None)
+    if not window:
+        glfw.terminate()
+        raise RuntimeError("Could not create a GL window")
+    glfw.make_context_current(window)
+
+
+def time_full(pixels: np.ndarray, region: tuple, frames: int) -> tuple:
+    texture_id = glGenTextures(1)
+    Graphics.bind_texture(texture_id)
+    x, y, width, height = region
+    start = time.perf_counter()
+    for frame in range(frames):
+        pixels[y:y + height, x:x + width, 0] = frame
+        glTexImage2D(GL_TEXTURE_2D, 0, GL_RGBA, pixels.shape[1], pixels.shape[0], 0, GL_RGBA, GL_UNSIGNED_BYTE, pixels)
+    glFinish()
+    taken = time.perf_counter() - start
+    Graphics.delete_texture(texture_id)
+    return taken, pixels.nbytes * frames
+
+
+def time_streamed(pixels: np.ndarray, region: tuple, frames: int) -> tuple:
+    texture = DynamicTexture(pixels.shape[1], pixels.shape[0])
+    texture.upload()
+    x, y, width, height = region
+    start = time.perf_counter()
+    for frame in range(frames):
+        texture.pixels[y:y + height, x:x + width, 0] = frame
+        texture.mark_dirty(x, y, width, height)
+        texture.upload()
+    glFinish()
+    taken = time.perf_counter() - start
+    uploaded_bytes = texture.uploaded_bytes - pixels.nbytes
+    texture.unload()
+    return taken, uploaded_bytes
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size", type=int, default=1024)
+    parser.add_argument("--frames", type=int, default=200)
+    args = parser.parse_args()
+
+    create_context()
+    size = args.size
+    pixels = np.zeros((size, size, 4), dtype=np.uint8)
+    regions = {
+        "whole": (0, 0, size, size),
+        "quarter": (0, 0, size, size // 4),
+        "64x64": (size // 2, size // 2, 64, 64),
+    }
+
+    print(f"{size}x{size} RGBA texture repainted for {args.frames} frames")
+    print(f"{'dirty'.ljust(8)} {'path'.ljust(9)} {'ms/frame'.rjust(9)} {'MB/s'.rjust(9)} {'MB sent'.rjust(9)}")
+    for region_name, region in regions.items():
+        for path_name, func in [("full", time_full), ("streamed", time_streamed)]:
+            taken, sent = func(pixels, region, args.frames)
+            megabytes = sent / (1024 * 1024)
+            print(f"{region_name.ljust(8)} {path_name.ljust(9)} {taken * 1000.0 / args.frames:9.3f} "
+                  f"{megabytes / taken:9.1f} {megabytes:9.1f}")
+    glfw.terminate()
+
+
+if __name__ == "__main__":
+    main()
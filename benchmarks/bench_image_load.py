@@ -0,0 +1,88 @@
+"""Compare decoding a large sprite sheet with the legacy per-pixel getdata() path against
+the buffer protocol ingestion in gamejam.image. Each path runs in it's own process so the
+peak memory figures do not pollute each other.
+
+    python benchmarks/bench_image_load.py --size 2048 --repeat 3
+"""
+import argparse
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from PIL import Image
+import numpy as np
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from gamejam.image import load_rgba
+
+
+def legacy_load(path: Path) -> np.ndarray:
+    image = Image.open(path)
+    return np.array(list(image.getdata()), np.uint8)
+
+
+PATHS = {
+    "legacy": legacy_load,
+    "buffer": load_rgba,
+}
+
+
+def peak_rss_mb() -> float:
+    if resource is None:
+        return 0.0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS reports bytes
+    return peak / (1024.0 * 1024.0) if sys.platform == "darwin" else peak / 1024.0
+
+
+def run_child(path_name: str, image_path: Path, repeat: int):
+    load = PATHS[path_name]
+    tracemalloc.start()
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        load(image_path)
+        best = min(best, time.perf_counter() - start)
+    _, traced_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{best * 1000.0:.1f} {traced_peak / (1024.0 * 1024.0):.1f} {peak_rss_mb():.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size", type=int, default=2048)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--mode", default="RGBA", help="PIL mode of the generated test image")
+    parser.add_argument("--child", default=None, help=argparse.SUPPRESS)
+    parser.add_argument("--image", default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child is not None:
+        run_child(args.child, Path(args.image), args.repeat)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        image_path = Path(tmp) / "sheet.png"
+        pixels = np.random.randint(0, 255, (args.size, args.size, 4), dtype=np.uint8)
+        Image.fromarray(pixels, "RGBA").convert(args.mode).save(image_path)
+
+        print(f"Decoding {args.size}x{args.size} {args.mode} png, best of {args.repeat}")
+        print(f"{'path'.ljust(8)} {'time ms'.rjust(10)} {'traced MB'.rjust(10)} {'peak RSS MB'.rjust(12)}")
+        for path_name in PATHS:
+            output = subprocess.run(
+                [sys.executable, __file__, "--child", path_name, "--image", str(image_path), "--repeat", str(args.repeat)],
+                capture_output=True, text=True, check=True
+            )
+            load_ms, traced_mb, rss_mb = output.stdout.split()
+            print(f"{path_name.ljust(8)} {load_ms.rjust(10)} {traced_mb.rjust(10)} {rss_mb.rjust(12)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""Measure how the decode stage of an atlas build scales with the number of workers.
+Generates a folder of GUI sized PNGs then decodes all of them with load_rgba_many on
+thread and process pools of increasing size.
+
+    python benchmarks/bench_parallel_decode.py --count 300 --repeat 3
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+from PIL import Image
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from gamejam.image import load_rgba_many
+
+
+def make_textures(path: Path, count: int) -> list:
+    rng = np.random.default_rng(0)
+    paths = []
+    for i in range(count):
+        width, height = rng.integers(32, 512, 2)
+        pixels = rng.integers(0, 255, (height, width, 4), dtype=np.uint8)
+        # Smooth gradients compress like real art rather than noise
+        pixels[..., :3] //= 16
+        pixels[..., :3] *= 16
+        texture_path = path / f"tex_{i:03}.png"
+        Image.fromarray(pixels, "RGBA").save(texture_path)
+        paths.append(texture_path)
+    return paths
+
+
+def time_decode(paths: list, workers: int, use_processes: bool, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        decoded = list(load_rgba_many(paths, workers, use_processes))
+        best = min(best, time.perf_counter() - start)
+        assert len(decoded) == len(paths)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--count", type=int, default=300)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    cores = os.cpu_count() or 1
+    worker_counts = [1]
+    while worker_counts[-1] * 2 <= cores:
+        worker_counts.append(worker_counts[-1] * 2)
+    if worker_counts[-1] != cores:
+        worker_counts.append(cores)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = make_textures(Path(tmp), args.count)
+        print(f"Decoding {args.count} textures on {cores} cores, best of {args.repeat}")
+        print(f"{'pool'.ljust(8)} {'workers'.rjust(8)} {'time ms'.rjust(10)} {'speedup'.rjust(8)}")
+        for use_processes in [False, True]:
+            pool_name = "process" if use_processes else "thread"
+            baseline = None
+            for workers in worker_counts:
+                taken = time_decode(paths, workers, use_processes, args.repeat)
+                baseline = baseline or taken
+                print(f"{pool_name.ljust(8)} {str(workers).rjust(8)} {taken * 1000.0:10.1f} {baseline / taken:7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+from dataclasses import dataclass, asdict
+import hashlib
+import json
+import logging
+import os
+from pathlib import Path
+import uuid
+import numpy as np
+
+from gamejam.atlas_packer import PackRect
+from gamejam.coord import Coord2d
+from gamejam.image import load_rgba_many
+from gamejam.settings import GameSettings
+
+
+@dataclass(init=True)
+class AtlasCacheEntry:
+    """Where a source file was packed and the fingerprint used to tell if it has changed."""
+    mtime: int
+    size: int
+    hash: str
+    rect: list
+    source_size: list
+    trim_pos: list
+
+
+class AtlasCache:
+    """Stores a packed atlas page on disk with a manifest of the items in it.
+    On the next launch the page is memory mapped and only new or changed source files are
+    decoded and packed, identical images are stored once and shared between names."""
+    VERSION = 1
+    MANIFEST_NAME = "manifest.json"
+
+    def __init__(self, cache_path: Path):
+        self.path = Path(cache_path)
+        self.num_reused = 0
+        self.entries: dict[str, AtlasCacheEntry] = {}
+        self.page_name = None
+        self.dirty = False
+
+    @staticmethod
+    def get_cache_path(texture_path: Path) -> Path:
+        """Each texture directory gets it's own cache in the working directory, next to the gui files."""
+        key = hashlib.sha1(str(Path(texture_path).resolve()).encode("utf-8")).hexdigest()[:12]
+        return Path(os.getcwd()) / GameSettings.CACHE_PATH / "atlas" / key
+
+    @staticmethod
+    def hash_file(path: Path) -> str:
+        with open(path, "rb") as source:
+            return hashlib.sha1(source.read()).hexdigest()
+
+    @staticmethod
+    def get_settings(atlas) -> dict:
+        return {
+            "width": atlas.max_size.x,
+            "height": atlas.max_size.y,
+            "initial_width": atlas.initial_size.x,
+            "initial_height": atlas.initial_size.y,
+            "strategy": atlas.strategy.name,
+            "padding": atlas.packer.padding,
+            "trim": atlas.trim,
+        }
+
+    def load(self, atlas) -> bool:
+        """Read the manifest and map the cached page into the atlas if it was built with the same settings."""
+        manifest_path = self.path / AtlasCache.MANIFEST_NAME
+        if not manifest_path.exists():
+            return False
+
+        try:
+            with open(manifest_path, "r") as manifest_file:
+                manifest = json.load(manifest_file)
+            if manifest["version"] != AtlasCache.VERSION or manifest["settings"] != AtlasCache.get_settings(atlas):
+                return False
+
+            page = np.load(self.path / manifest["page"], mmap_mode="c")
+            if page.ndim != 3 or page.shape[0] > atlas.max_size.y or page.shape[1] > atlas.max_size.x:
+                return False
+        except (OSError, ValueError, KeyError) as e:
+            logging.warning(f"Ignoring unreadable atlas cache at {self.path}: {e}")
+            return False
+
+        atlas.restore_page(page)
+        self.page_name = manifest["page"]
+        self.entries = {name: AtlasCacheEntry(**entry) for name, entry in manifest["items"].items()}
+        return True
+
+    def update(self, atlas, textures: dict):
+        """Add a dict of item name to source path into an atlas that is building.
+        Unchanged files reuse their cached rect, everything else is decoded and packed on commit."""
+        entries = {}
+        to_decode = []
+        new_by_hash = {}
+        cached_by_hash = {e.hash: name for name, e in self.entries.items()}
+        restored = {}
+        self.num_reused = 0
+
+        for name, path in textures.items():
+            stat = path.stat()
+            entry = self.entries.get(name)
+            if entry is None or entry.mtime != stat.st_mtime_ns or entry.size != stat.st_size:
+                file_hash = AtlasCache.hash_file(path)
+                self.dirty = True
+            else:
+                file_hash = entry.hash
+
+            # Pixels already in the cached page
+            cached_name = cached_by_hash.get(file_hash)
+            if cached_name is not None:
+                cached = self.entries[cached_name]
+                entries[name] = AtlasCacheEntry(stat.st_mtime_ns, stat.st_size, file_hash, cached.rect, cached.source_size, cached.trim_pos)
+                if cached_name in restored:
+                    atlas.add_alias(name, restored[cached_name])
+                elif atlas.add_packed(name, PackRect(*cached.rect), Coord2d(*cached.source_size), Coord2d(*cached.trim_pos)) is not None:
+                    restored[cached_name] = name
+                self.num_reused += 1
+                continue
+
+            # A duplicate of a file added earlier this update
+            if file_hash in new_by_hash:
+                atlas.add_alias(name, new_by_hash[file_hash])
+            else:
+                new_by_hash[file_hash] = name
+                to_decode.append((name, path))
+            entries[name] = AtlasCacheEntry(stat.st_mtime_ns, stat.st_size, file_hash, None, None, None)
+
+        decoded = load_rgba_many([path for _, path in to_decode], GameSettings.DECODE_WORKERS, GameSettings.DECODE_PROCESSES)
+        for (name, _), tex_data in zip(to_decode, decoded):
+            atlas.add_image(tex_data, name)
+
+        if set(entries) != set(self.entries):
+            self.dirty = True
+        self.entries = entries
+
+    def save(self, atlas):
+        """Write the page and manifest if anything changed since load. Call after the atlas commits."""
+        if not self.dirty:
+            return
+
+        for name, entry in list(self.entries.items()):
+            item = atlas.texture_items.get(name)
+            if item is None:
+                del self.entries[name]
+                continue
+            entry.rect = [int(item.pos.x), int(item.pos.y), int(item.size.x), int(item.size.y)]
+            entry.source_size = [int(item.source_size.x), int(item.source_size.y)]
+            entry.trim_pos = [int(item.trim_pos.x), int(item.trim_pos.y)]
+
+        # The previous page may still be mapped, so write a new one rather than replacing it
+        self.path.mkdir(parents=True, exist_ok=True)
+        old_page_name = self.page_name
+        self.page_name = f"page_{uuid.uuid4().hex[:12]}.npy"
+        np.save(self.path / self.page_name, atlas.read_page())
+
+        manifest = {
+            "version": AtlasCache.VERSION,
+            "settings": AtlasCache.get_settings(atlas),
+            "page": self.page_name,
+            "items": {name: asdict(entry) for name, entry in self.entries.items()},
+        }
+        manifest_path = self.path / AtlasCache.MANIFEST_NAME
+        with open(manifest_path.with_suffix(".tmp"), "w") as manifest_file:
+            json.dump(manifest, manifest_file, indent=1)
+        os.replace(manifest_path.with_suffix(".tmp"), manifest_path)
+
+        if old_page_name is not None:
+            try:
+                os.remove(self.path / old_page_name)
+            except OSError:
+                pass
+        self.dirty = False
@@ -0,0 +1,440 @@
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from enum import Enum
+
+
+class PackStrategy(Enum):
+    MAXRECTS = 0
+    SKYLINE = 1
+    SHELF = 2
+
+
+@dataclass(init=True, eq=True)
+class PackRect:
+    x: int
+    y: int
+    width: int
+    height: int
+
+    @property
+    def right(self) -> int:
+        return self.x + self.width
+
+    @property
+    def bottom(self) -> int:
+        return self.y + self.height
+
+    @property
+    def area(self) -> int:
+        return self.width * self.height
+
+    def contains(self, other) -> bool:
+        return (other.x >= self.x and other.y >= self.y and
+                other.right <= self.right and other.bottom <= self.bottom)
+
+    def intersects(self, other) -> bool:
+        return (other.x < self.right and other.right > self.x and
+                other.y < self.bottom and other.bottom > self.y)
+
+
+@dataclass(init=True)
+class PackStats:
+    """How well a page is used. Occupancy is the fraction of the page covered by items,
+    fragmentation is how much of the remaining space is outside the largest free rectangle."""
+    width: int
+    height: int
+    num_rects: int
+    used_area: int
+    allocated_area: int
+    largest_free_area: int
+    used_width: int
+    used_height: int
+
+    @property
+    def occupancy(self) -> float:
+        return self.used_area / (self.width * self.height)
+
+    @property
+    def fragmentation(self) -> float:
+        free_area = (self.width * self.height) - self.allocated_area
+        if free_area <= 0:
+            return 0.0
+        return 1.0 - (min(self.largest_free_area, free_area) / free_area)
+
+    def __str__(self) -> str:
+        return (f"{self.num_rects} items in {self.width}x{self.height}, "
+                f"{self.occupancy * 100.0:.1f}% occupied, {self.fragmentation * 100.0:.1f}% fragmented, "
+                f"extents {self.used_width}x{self.used_height}")
+
+
+class AtlasPacker(ABC):
+    """Allocates rectangles inside a page that can grow without moving them. Padding is left to the right and below
+    each rectangle by packing into a page that is padding larger than the real one, so items
+    can sit flush against the far edges. Freed rectangles go on a free list shared by all
+    strategies which is searched before the strategy places anything in untouched space."""
+
+    def __init__(self, width: int, height: int, padding: int=0):
+        self.width = width
+        self.height = height
+        self.padding = padding
+        self.rects = []
+        self.free_list = []
+        self._bin_width = width + padding
+        self._bin_height = height + padding
+
+    @staticmethod
+    def create(strategy: PackStrategy, width: int, height: int, padding: int=0):
+        if strategy is PackStrategy.SKYLINE:
+            return SkylinePacker(width, height, padding)
+        elif strategy is PackStrategy.SHELF:
+            return ShelfPacker(width, height, padding)
+        return MaxRectsPacker(width, height, padding)
+
+    @staticmethod
+    def sort_for_batch(sizes: list) -> list:
+        """Return the indices of a list of (width, height) in the order that packs best, largest first."""
+        return sorted(range(len(sizes)), key=lambda i: (max(sizes[i]), sizes[i][0] * sizes[i][1]), reverse=True)
+
+    def insert(self, width: int, height: int) -> PackRect:
+        """Find space for a rectangle, returns None when the page is full."""
+        if width <= 0 or height <= 0:
+            return None
+        padded = self._insert_free(width + self.padding, height + self.padding)
+        if padded is None:
+            padded = self._insert(width + self.padding, height + self.padding)
+        if padded is None:
+            return None
+        rect = PackRect(padded.x, padded.y, width, height)
+        self.rects.append(rect)
+        return rect
+
+    def free(self, rect: PackRect):
+        """Give a rectangle's space back, joining it with any free neighbour it shares a whole edge with."""
+        self.rects.remove(rect)
+        free = PackRect(rect.x, rect.y, rect.width + self.padding, rect.height + self.padding)
+        merged = True
+        while merged:
+            merged = False
+            for other in self.free_list:
+                joined = None
+                if other.x == free.x and other.width == free.width and (other.bottom == free.y or free.bottom == other.y):
+                    joined = PackRect(free.x, min(free.y, other.y), free.width, free.height + other.height)
+                elif other.y == free.y and other.height == free.height and (other.right == free.x or free.right == other.x):
+                    joined = PackRect(min(free.x, other.x), free.y, free.width + other.width, free.height)
+                if joined is not None:
+                    self.free_list.remove(other)
+                    free = joined
+                    merged = True
+                    break
+        self.free_list.append(free)
+
+    def relocate(self, rect: PackRect) -> PackRect:
+        """Move a rectangle into the best fitting free space that comes before it in the page,
+        top to bottom then left to right. Returns the new rectangle or None if there is no such space."""
+        padded_width, padded_height = rect.width + self.padding, rect.height + self.padding
+        holes = [f for f in self.free_list if (f.y, f.x) < (rect.y, rect.x)]
+        hole = AtlasPacker._best_fit(holes, padded_width, padded_height)
+        if hole is None:
+            return None
+        self._take_free(hole, padded_width, padded_height)
+        moved = PackRect(hole.x, hole.y, rect.width, rect.height)
+        self.free(rect)
+        self.rects.append(moved)
+        return moved
+
+    def grow(self, width: int, height: int):
+        """Enlarge the page to a new size, everything already packed stays where it is."""
+        old_bin_width, old_bin_height = self._bin_width, self._bin_height
+        self.width = max(width, self.width)
+        self.height = max(height, self.height)
+        self._bin_width = self.width + self.padding
+        self._bin_height = self.height + self.padding
+        self._grow(old_bin_width, old_bin_height)
+
+    def reserve(self, rect: PackRect) -> PackRect:
+        """Mark a rectangle that was placed earlier as used, eg. one restored from a cache."""
+        self._reserve(PackRect(rect.x, rect.y, rect.width + self.padding, rect.height + self.padding))
+        self.rects.append(rect)
+        return rect
+
+    def stats(self) -> PackStats:
+        pad = self.padding
+        used_area = sum(r.area for r in self.rects)
+        allocated_area = sum(min(r.width + pad, self.width - r.x) * min(r.height + pad, self.height - r.y) for r in self.rects)
+        return PackStats(
+            width=self.width,
+            height=self.height,
+            num_rects=len(self.rects),
+            used_area=used_area,
+            allocated_area=allocated_area,
+            largest_free_area=max([self._largest_free_area()] + [self._clipped_area(f) for f in self.free_list]),
+            used_width=max([r.right for r in self.rects], default=0),
+            used_height=max([r.bottom for r in self.rects], default=0),
+        )
+
+    def _clipped_area(self, rect: PackRect) -> int:
+        return max(min(rect.right, self.width) - rect.x, 0) * max(min(rect.bottom, self.height) - rect.y, 0)
+
+    @staticmethod
+    def _best_fit(free_list: list, width: int, height: int) -> PackRect:
+        """The smallest free rectangle a size fits in, the earliest in the page on a tie."""
+        fits = [f for f in free_list if f.width >= width and f.height >= height]
+        if len(fits) == 0:
+            return None
+        return min(fits, key=lambda f: (f.area, f.y, f.x))
+
+    def _take_free(self, hole: PackRect, width: int, height: int):
+        """Use the top left of a free rectangle, splitting the remainder along the shorter leftover side."""
+        self.free_list.remove(hole)
+        leftover_x, leftover_y = hole.width - width, hole.height - height
+        if leftover_x < leftover_y:
+            right = PackRect(hole.x + width, hole.y, leftover_x, height)
+            below = PackRect(hole.x, hole.y + height, hole.width, leftover_y)
+        else:
+            right = PackRect(hole.x + width, hole.y, leftover_x, hole.height)
+            below = PackRect(hole.x, hole.y + height, width, leftover_y)
+        self.free_list += [r for r in [right, below] if r.area > 0]
+
+    def _insert_free(self, width: int, height: int) -> PackRect:
+        hole = AtlasPacker._best_fit(self.free_list, width, height)
+        if hole is None:
+            return None
+        self._take_free(hole, width, height)
+        return PackRect(hole.x, hole.y, width, height)
+
+    @abstractmethod
+    def _insert(self, width: int, height: int) -> PackRect:
+        pass
+
+    @abstractmethod
+    def _reserve(self, rect: PackRect):
+        pass
+
+    @abstractmethod
+    def _grow(self, old_bin_width: int, old_bin_height: int):
+        pass
+
+    @abstractmethod
+    def _largest_free_area(self) -> int:
+        pass
+
+
+class MaxRectsPacker(AtlasPacker):
+    """Keeps a list of maximal free rectangles and places each item using the best short side fit."""
+
+    def __init__(self, width: int, height: int, padding: int=0):
+        super().__init__(width, height, padding)
+        self.free_rects = [PackRect(0, 0, self._bin_width, self._bin_height)]
+
+    def _insert(self, width: int, height: int) -> PackRect:
+        best = None
+        best_short = best_long = None
+        for free in self.free_rects:
+            if free.width >= width and free.height >= height:
+                leftover_x = free.width - width
+                leftover_y = free.height - height
+                short, long = min(leftover_x, leftover_y), max(leftover_x, leftover_y)
+                if best is None or short < best_short or (short == best_short and long < best_long):
+                    best = PackRect(free.x, free.y, width, height)
+                    best_short, best_long = short, long
+
+        if best is not None:
+            self._place(best)
+        return best
+
+    def _reserve(self, rect: PackRect):
+        self._place(rect)
+
+    def _place(self, rect: PackRect):
+        """Split every free rectangle the new one overlaps into the up to four maximal pieces around it."""
+        new_free = []
+        for free in self.free_rects:
+            if not free.intersects(rect):
+                new_free.append(free)
+                continue
+            if rect.x > free.x:
+                new_free.append(PackRect(free.x, free.y, rect.x - free.x, free.height))
+            if rect.right < free.right:
+                new_free.append(PackRect(rect.right, free.y, free.right - rect.right, free.height))
+            if rect.y > free.y:
+                new_free.append(PackRect(free.x, free.y, free.width, rect.y - free.y))
+            if rect.bottom < free.bottom:
+                new_free.append(PackRect(free.x, rect.bottom, free.width, free.bottom - rect.bottom))
+        self.free_rects = MaxRectsPacker._prune(new_free)
+
+    def _grow(self, old_bin_width: int, old_bin_height: int):
+        # Free rects against the old far edges carry on into the new space, which is also free as a whole
+        for i, free in enumerate(self.free_rects):
+            width = self._bin_width - free.x if free.right == old_bin_width else free.width
+            height = self._bin_height - free.y if free.bottom == old_bin_height else free.height
+            self.free_rects[i] = PackRect(free.x, free.y, width, height)
+        new_free = [PackRect(old_bin_width, 0, self._bin_width - old_bin_width, self._bin_height),
+                    PackRect(0, old_bin_height, self._bin_width, self._bin_height - old_bin_height)]
+        self.free_rects = MaxRectsPacker._prune(self.free_rects + [r for r in new_free if r.area > 0])
+
+    @staticmethod
+    def _prune(free_rects: list) -> list:
+        pruned = []
+        for i, rect in enumerate(free_rects):
+            contained = False
+            for j, other in enumerate(free_rects):
+                if i != j and other.contains(rect) and (rect != other or j < i):
+                    contained = True
+                    break
+            if not contained:
+                pruned.append(rect)
+        return pruned
+
+    def _largest_free_area(self) -> int:
+        largest = 0
+        for free in self.free_rects:
+            width = min(free.right, self.width) - free.x
+            height = min(free.bottom, self.height) - free.y
+            if width > 0 and height > 0:
+                largest = max(largest, width * height)
+        return largest
+
+
+class SkylinePacker(AtlasPacker):
+    """Tracks the top edge of the packed area as a list of [x, y, width] segments and places
+    each item as low and then as far left as possible. Fast and good for similar heights like glyphs."""
+
+    def __init__(self, width: int, height: int, padding: int=0):
+        super().__init__(width, height, padding)
+        self.skyline = [[0, 0, self._bin_width]]
+
+    def _fit(self, index: int, width: int, height: int) -> int:
+        """Return the y an item would sit at if placed from the start of a segment, -1 if it does not fit."""
+        x = self.skyline[index][0]
+        if x + width > self._bin_width:
+            return -1
+        y = 0
+        remaining = width
+        while remaining > 0:
+            seg_x, seg_y, seg_width = self.skyline[index]
+            y = max(y, seg_y)
+            if y + height > self._bin_height:
+                return -1
+            remaining -= seg_width
+            index += 1
+        return y
+
+    def _insert(self, width: int, height: int) -> PackRect:
+        best_index = -1
+        best_y = best_x = None
+        for i in range(len(self.skyline)):
+            y = self._fit(i, width, height)
+            if y >= 0 and (best_y is None or y < best_y or (y == best_y and self.skyline[i][0] < best_x)):
+                best_index, best_y, best_x = i, y, self.skyline[i][0]
+
+        if best_index < 0:
+            return None
+
+        rect = PackRect(best_x, best_y, width, height)
+        self._add_segment(best_index, rect)
+        return rect
+
+    def _add_segment(self, index: int, rect: PackRect):
+        self.skyline.insert(index, [rect.x, rect.bottom, rect.width])
+
+        # Shrink or remove the segments now underneath the new one
+        i = index + 1
+        while i < len(self.skyline):
+            seg = self.skyline[i]
+            overlap = rect.right - seg[0]
+            if overlap <= 0:
+                break
+            if overlap >= seg[2]:
+                del self.skyline[i]
+            else:
+                seg[0] += overlap
+                seg[2] -= overlap
+                break
+
+        self._merge()
+
+    def _reserve(self, rect: PackRect):
+        # Raise every part of the skyline underneath the rect to at least it's bottom edge
+        skyline = []
+        for x, y, width in self.skyline:
+            right = x + width
+            if right <= rect.x or x >= rect.right:
+                skyline.append([x, y, width])
+                continue
+            if x < rect.x:
+                skyline.append([x, y, rect.x - x])
+            start, end = max(x, rect.x), min(right, rect.right)
+            skyline.append([start, max(y, rect.bottom), end - start])
+            if right > rect.right:
+                skyline.append([rect.right, y, right - rect.right])
+        self.skyline = skyline
+        self._merge()
+
+    def _grow(self, old_bin_width: int, old_bin_height: int):
+        if self._bin_width > old_bin_width:
+            self.skyline.append([old_bin_width, 0, self._bin_width - old_bin_width])
+            self._merge()
+
+    def _merge(self):
+        """Join neighbouring segments at the same height."""
+        i = 0
+        while i < len(self.skyline) - 1:
+            if self.skyline[i][1] == self.skyline[i + 1][1]:
+                self.skyline[i][2] += self.skyline[i + 1][2]
+                del self.skyline[i + 1]
+            else:
+                i += 1
+
+    def _largest_free_area(self) -> int:
+        """Largest rectangle above the skyline, treating each segment as a histogram bar."""
+        best = 0
+        stack = []
+        for x, y, width in self.skyline + [[self._bin_width, self.height, 0]]:
+            bar_height = max(self.height - y, 0)
+            start = min(x, self.width)
+            while stack and stack[-1][1] >= bar_height:
+                bar_start, top_height = stack.pop()
+                best = max(best, top_height * (min(x, self.width) - bar_start))
+                start = bar_start
+            stack.append((start, bar_height))
+        return best
+
+
+class ShelfPacker(AtlasPacker):
+    """Fills rows left to right, starting a new row under the tallest item when one is full."""
+
+    def __init__(self, width: int, height: int, padding: int=0):
+        super().__init__(width, height, padding)
+        self.shelf_x = 0
+        self.shelf_y = 0
+        self.shelf_height = 0
+
+    def _insert(self, width: int, height: int) -> PackRect:
+        if self.shelf_x + width > self._bin_width:
+            self.shelf_x = 0
+            self.shelf_y += self.shelf_height
+            self.shelf_height = 0
+
+        if self.shelf_x + width > self._bin_width or self.shelf_y + height > self._bin_height:
+            return None
+
+        rect = PackRect(self.shelf_x, self.shelf_y, width, height)
+        self.shelf_x += width
+        self.shelf_height = max(self.shelf_height, height)
+        return rect
+
+    def _reserve(self, rect: PackRect):
+        # Shelves only grow downwards so start a fresh one below anything reserved
+        self.shelf_y = max(self.shelf_y + self.shelf_height, rect.bottom)
+        self.shelf_x = 0
+        self.shelf_height = 0
+
+    def _grow(self, old_bin_width: int, old_bin_height: int):
+        # The current shelf carries on into the extra width, beside the full shelves above it is free space
+        if self._bin_width > old_bin_width and self.shelf_y > 0:
+            self.free_list.append(PackRect(old_bin_width, 0, self._bin_width - old_bin_width, self.shelf_y))
+
+    def _largest_free_area(self) -> int:
+        below = self.width * max(self.height - (self.shelf_y + self.shelf_height), 0)
+        beside = max(self.width - self.shelf_x, 0) * max(self.height - self.shelf_y, 0)
+        return max(below, beside)
@@ -0,0 +1,218 @@
+from collections import deque
+import ctypes
+from dataclasses import dataclass
+from enum import Enum
+import logging
+from pathlib import Path
+import queue
+import threading
+import time
+from OpenGL.GL import *
+from PIL import Image
+import numpy as np
+
+
+class CaptureFormat(Enum):
+    PNG = 0
+    RAW = 1
+
+
+@dataclass(init=True)
+class CapturedFrame:
+    index: int
+    pixels: np.ndarray
+
+
+class FrameWriter:
+    """Writes captured frames from a background thread so encoding never holds up the game loop.
+    PNG writes a numbered image per frame, RAW appends every frame to a single file of packed RGBA
+    rows, top row first, that can be turned into a video with eg.
+    ffmpeg -f rawvideo -pix_fmt rgba -s 1920x1080 -r 60 -i frames.rgba out.mp4
+    Frames are dropped rather than queued without limit when the writer falls behind."""
+
+    def __init__(self, path: Path, capture_format: CaptureFormat=CaptureFormat.PNG, max_queued: int=8):
+        self.path = Path(path)
+        self.format = capture_format
+        self.num_written = 0
+        self.num_dropped = 0
+        self._queue = queue.Queue(max_queued)
+        self._raw_file = None
+        self._thread = threading.Thread(target=self._run, name="FrameWriter", daemon=True)
+        self._thread.start()
+
+    def write(self, frame: CapturedFrame) -> bool:
+        """Queue a frame for writing, returns False if it was dropped."""
+        try:
+            self._queue.put_nowait(frame)
+            return True
+        except queue.Full:
+            self.num_dropped += 1
+            return False
+
+    @property
+    def finished(self) -> bool:
+        return not self._thread.is_alive()
+
+    def close(self, wait: bool=True):
+        """Stop the thread once everything queued is written, waiting for it unless told not to."""
+        self._queue.put(None)
+        if wait:
+            self.wait()
+
+    def wait(self):
+        self._thread.join()
+
+    def _run(self):
+        self.path.mkdir(parents=True, exist_ok=True)
+        while True:
+            frame = self._queue.get()
+            if frame is None:
+                break
+            try:
+                self._write_frame(frame)
+                self.num_written += 1
+            except OSError as e:
+                logging.warning(f"Failed to write captured frame {frame.index} to {self.path}: {e}")
+        if self._raw_file is not None:
+            self._raw_file.close()
+            self._raw_file = None
+
+    def _write_frame(self, frame: CapturedFrame):
+        if self.format is CaptureFormat.RAW:
+            if self._raw_file is None:
+                self._raw_file = open(self.path / "frames.rgba", "wb")
+            self._raw_file.write(frame.pixels.tobytes())
+        else:
+            image = Image.fromarray(frame.pixels, "RGBA")
+            image.save(self.path / f"frame_{frame.index:05}.png", compress_level=1)
+
+
+class FrameCapture:
+    """Captures screenshots and recordings of the back buffer without stalling the GPU.
+    Each captured frame is read into the next of a ring of pixel pack buffers with a fence,
+    then mapped once the fence has passed, up to ring size frames later, so the read back
+    overlaps rendering instead of waiting for it. Call end_frame after drawing, before the swap."""
+
+    def __init__(self, width: int, height: int, path: Path, ring_size: int=3):
+        self.width = width
+        self.height = height
+        self.path = Path(path)
+        self.ring_size = ring_size
+        self.frame_bytes = width * height * 4
+        self.writer = None
+        # Writers closed without waiting that may still be writing
+        self._closing = []
+        self.recording = False
+        self.num_captured = 0
+        # Per frame cost of capturing on the main thread, smoothed
+        self.cost_ms = 0.0
+        self._screenshot_queued = False
+        self._next_buffer = 0
+        # Buffers read into and not yet mapped, oldest first, as (buffer, fence, frame index)
+        self._in_flight = deque()
+
+        self.pack_buffers = glGenBuffers(ring_size)
+        for buffer in self.pack_buffers:
+            glBindBuffer(GL_PIXEL_PACK_BUFFER, buffer)
+            glBufferData(GL_PIXEL_PACK_BUFFER, self.frame_bytes, None, GL_STREAM_READ)
+        glBindBuffer(GL_PIXEL_PACK_BUFFER, 0)
+
+    def screenshot(self):
+        """Save the next frame as a png."""
+        self._screenshot_queued = True
+
+    def start_recording(self, capture_format: CaptureFormat=CaptureFormat.PNG):
+        if self.recording:
+            return
+        self._finish_writer()
+        self.writer = self._create_writer(capture_format)
+        self.recording = True
+
+    def stop_recording(self):
+        self.recording = False
+
+    def toggle_recording(self):
+        if self.recording:
+            self.stop_recording()
+        else:
+            self.start_recording()
+
+    def end_frame(self):
+        start = time.perf_counter()
+        if self._screenshot_queued and self.writer is None:
+            self.writer = self._create_writer(CaptureFormat.PNG)
+
+        capture = self.recording or self._screenshot_queued
+        if capture:
+            self._read_back_buffer()
+        self._screenshot_queued = False
+
+        # A buffer is only reused once it has been mapped so wait on the oldest when the ring is full
+        while len(self._in_flight) > 0:
+            buffer, fence, index = self._in_flight[0]
+            must_wait = len(self._in_flight) >= self.ring_size
+            result = glClientWaitSync(fence, GL_SYNC_FLUSH_COMMANDS_BIT, GL_TIMEOUT_IGNORED if must_wait else 0)
+            if result not in (GL_ALREADY_SIGNALED, GL_CONDITION_SATISFIED):
+                break
+            self._in_flight.popleft()
+            glDeleteSync(fence)
+            self._map_buffer(buffer, index)
+
+        if len(self._in_flight) == 0 and not self.recording:
+            self._finish_writer()
+
+        if capture or len(self._in_flight) > 0:
+            self.cost_ms += ((time.perf_counter() - start) * 1000.0 - self.cost_ms) * 0.1
+
+    def _read_back_buffer(self):
+        buffer = self.pack_buffers[self._next_buffer]
+        self._next_buffer = (self._next_buffer + 1) % self.ring_size
+        glReadBuffer(GL_BACK)
+        glPixelStorei(GL_PACK_ALIGNMENT, 1)
+        glBindBuffer(GL_PIXEL_PACK_BUFFER, buffer)
+        glReadPixels(0, 0, self.width, self.height, GL_RGBA, GL_UNSIGNED_BYTE, ctypes.c_void_p(0))
+        # Leaving the buffer bound would send every other read back into it
+        glBindBuffer(GL_PIXEL_PACK_BUFFER, 0)
+        self._in_flight.append((buffer, glFenceSync(GL_SYNC_GPU_COMMANDS_COMPLETE, 0), self.num_captured))
+        self.num_captured += 1
+
+    def _map_buffer(self, buffer: int, index: int):
+        glBindBuffer(GL_PIXEL_PACK_BUFFER, buffer)
+        address = ctypes.cast(glMapBufferRange(GL_PIXEL_PACK_BUFFER, 0, self.frame_bytes, GL_MAP_READ_BIT), ctypes.c_void_p).value
+        if address:
+            mapped = (ctypes.c_ubyte * self.frame_bytes).from_address(address)
+            # GL rows start at the bottom of the screen, images at the top
+            pixels = np.flipud(np.frombuffer(mapped, dtype=np.uint8).reshape(self.height, self.width, 4)).copy()
+            self.writer.write(CapturedFrame(index, pixels))
+            glUnmapBuffer(GL_PIXEL_PACK_BUFFER)
+        else:
+            logging.warning(f"Could not map the pixel buffer of captured frame {index}, the frame is lost")
+        glBindBuffer(GL_PIXEL_PACK_BUFFER, 0)
+
+    def _create_writer(self, capture_format: CaptureFormat) -> FrameWriter:
+        # The frame count keeps captures started within the same second apart
+        return FrameWriter(self.path / f"{time.strftime('%Y%m%d_%H%M%S')}_{self.num_captured}", capture_format)
+
+    def _finish_writer(self, wait: bool=False):
+        self._closing = [w for w in self._closing if not w.finished]
+        if self.writer is not None:
+            self.writer.close(wait)
+            if self.writer.num_dropped > 0:
+                logging.warning(f"Capture to {self.writer.path} dropped {self.writer.num_dropped} frames, the writer could not keep up")
+            if not wait:
+                self._closing.append(self.writer)
+            self.writer = None
+
+    def close(self):
+        """Write out anything still in flight, then free the buffers."""
+        self.recording = False
+        while len(self._in_flight) > 0:
+            buffer, fence, index = self._in_flight.popleft()
+            glClientWaitSync(fence, GL_SYNC_FLUSH_COMMANDS_BIT, GL_TIMEOUT_IGNORED)
+            glDeleteSync(fence)
+            self._map_buffer(buffer, index)
+        self._finish_writer(True)
+        for writer in self._closing:
+            writer.wait()
+        self._closing = []
+        glDeleteBuffers(self.ring_size, self.pack_buffers)
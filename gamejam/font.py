@@ -1,89 +1,158 @@
-from copy import copy
+from collections import OrderedDict
 import glfw
+import logging
+import math
 import numpy as np
 from pathlib import Path
-from freetype import Face, ctypes
 from OpenGL.GL import (
-    glGenBuffers, glBindBuffer, glBufferData,
-    glGenTextures, glBindTexture, glActiveTexture,
-    glTexImage2D, glTexParameteri,
-    glGenVertexArrays,
-    glUseProgram,
-    glBindVertexArray,
-    glVertexAttribPointer,
-    glEnableVertexAttribArray,
-    glGetAttribLocation,
-    glGetUniformLocation,
-    glUniformMatrix4fv,
-    glUniform2f, glUniform4f,
-    glDrawElements,
-    GL_TEXTURE_2D, GL_TEXTURE0,
+    glGenTextures,
+    glTexImage2D, glTexSubImage2D, glTexParameteri, glPixelStorei,
+    glGenBuffers, glBindBuffer, glBufferData, glBufferSubData, glDeleteBuffers,
+    glGetUniformLocation, glUniform2f, glUniform4f,
+    glDrawElementsInstanced, glDrawElementsInstancedBaseInstance,
+    GL_TEXTURE_2D,
     GL_TEXTURE_WRAP_S, GL_TEXTURE_WRAP_T,
     GL_CLAMP_TO_EDGE,
     GL_TEXTURE_MIN_FILTER, GL_TEXTURE_MAG_FILTER,
-    GL_LINEAR, GL_TRUE,
-    GL_R8, GL_RED, GL_FLOAT, GL_UNSIGNED_INT, GL_UNSIGNED_BYTE, GL_FALSE,
-    GL_ARRAY_BUFFER, GL_ELEMENT_ARRAY_BUFFER,
-    GL_STATIC_DRAW,
+    GL_LINEAR, GL_UNPACK_ALIGNMENT,
+    GL_R8, GL_RED, GL_UNSIGNED_INT, GL_UNSIGNED_BYTE,
+    GL_ARRAY_BUFFER, GL_STREAM_DRAW, GL_STATIC_DRAW,
     GL_TRIANGLES
 )
 
+from gamejam.atlas_packer import AtlasPacker, PackRect, PackStrategy
+from gamejam.font_cache import FontCache
 from gamejam.graphics import Graphics, Shader
+from gamejam.image import signed_distance_field
 from gamejam.settings import GameSettings
 from gamejam.coord import Coord2d
 from gamejam.quickmaff import MATRIX_IDENTITY
 
 class Font():
-    def __init__(self, graphics: Graphics, window, filename: str=None):
+    """Rasterises a font into one texture and draws strings from it. Draws are batched, every
+    glyph queued until something else draws is drawn with one instanced call when it flushes.
+    The texture and metrics are cached on disk so FreeType only runs the first time a font is used.
+    Characters outside the pre-built set are rasterised when first drawn into the free space of the
+    texture, evicting the least recently used of them when it fills.
+    An sdf font stores distance fields of smaller glyphs in a quarter of the texture and stays sharp
+    at every size, where a plain font is only sharp close to the size it was rasterised at."""
+    # Per instance floats: position xy, size xy, glyph rect in the texture xywh, colour rgba
+    InstanceFloats = 12
+    InstanceAttributes = [("InstancePosition", 2), ("InstanceSize", 2), ("InstanceCharRect", 4), ("InstanceColour", 4)]
+    CHAR_SIZE = 9000
+    TEXTURE_SIZE = 2048
+    SDF_CHAR_SIZE = 64 * 64
+    SDF_SPREAD = 8
+    SDF_TEXTURE_SIZE = 1024
+    # Columns of glyph_table which has a row per glyph slot, everything in FreeType units at CHAR_SIZE
+    # apart from the position and size in the texture, which are NaN for glyphs with no pixels
+    GLYPH_ADVANCE = 0
+    GLYPH_OFFSET = 1
+    GLYPH_BEARING = 3
+    GLYPH_POSITION = 5
+    GLYPH_SIZE = 7
+    GLYPH_COLUMNS = 9
+    WRAP_CACHE_SIZE = 256
+
+    DEFAULT_FILENAME = Path(__file__).parent / "res" / "consola.ttf"
+    # Printable ASCII and a half, anything else is rasterised when it is first drawn
+    DEFAULT_CHARS = "".join(chr(c) for c in range(32, 127)) + "½"
+
+    def __init__(self, graphics: Graphics, window, filename: str=None, sdf: bool=False, char_size: int=None, chars: str=None, manager=None):
+        """Prefer FontManager.get, which hands out one Font per file, size and characters."""
         self.graphics = graphics
+        self.manager = manager
         if filename is None:
-            self.filename = Path(__file__).parent / "res" / "consola.ttf"
+            self.filename = Font.DEFAULT_FILENAME
         else:
             self.filename = filename
-        self.face = Face(str(self.filename))
-        self.face.set_char_size(9000)
-        self.sizes = {}
-        self.positions = {}
-        self.advance = {}
-        self.offsets = {}
-        self.bearings = {}
-        self.char_start = 32
-        self.char_end = 127
-        self.special_chars = ['½']
-        self.num_chars = (self.char_end - self.char_start) + len(self.special_chars)
+        self.sdf = sdf
+        self.shader = Shader.FONT_SDF if sdf else Shader.FONT
+        if char_size is None:
+            char_size = Font.SDF_CHAR_SIZE if sdf else Font.CHAR_SIZE
+        self.char_size = char_size
+        # Metrics are kept at CHAR_SIZE so layout is the same whatever size glyphs are rasterised at
+        self.metric_scale = Font.CHAR_SIZE / self.char_size
+        self.glyph_slots = {}
+        self.glyph_table = np.full((128, Font.GLYPH_COLUMNS), np.nan)
+        # Slot of every codepoint up to the highest loaded so whole strings are looked up at once, rebuilt when glyphs change
+        self._num_slots = 0
+        self._free_slots = []
+        self._slot_by_code = None
+        self._slot_visible = None
+        self._wrap_cache = OrderedDict()
+        self.chars = chars if chars is not None else Font.DEFAULT_CHARS
+        self.num_chars = len(self.chars)
         window_size = glfw.get_framebuffer_size(window)
         self.window_ratio = window_size[0] / window_size[1]
         self.line_height = 10000.0
 
         # Create one big texture for all the glyphs
-        self.tex_width = 2048
-        self.tex_height = 2048
-        self.image_data = np.zeros((self.tex_width, self.tex_height), dtype=np.uint8)
+        self.tex_width = Font.SDF_TEXTURE_SIZE if sdf else Font.TEXTURE_SIZE
+        self.tex_height = self.tex_width
+        self.image_data = None
         self.object_mat = MATRIX_IDENTITY
+        self.face = None
+
+        all_chars = list(self.chars)
+        cache = FontCache(FontCache.get_cache_path(self.filename, self.char_size, all_chars, f"sdf{Font.SDF_SPREAD}" if sdf else ""))
+        if not cache.load(self):
+            self.rasterise(all_chars)
+            cache.save(self)
+        self._num_slots = len(self.glyph_slots)
+
+        # Generate texture data
+        self.texture_id = glGenTextures(1)
+        self.graphics.bind_texture(self.texture_id)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_S, GL_CLAMP_TO_EDGE)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_T, GL_CLAMP_TO_EDGE)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_LINEAR)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
+        glTexImage2D(GL_TEXTURE_2D, 0, GL_R8, self.tex_width, self.tex_height, 0, GL_RED, GL_UNSIGNED_BYTE, np.ascontiguousarray(self.image_data))
+        
+        # Glyphs queued by draw, doubles in size when full
+        self.num_glyphs = 0
+        self.instance_data = np.zeros((256, Font.InstanceFloats), dtype=np.float32)
+        self.instance_vbo = glGenBuffers(1)
+        self.VAO = graphics.get_quad_vao(graphics.get_program(self.shader), self.instance_vbo, Font.InstanceAttributes)
+        self.offset_id = glGetUniformLocation(graphics.get_program(self.shader), "Offset")
+        self.tint_id = glGetUniformLocation(graphics.get_program(self.shader), "Tint")
+        # Retained meshes drawn in the batch, each with the number of glyphs queued before it
+        self._queued_meshes = []
+
+        # Glyphs loaded on demand go to the right of the pre-built ones and into the slots after them.
+        # Bumping the generation on eviction tells retained meshes their texture coordinates are stale
+        self.glyph_generation = 0
+        self._num_prebuilt = self._num_slots
+        self._layout_serial = 0
+        self._glyph_rects = {}
+        self._glyph_lru = OrderedDict()
+        self._missing_glyphs = set()
+        self._unfitted_glyphs = set()
+        self._glyph_packer = AtlasPacker.create(PackStrategy.MAXRECTS, self.tex_width, self.tex_height, padding=1)
+        texture_right = self.glyph_table[:self._num_slots, Font.GLYPH_POSITION] + self.glyph_table[:self._num_slots, Font.GLYPH_SIZE]
+        if np.any(~np.isnan(texture_right)):
+            prebuilt_width = math.ceil(np.nanmax(texture_right) * self.tex_width)
+            self._glyph_packer.reserve(PackRect(0, 0, prebuilt_width, self.tex_height))
+
+
+    def rasterise(self, all_chars: list):
+        """Load every glyph with FreeType and blit them into image_data, noting each glyph's metrics."""
+        self.get_face()
+        self.image_data = np.zeros((self.tex_width, self.tex_height), dtype=np.uint8)
 
         if GameSettings.DEV_MODE:
             print(f"Building font atlas for {self.filename}: ", end='')
 
         # Blit font chars into the texture noting the individual char size and tex coords
-        atlas_pos = (0, 0)        
+        atlas_pos = (0, 0)
         self.largest_glyph_height = 0
-        
-        all_chars = []
-        for c in range(self.char_start, self.char_end):
-            all_chars.append(chr(c))
 
-        for _, c in enumerate(self.special_chars):
-            all_chars.append(c)
-        
         for _, char in enumerate(all_chars):
             c = ord(char)
             self.face.load_char(char)
-            atlas_pos = self.blit_char(self.image_data, self.face.glyph, atlas_pos, c)
-            self.advance[c] = self.face.glyph.advance.x
-            bbox = self.face.glyph.outline.get_bbox()
-            self.offsets[c] = (bbox.xMax - bbox.xMin, bbox.yMax - bbox.yMin)
-            metrics = self.face.glyph.metrics
-            self.bearings[c] = (metrics.horiBearingX, metrics.horiBearingY)
+            atlas_pos, rect = self.blit_char(self.image_data, self.glyph_pixels(self.face.glyph), atlas_pos)
+            self.set_glyph_metrics(c, self.face.glyph, rect)
 
             if c == 32:
                 self.line_height = self.face.height * 2.75
@@ -94,53 +163,173 @@ class Font():
         if GameSettings.DEV_MODE:
             print(' OK!')
 
-        # Generate texture data
-        self.image_data_texture = self.image_data.flatten()
-        self.texture_id = glGenTextures(1)
-        glBindTexture(GL_TEXTURE_2D, self.texture_id)
-        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_S, GL_CLAMP_TO_EDGE)
-        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_T, GL_CLAMP_TO_EDGE)
-        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_LINEAR)
-        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
-        glTexImage2D(GL_TEXTURE_2D, 0, GL_R8, self.tex_width, self.tex_height, 0, GL_RED, GL_UNSIGNED_BYTE, self.image_data_texture)
-        
-        # Create array object
-        self.VAO = glGenVertexArrays(1)
-        glBindVertexArray(self.VAO)
-
-        # Create Buffer object in gpu
-        self.VBO = glGenBuffers(1)
-        self.rectangle = np.array([-0.5, -0.5, 
-                                       0.5, -0.5, 
-                                       0.5, 0.5, 
-                                      -0.5, 0.5, 0.0, 1.0, 1.0, 1.0,1.0, 0.0, 0.0, 0.0], dtype = np.float32)
-
-        # Bind the buffer
-        glBindBuffer(GL_ARRAY_BUFFER, self.VBO)
-        glBufferData(GL_ARRAY_BUFFER, 64, self.rectangle, GL_STATIC_DRAW) 
-
-        # Create EBO
-        self.EBO = glGenBuffers(1)
-        glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, self.EBO)
-        glBufferData(GL_ELEMENT_ARRAY_BUFFER, 24, self.graphics.default_indices, GL_STATIC_DRAW)
-
-        shader_font = graphics.get_program(Shader.FONT)
-        self.vertex_pos_id = glGetAttribLocation(shader_font, "VertexPosition")
-        glVertexAttribPointer(self.vertex_pos_id, 2, GL_FLOAT, GL_FALSE, 8, ctypes.c_void_p(0))
-        glEnableVertexAttribArray(self.vertex_pos_id)
- 
-        self.tex_coord_id = glGetAttribLocation(shader_font, "TexCoord")
-        glVertexAttribPointer(self.tex_coord_id, 2, GL_FLOAT, GL_FALSE, 8, ctypes.c_void_p(32))
-        glEnableVertexAttribArray(self.tex_coord_id)
- 
-        self.char_coord_id = glGetUniformLocation(shader_font, "CharCoord")
-        self.char_size_id = glGetUniformLocation(shader_font, "CharSize")
-        self.colour_id = glGetUniformLocation(shader_font, "Colour")
-        self.pos_id = glGetUniformLocation(shader_font, "Position")
-        self.size_id = glGetUniformLocation(shader_font, "Size")
-        self.object_mat_id = glGetUniformLocation(shader_font, "ObjectMatrix")
-        self.view_mat_id = glGetUniformLocation(shader_font, "ViewMatrix")
-        self.projection_mat = glGetUniformLocation(shader_font, "ProjectionMatrix")
+
+    def get_face(self):
+        """FreeType is only imported once a glyph has to be rasterised."""
+        if self.face is None:
+            if self.manager is not None:
+                self.face = self.manager.get_face(self.filename, self.char_size)
+            else:
+                self.face = FontManager.open_face(self.filename, self.char_size)
+        return self.face
+
+
+    def glyph_pixels(self, glyph) -> np.ndarray:
+        """The loaded glyph's bitmap as rows of bytes, turned into a distance field for sdf fonts."""
+        bitmap = glyph.bitmap
+        if bitmap.width <= 0 or bitmap.rows <= 0:
+            return np.zeros((0, 0), dtype=np.uint8)
+        pixels = np.array(bitmap.buffer, dtype=np.uint8).reshape(bitmap.rows, bitmap.pitch)[:, :bitmap.width]
+        if self.sdf:
+            return signed_distance_field(pixels, Font.SDF_SPREAD)
+        return np.ascontiguousarray(pixels)
+
+
+    def set_glyph_metrics(self, c: int, glyph, rect: PackRect=None):
+        """Fill a slot for a character from the loaded glyph and where its pixels are in the texture."""
+        scale = self.metric_scale
+        if self.sdf and glyph.bitmap.width > 0:
+            # The quad has to cover the distance field exactly, padding included, at 64 units a pixel
+            spread = Font.SDF_SPREAD
+            offset = ((glyph.bitmap.width + spread * 2) * 64 * scale, (glyph.bitmap.rows + spread * 2) * 64 * scale)
+            bearing = ((glyph.bitmap_left - spread) * 64 * scale, (glyph.bitmap_top + spread) * 64 * scale)
+        else:
+            bbox = glyph.outline.get_bbox()
+            offset = ((bbox.xMax - bbox.xMin) * scale, (bbox.yMax - bbox.yMin) * scale)
+            bearing = (glyph.metrics.horiBearingX * scale, glyph.metrics.horiBearingY * scale)
+
+        if rect is None:
+            texture_rect = (np.nan,) * 4
+        else:
+            texture_rect = (rect.x / self.tex_width, rect.y / self.tex_height, rect.width / self.tex_width, rect.height / self.tex_height)
+
+        if len(self._free_slots) > 0:
+            slot = self._free_slots.pop()
+        else:
+            slot = self._num_slots
+            self._num_slots += 1
+            if slot >= len(self.glyph_table):
+                self.glyph_table = np.concatenate([self.glyph_table, np.full_like(self.glyph_table, np.nan)])
+        self.glyph_table[slot] = (glyph.advance.x * scale, *offset, *bearing, *texture_rect)
+        self.glyph_slots[c] = slot
+        self._glyph_changed()
+
+
+    def glyph_image(self, c: int) -> np.ndarray:
+        """Pixels of a loaded character, cut from the texture data for pre-built glyphs and
+        rasterised again for the rest, which only ever exist on the GPU."""
+        slot = self.glyph_slots.get(c)
+        if slot is not None and slot < self._num_prebuilt and not np.isnan(self.glyph_table[slot, Font.GLYPH_POSITION]):
+            x, y, width, height = self.glyph_table[slot, Font.GLYPH_POSITION:Font.GLYPH_SIZE + 2]
+            x, y = round(x * self.tex_width), round(y * self.tex_height)
+            width, height = round(width * self.tex_width), round(height * self.tex_height)
+            return np.array(self.image_data[y:y + height, x:x + width])
+
+        face = self.get_face()
+        face.load_char(chr(c))
+        return self.glyph_pixels(face.glyph)
+
+
+    def _glyph_changed(self):
+        self._slot_by_code = None
+        self._wrap_cache.clear()
+
+
+    def load_glyph(self, c: int) -> bool:
+        """Rasterise a character that is not in the texture yet, returns False if the font has no glyph
+        for it or there is no room even after evicting every glyph not used by the current layout."""
+        if c in self._missing_glyphs:
+            return False
+
+        face = self.get_face()
+        if face.get_char_index(c) == 0:
+            self._missing_glyphs.add(c)
+            return False
+
+        face.load_char(chr(c))
+        src, rect = self.glyph_pixels(face.glyph), None
+        if src.size > 0:
+            rect = self._glyph_packer.insert(src.shape[1], src.shape[0])
+            while rect is None and self._evict_glyph():
+                rect = self._glyph_packer.insert(src.shape[1], src.shape[0])
+            if rect is None:
+                if c not in self._unfitted_glyphs:
+                    self._unfitted_glyphs.add(c)
+                    logging.warning(f"Font texture for {self.filename} is full, can't draw '{chr(c)}'")
+                return False
+
+            glPixelStorei(GL_UNPACK_ALIGNMENT, 1)
+            self.graphics.bind_texture(self.texture_id)
+            glTexSubImage2D(GL_TEXTURE_2D, 0, rect.x, rect.y, rect.width, rect.height, GL_RED, GL_UNSIGNED_BYTE, src)
+            glPixelStorei(GL_UNPACK_ALIGNMENT, 4)
+
+            self._glyph_rects[c] = rect
+            self._glyph_lru[c] = self._layout_serial
+
+        self.set_glyph_metrics(c, face.glyph, rect)
+        return True
+
+
+    def get_slots(self, string: str) -> tuple:
+        """Codepoints of a string and the glyph slot of each, -1 for line breaks and characters the
+        font can't draw. Missing glyphs are loaded and on demand glyphs marked as used."""
+        codes = np.frombuffer(string.encode("utf-32-le"), dtype=np.uint32).astype(np.int64)
+        slots = self._lookup(codes)
+
+        if len(self._glyph_lru) > 0:
+            for c in np.unique(codes[slots >= self._num_prebuilt]).tolist():
+                # Blank glyphs like NBSP take no space in the page so are never evicted
+                if c not in self._glyph_lru:
+                    continue
+                self._glyph_lru[c] = self._layout_serial
+                self._glyph_lru.move_to_end(c)
+
+        missing = slots < 0
+        if missing.any():
+            missing = codes[missing & (codes != 10) & (codes != 13)]
+            loaded = [self.load_glyph(c) for c in np.unique(missing).tolist()]
+            if any(loaded):
+                slots = self._lookup(codes)
+        return codes, slots
+
+
+    def _lookup(self, codes: np.ndarray) -> np.ndarray:
+        if self._slot_by_code is None:
+            loaded_codes = np.fromiter(self.glyph_slots.keys(), dtype=np.int64, count=len(self.glyph_slots))
+            # One spare entry past the highest codepoint catches everything above it
+            self._slot_by_code = np.full(loaded_codes.max(initial=0) + 2, -1, dtype=np.int64)
+            self._slot_by_code[loaded_codes] = np.fromiter(self.glyph_slots.values(), dtype=np.int64, count=len(self.glyph_slots))
+            self._slot_visible = ~np.isnan(self.glyph_table[:, Font.GLYPH_POSITION])
+        return self._slot_by_code[np.minimum(codes, len(self._slot_by_code) - 1)]
+
+
+    def get_advances(self, codes: np.ndarray, slots: np.ndarray, display_size: float) -> np.ndarray:
+        """NDC advance of each character, characters the font can't draw take the space of a space and line breaks none."""
+        space_slot = self.glyph_slots.get(32)
+        space = self.glyph_table[space_slot, Font.GLYPH_ADVANCE] if space_slot is not None else 0.0
+        advances = np.where(slots >= 0, self.glyph_table[slots, Font.GLYPH_ADVANCE], space)
+        advances[(codes == 10) | (codes == 13)] = 0.0
+        return (advances * display_size) / self.window_ratio
+
+
+    def _evict_glyph(self) -> bool:
+        """Free the least recently used glyph, never one from the layout in progress."""
+        if len(self._glyph_lru) == 0:
+            return False
+        c, serial = next(iter(self._glyph_lru.items()))
+        if serial == self._layout_serial:
+            return False
+
+        # Queued glyphs may be using the space that is about to be overwritten
+        self.flush()
+        del self._glyph_lru[c]
+        self._glyph_packer.free(self._glyph_rects.pop(c))
+        slot = self.glyph_slots.pop(c)
+        self.glyph_table[slot] = np.nan
+        self._free_slots.append(slot)
+        self._glyph_changed()
+        self.glyph_generation += 1
+        return True
 
 
     def blit(self, dest, src, loc):
@@ -153,13 +342,13 @@ class Font():
         return dest
 
 
-    def blit_char(self, dest, glyph, loc, char_index: int):
-        bitmap = glyph.bitmap
-        width  = bitmap.rows
-        height = bitmap.width
+    def blit_char(self, dest, src: np.ndarray, loc) -> tuple:
+        """Copy a glyph's pixels into the next free space going down then across,
+        returns where the next glyph goes and where this one was put."""
+        width, height = src.shape
 
         if width <= 0 or height <= 0:
-            return loc
+            return loc, None
 
         if height > self.largest_glyph_height:
             self.largest_glyph_height = height
@@ -169,14 +358,10 @@ class Font():
 
         if loc[0] > self.tex_width or loc[1] > self.tex_width:
             print(f"Font atlas not large enough for all characters!")
-            return loc
+            return loc, None
             
-        src = np.reshape(bitmap.buffer, (width, height))
         self.blit(dest, src, loc)
-
-        self.sizes[char_index] = (height / self.tex_width, width / self.tex_height)
-        self.positions[char_index] = (loc[1] / self.tex_height, loc[0] / self.tex_width)
-        return (loc[0] + width, loc[1])
+        return (loc[0] + width, loc[1]), PackRect(loc[1], loc[0], height, width)
 
 
     def get_line_display_height(self, font_size: int):
@@ -192,79 +377,265 @@ class Font():
         """
         display_size = font_size * 0.0000005
         line_height = self.line_height * display_size
-        max_width = 0.0
-        line_width = 0.0
-        height = line_height
+        if len(string) == 0:
+            return Coord2d(0.0, line_height)
 
-        for i in range(len(string)):
-            c = ord(string[i])
+        codes, slots = self.get_slots(string)
+        line = np.cumsum((codes == 10) | (codes == 13))
+        line_widths = np.bincount(line, weights=self.get_advances(codes, slots, display_size))
+        return Coord2d(float(line_widths.max()), line_height * (int(line[-1]) + 1))
 
-            if c not in self.sizes:
-                if c == 13 or c == 10:
-                    max_width = max(max_width, line_width)
-                    line_width = 0.0
-                    height += line_height
-                else:
-                    line_width += (self.advance.get(32, 0) * display_size) / self.window_ratio
-                continue
 
-            line_width += (self.advance[c] * display_size) / self.window_ratio
+    def wrap(self, string: str, font_size: int, max_width: float) -> str:
+        """Break lines at spaces so none is wider than max_width in NDC, a word longer than that
+        gets a line to itself. Results are cached until the font's glyphs change."""
+        key = (string, font_size, max_width)
+        wrapped = self._wrap_cache.get(key)
+        if wrapped is not None:
+            self._wrap_cache.move_to_end(key)
+            return wrapped
 
-        max_width = max(max_width, line_width)
-        return Coord2d(max_width, height)
+        display_size = font_size * 0.0000005
+        lines = []
+        for paragraph in string.split("\n"):
+            codes, slots = self.get_slots(paragraph)
+            # Width of the paragraph up to each character, so any run is the difference of two
+            edges = np.concatenate([[0.0], np.cumsum(self.get_advances(codes, slots, display_size))])
+            line_words, line_start, word_start = [], 0, 0
+            for word in paragraph.split(" "):
+                word_end = word_start + len(word)
+                if len(line_words) > 0 and edges[word_end] - edges[line_start] > max_width:
+                    lines.append(" ".join(line_words))
+                    line_words, line_start = [], word_start
+                line_words.append(word)
+                word_start = word_end + 1
+            lines.append(" ".join(line_words))
+
+        wrapped = "\n".join(lines)
+        self._wrap_cache[key] = wrapped
+        if len(self._wrap_cache) > Font.WRAP_CACHE_SIZE:
+            self._wrap_cache.popitem(last=False)
+        return wrapped
+
+
+    def flush(self):
+        """Draw every glyph queued since the last flush with one instanced call, or one call
+        per run of glyphs between the retained meshes queued with them."""
+        num_glyphs = self.num_glyphs
+        if num_glyphs == 0 and len(self._queued_meshes) == 0:
+            return
+
+        self.graphics.use_program(self.graphics.get_program(self.shader))
+        self.graphics.bind_texture(self.texture_id)
+
+        # Orphan the previous flush's storage so the driver never waits on draws still in flight
+        if num_glyphs > 0:
+            glBindBuffer(GL_ARRAY_BUFFER, self.instance_vbo)
+            glBufferData(GL_ARRAY_BUFFER, self.instance_data.nbytes, None, GL_STREAM_DRAW)
+            glBufferSubData(GL_ARRAY_BUFFER, 0, num_glyphs * Font.InstanceFloats * 4, self.instance_data[:num_glyphs])
+
+        start = 0
+        for glyph_end, mesh, pos, colour in self._queued_meshes + [(num_glyphs, None, None, None)]:
+            if glyph_end > start:
+                glUniform2f(self.offset_id, 0.0, 0.0)
+                glUniform4f(self.tint_id, 1.0, 1.0, 1.0, 1.0)
+                self.graphics.bind_vao(self.VAO)
+                glDrawElementsInstancedBaseInstance(GL_TRIANGLES, 6, GL_UNSIGNED_INT, None, glyph_end - start, start)
+                start = glyph_end
+            if mesh is not None:
+                mesh.draw_queued(pos, colour)
+        self._queued_meshes = []
+        self.num_glyphs = 0
+
+
+    def queue_mesh(self, mesh, pos: Coord2d, colour: list):
+        """Draw a retained mesh of this font in order with the glyphs batched around it."""
+        self.graphics.begin_batch(self)
+        self._queued_meshes.append((self.num_glyphs, mesh, pos, colour))
 
 
     def draw(self, string: str, font_size: int, pos: Coord2d, colour: list) -> Coord2d:
-        """ Draw a string of text with the bottom left of the first glyph at the pos coordinate."""
-        shader_font = self.graphics.get_program(Shader.FONT)
-        glUseProgram(shader_font)
-        glUniform4f(self.colour_id, colour[0], colour[1], colour[2], colour[3]) 
-        glActiveTexture(GL_TEXTURE0)
-        glBindTexture(GL_TEXTURE_2D, self.texture_id)
-        glBindVertexArray(self.VAO)
-        glUniformMatrix4fv(self.object_mat_id, 1, GL_TRUE, self.object_mat)
-        glUniformMatrix4fv(self.view_mat_id, 1, GL_TRUE, self.graphics.camera.mat)
-        glUniformMatrix4fv(self.projection_mat, 1, GL_TRUE, self.graphics.projection_mat)
-        draw_pos, display_size = copy(pos), font_size * 0.0000005
-
-        for i in range(len(string)):
-            c = ord(string[i])
-
-            # Special case for unsupported or whitespace characters
-            if c not in self.sizes:
-                if c == 13 or c == 10:
-                    draw_pos.x = pos.x
-                    draw_pos.y = pos.y - self.line_height * display_size
-                else:
-                    draw_pos.x = draw_pos.x + (self.advance[32] * display_size) / self.window_ratio
-                continue
-
-            # Size and position in texture
-            tex_coord, tex_size = self.positions[c], self.sizes[c]
-
-            # Convert FreeType 26.6 metrics into NDC. Horizontal values must all
-            # share the same window_ratio scale so bearing, glyph width, and
-            # advance stay consistent — otherwise narrow glyphs (i, l) are
-            # centered with an unscaled half-width and jam into neighbours.
-            offset = self.offsets[c]
-            char_size_x = (offset[0] * display_size) / self.window_ratio
-            char_size_y = offset[1] * display_size
-            bearing_x = (self.bearings[c][0] * display_size) / self.window_ratio
-            bearing_y = self.bearings[c][1] * display_size
-            char_pos = (
-                draw_pos.x + bearing_x + char_size_x * 0.5,
-                draw_pos.y + bearing_y - char_size_y * 0.5,
-            )
-
-            glUniform4f(self.colour_id, colour[0], colour[1], colour[2], colour[3])
-            glUniform2f(self.pos_id, char_pos[0], char_pos[1])
-            glUniform2f(self.size_id, char_size_x, char_size_y)
-            glUniform2f(self.char_coord_id, tex_coord[0], tex_coord[1])
-            glUniform2f(self.char_size_id, tex_size[0], tex_size[1])
-            glDrawElements(GL_TRIANGLES, 6, GL_UNSIGNED_INT, None)
-
-            draw_pos.x = draw_pos.x + ((self.advance[c] * display_size) / self.window_ratio)
-
-        text_dim = draw_pos - pos
-        text_dim.y = max(abs(text_dim.y), self.line_height * display_size)
+        """ Draw a string of text with the bottom left of the first glyph at the pos coordinate.
+        The glyphs are queued and drawn when the font's batch is flushed."""
+        self.graphics.begin_batch(self)
+        glyphs, text_dim = self.layout(string, font_size, pos, colour)
+        n, num_glyphs = self.num_glyphs, len(glyphs)
+        while n + num_glyphs > len(self.instance_data):
+            self.instance_data = np.concatenate([self.instance_data, np.zeros_like(self.instance_data)])
+        self.instance_data[n:n + num_glyphs] = glyphs
+        self.num_glyphs += num_glyphs
         return text_dim
+
+
+    def layout(self, string: str, font_size: int, pos: Coord2d, colour: list) -> tuple:
+        """Turn a string into one row of Font.InstanceFloats per visible glyph, returned with
+        the size of the text. Layout is linear in pos so it can be built at the origin and moved."""
+        slots, quads, text_dim = self.place(string, font_size, pos)
+        glyphs = np.empty((len(slots), Font.InstanceFloats), dtype=np.float32)
+        glyphs[:, 0:4] = quads
+        glyphs[:, 4:8] = self.glyph_table[slots, Font.GLYPH_POSITION:Font.GLYPH_SIZE + 2]
+        glyphs[:, 8:12] = colour[:4]
+        return glyphs, text_dim
+
+
+    def place(self, string: str, font_size: int, pos: Coord2d) -> tuple:
+        """Where each visible glyph of a string goes as rows of NDC centre xy and size xy, returned
+        with the glyph slot of each row and the size of the text. Layout builds its instances from
+        this, a TextureAtlas swaps the slots for its own items."""
+        display_size = font_size * 0.0000005
+        line_height = self.line_height * display_size
+        self._layout_serial += 1
+        if len(string) == 0:
+            return np.zeros(0, dtype=np.int64), np.zeros((0, 4), dtype=np.float32), Coord2d(0.0, line_height)
+
+        # Pen position before each character, line breaks move it back to the start of the next line
+        codes, slots = self.get_slots(string)
+        line_break = (codes == 10) | (codes == 13)
+        advances = self.get_advances(codes, slots, display_size)
+        after = np.cumsum(advances)
+        pen_x = after - advances
+        line = np.cumsum(line_break)
+        if line[-1] > 0:
+            last_break = np.maximum.accumulate(np.where(line_break, np.arange(len(codes)), -1))
+            pen_x -= np.where(last_break >= 0, after[last_break], 0.0)
+
+        # Unsupported and whitespace characters only move the pen
+        visible = (slots >= 0) & self._slot_visible[slots]
+        metrics = self.glyph_table[slots[visible]]
+
+        # Convert FreeType 26.6 metrics into NDC. Horizontal values must all
+        # share the same window_ratio scale so bearing, glyph width, and
+        # advance stay consistent — otherwise narrow glyphs (i, l) are
+        # centered with an unscaled half-width and jam into neighbours.
+        scale = np.array([display_size / self.window_ratio, display_size])
+        char_sizes = metrics[:, Font.GLYPH_OFFSET:Font.GLYPH_OFFSET + 2] * scale
+        bearings = metrics[:, Font.GLYPH_BEARING:Font.GLYPH_BEARING + 2] * scale
+
+        quads = np.empty((len(metrics), 4), dtype=np.float32)
+        quads[:, 0] = pen_x[visible]
+        quads[:, 1] = line[visible] * -line_height
+        quads[:, 0:2] += (pos.x, pos.y) + bearings + char_sizes * (0.5, -0.5)
+        quads[:, 2:4] = char_sizes
+
+        text_dim = Coord2d(float(pen_x[-1] + advances[-1]), max(int(line[-1]) * line_height, line_height))
+        return slots[visible], quads, text_dim
+
+
+class TextMesh:
+    """A string laid out once into glyph instances that stay in a GPU buffer. Position and colour
+    are uniforms, so moving or recolouring it costs nothing and the glyphs are only rebuilt when the
+    text or size change or the font evicts a glyph. Draws join the font's batch, so labels drawn
+    one after another don't flush anything between them. Call release once it is no longer drawn."""
+
+    def __init__(self, font: Font):
+        self.font = font
+        self.graphics = font.graphics
+        self.text = None
+        self.font_size = None
+        self.generation = None
+        self.num_glyphs = 0
+        self.dimensions = Coord2d()
+        self.program = self.graphics.get_program(font.shader)
+        self.instance_vbo = glGenBuffers(1)
+        self.VAO = self.graphics.get_quad_vao(self.program, self.instance_vbo, Font.InstanceAttributes)
+
+
+    def set_text(self, text: str, font_size: int) -> Coord2d:
+        """Lay out and upload the glyphs if anything changed, returns the size of the text."""
+        if text == self.text and font_size == self.font_size and self.generation == self.font.glyph_generation:
+            return self.dimensions
+
+        self.text = text
+        self.font_size = font_size
+        self._build()
+        return self.dimensions
+
+
+    def _build(self):
+        glyphs, self.dimensions = self.font.layout(self.text, self.font_size, Coord2d(), [1.0] * 4)
+        self.generation = self.font.glyph_generation
+        self.num_glyphs = len(glyphs)
+        if self.num_glyphs > 0:
+            glBindBuffer(GL_ARRAY_BUFFER, self.instance_vbo)
+            glBufferData(GL_ARRAY_BUFFER, glyphs.nbytes, glyphs, GL_STATIC_DRAW)
+
+
+    def draw(self, pos: Coord2d, colour: list):
+        """Draw with the bottom left of the first glyph at pos, after anything batched before it."""
+        # Glyphs evicted from the font since the last build would sample someone else's pixels
+        if self.text is not None and self.generation != self.font.glyph_generation:
+            self._build()
+        if self.num_glyphs == 0:
+            return
+        self.font.queue_mesh(self, pos, colour[:4])
+
+
+    def draw_queued(self, pos: Coord2d, colour: list):
+        """Called by the font's flush with its program and texture already bound."""
+        glUniform2f(self.font.offset_id, pos.x, pos.y)
+        glUniform4f(self.font.tint_id, *colour)
+        self.graphics.bind_vao(self.VAO)
+        glDrawElementsInstanced(GL_TRIANGLES, 6, GL_UNSIGNED_INT, None, self.num_glyphs)
+
+
+    def release(self):
+        """Free the GPU buffer and vertex array, the mesh can't be drawn after this."""
+        if self.instance_vbo is None:
+            return
+        # A draw of this mesh may still be waiting in the font's batch
+        if any(queued[1] is self for queued in self.font._queued_meshes):
+            self.graphics.flush_batch()
+        self.graphics.release_quad_vao(self.program, self.instance_vbo)
+        glDeleteBuffers(1, [self.instance_vbo])
+        self.instance_vbo = None
+        self.text = None
+        self.num_glyphs = 0
+
+
+class FontManager:
+    """Hands out fonts by file, char size and characters, creating each one the first time it is
+    asked for. Every widget and screen asking for the same font shares one Font and its texture,
+    and fonts rasterised from the same file at the same size share one FreeType face."""
+
+    def __init__(self, graphics: Graphics, window):
+        self.graphics = graphics
+        self.window = window
+        self.fonts = {}
+        self._faces = {}
+
+
+    @staticmethod
+    def open_face(filename: str, char_size: int):
+        from freetype import Face
+        face = Face(str(filename))
+        face.set_char_size(char_size)
+        return face
+
+
+    @staticmethod
+    def get_key(filename: str=None, sdf: bool=False, char_size: int=None, chars: str=None) -> tuple:
+        """The same font asked for by a relative or absolute path, or with the default size spelt out, has the same key."""
+        path = Path(filename if filename is not None else Font.DEFAULT_FILENAME).resolve()
+        if char_size is None:
+            char_size = Font.SDF_CHAR_SIZE if sdf else Font.CHAR_SIZE
+        return (str(path), char_size, chars if chars is not None else Font.DEFAULT_CHARS, sdf)
+
+
+    def get(self, filename: str=None, sdf: bool=False, char_size: int=None, chars: str=None) -> Font:
+        """The font keeps the filename it was first asked for by, so layouts saved with it load on other machines."""
+        key = FontManager.get_key(filename, sdf, char_size, chars)
+        font = self.fonts.get(key)
+        if font is None:
+            _, char_size, chars, sdf = key
+            font = Font(self.graphics, self.window, filename, sdf, char_size, chars, manager=self)
+            self.fonts[key] = font
+        return font
+
+
+    def get_face(self, filename: str, char_size: int):
+        key = (str(Path(filename).resolve()), char_size)
+        face = self._faces.get(key)
+        if face is None:
+            face = FontManager.open_face(filename, char_size)
+            self._faces[key] = face
+        return face
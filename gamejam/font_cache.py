@@ -0,0 +1,92 @@
+import hashlib
+import json
+import logging
+import os
+from pathlib import Path
+import numpy as np
+
+from gamejam.settings import GameSettings
+
+
+class FontCache:
+    """Stores a rasterised font texture and its glyph metric tables on disk.
+    The cache is keyed by the font file's contents, the char size and the characters in it,
+    so a later launch maps the texture straight from disk and never loads a glyph."""
+    VERSION = 1
+    MANIFEST_NAME = "manifest.json"
+    TEXTURE_NAME = "texture.npy"
+    METRICS_NAME = "metrics.npy"
+    # Columns of the metrics table, the character then a row of the font's glyph table
+    METRICS_COLUMNS = ["char", "advance", "offset_x", "offset_y", "bearing_x", "bearing_y",
+                       "position_u", "position_v", "size_u", "size_v"]
+
+    def __init__(self, cache_path: Path):
+        self.path = Path(cache_path)
+
+    @staticmethod
+    def get_key(font_path: Path, char_size: int, chars: list, variant: str="") -> str:
+        key = hashlib.sha1()
+        with open(font_path, "rb") as font_file:
+            key.update(font_file.read())
+        key.update(f"{char_size}:{variant}:{''.join(chars)}".encode("utf-8"))
+        return key.hexdigest()[:16]
+
+    @staticmethod
+    def get_cache_path(font_path: Path, char_size: int, chars: list, variant: str="") -> Path:
+        """The variant keeps differently rasterised versions of the same font apart, eg. distance fields."""
+        return Path(os.getcwd()) / GameSettings.CACHE_PATH / "font" / FontCache.get_key(font_path, char_size, chars, variant)
+
+    def load(self, font) -> bool:
+        """Fill the font's texture and tables from the cache, returns False if there is nothing usable."""
+        manifest_path = self.path / FontCache.MANIFEST_NAME
+        if not manifest_path.exists():
+            return False
+
+        try:
+            with open(manifest_path, "r") as manifest_file:
+                manifest = json.load(manifest_file)
+            if manifest["version"] != FontCache.VERSION:
+                return False
+
+            image_data = np.load(self.path / FontCache.TEXTURE_NAME, mmap_mode="r")
+            metrics = np.load(self.path / FontCache.METRICS_NAME)
+            if image_data.shape != (manifest["tex_width"], manifest["tex_height"]) or metrics.shape[1] != len(FontCache.METRICS_COLUMNS):
+                return False
+        except (OSError, ValueError, KeyError) as e:
+            logging.warning(f"Ignoring unreadable font cache at {self.path}: {e}")
+            return False
+
+        font.tex_width = manifest["tex_width"]
+        font.tex_height = manifest["tex_height"]
+        font.line_height = manifest["line_height"]
+        font.image_data = image_data
+        font.glyph_table = np.ascontiguousarray(metrics[:, 1:])
+        font.glyph_slots = {int(c): slot for slot, c in enumerate(metrics[:, 0])}
+        return True
+
+    def save(self, font):
+        """Write the texture and tables of a font that has just been rasterised."""
+        metrics = np.empty((len(font.glyph_slots), len(FontCache.METRICS_COLUMNS)), dtype=np.float64)
+        for i, (c, slot) in enumerate(font.glyph_slots.items()):
+            metrics[i, 0] = c
+            metrics[i, 1:] = font.glyph_table[slot]
+
+        manifest = {
+            "version": FontCache.VERSION,
+            "font": str(font.filename),
+            "tex_width": font.tex_width,
+            "tex_height": font.tex_height,
+            "line_height": font.line_height,
+        }
+        try:
+            self.path.mkdir(parents=True, exist_ok=True)
+            np.save(self.path / FontCache.TEXTURE_NAME, font.image_data)
+            np.save(self.path / FontCache.METRICS_NAME, metrics)
+
+            # The manifest goes last so a half written cache is never loaded
+            manifest_path = self.path / FontCache.MANIFEST_NAME
+            with open(manifest_path.with_suffix(".tmp"), "w") as manifest_file:
+                json.dump(manifest, manifest_file, indent=1)
+            os.replace(manifest_path.with_suffix(".tmp"), manifest_path)
+        except OSError as e:
+            logging.warning(f"Could not write font cache to {self.path}: {e}")
@@ -13,13 +13,14 @@ from OpenGL.GL import (
     GL_BLEND, GL_SMOOTH, GL_DEPTH_TEST, GL_LEQUAL,
     GL_TRUE
 )
+from gamejam.capture import FrameCapture
 from gamejam.coord import Coord2d, Coord3d
 from gamejam.graphics import Graphics
 from gamejam.input import Input, InputActionKey, InputMethod, InputActionModifier
 from gamejam.texture import TextureManager
 from gamejam.gui import Gui
 from gamejam.gui_editor import GuiEditor, GuiEditMode
-from gamejam.font import Font
+from gamejam.font import FontManager
 from gamejam.profile import Profile
 from gamejam.particles import Particles
 from gamejam.settings import GameSettings
@@ -37,6 +38,7 @@ class GameJam:
         self.dt = 0.03
         self.fps = 0
         self.fps_last_update = 1
+        self.capture = None
     
 
     def prepare(self, texture_path: str = "tex"):
@@ -60,16 +62,24 @@ class GameJam:
 
         # Now we have an OpenGL context we can compile GPU programs
         self.graphics = Graphics(self.window_width / self.window_height)
-        self.font = Font(self.graphics, self.window)
+        self.fonts = FontManager(self.graphics, self.window)
+        self.font = self.fonts.get(sdf=GameSettings.FONT_SDF)
         self.textures = TextureManager(texture_path, self.graphics)
         self.input = Input(self.window, InputMethod.KEYBOARD, self.font)
         self.particles = Particles(self.graphics)
         self.profile = Profile()
+        # Read back at the framebuffer's size, on high DPI displays it is bigger than the window
+        framebuffer_width, framebuffer_height = glfw.get_framebuffer_size(self.window)
+        self.capture = FrameCapture(framebuffer_width, framebuffer_height, Path(GameSettings.CAPTURE_PATH))
 
         # Bind escape to quit and prtscn to outputing profile info
         self.input.add_key_mapping(256, InputActionKey.ACTION_KEYDOWN, InputActionModifier.NONE, self.quit)
         self.input.add_key_mapping(283, InputActionKey.ACTION_KEYDOWN, InputActionModifier.NONE, self.profile.capture_next_frame)
 
+        # F12 saves a screenshot and Ctrl-F12 starts or stops recording
+        self.input.add_key_mapping(301, InputActionKey.ACTION_KEYDOWN, InputActionModifier.NONE, self.capture.screenshot)
+        self.input.add_key_mapping(301, InputActionKey.ACTION_KEYDOWN, InputActionModifier.LCTRL, self.capture.toggle_recording)
+
         def toggle_dev_mode(): GameSettings.DEV_MODE = not GameSettings.DEV_MODE
         def debug_camera_move(**kwargs):
             dir = kwargs["dir"]
@@ -99,7 +109,7 @@ class GameJam:
     
         glfw.swap_interval(GameSettings.VSYNC)
 
-        self.gui = Gui("main", self.graphics, self.font, False)
+        self.gui = Gui("main", self.graphics, self.font, False, self.textures, self.fonts)
         self.gui.set_active(True, True)
 
         self.gui_editor = GuiEditor(self.gui, self.graphics, self.input, self.font)
@@ -124,7 +134,7 @@ class GameJam:
             glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
 
             self.profile.begin("gui")
-            self.textures.draw_atlas()
+            self.textures.update_loads()
             if self.gui_editor.mode is not GuiEditMode.NONE:
                 self.gui.draw(self.dt)
                 self.gui_editor.touch(self.input.cursor)
@@ -143,6 +153,11 @@ class GameJam:
                 cursor_pos = self.input.cursor.pos
                 self.font.draw("^", 8, cursor_pos - Coord2d(0.01, 0.03), [1.0] * 4)
                 self.font.draw(f"FPS: {math.floor(self.fps)}", 12, Coord2d(0.65, 0.75), [0.81, 0.81, 0.81, 1.0])
+                self.font.draw(f"GL skipped: {Graphics.last_frame_state_hits}/{Graphics.last_frame_state_hits + Graphics.last_frame_state_misses}",
+                               8, Coord2d(0.65, 0.7), [0.81, 0.81, 0.81, 1.0])
+                if self.capture.recording:
+                    self.font.draw(f"REC {self.capture.num_captured} frames, {self.capture.cost_ms:.2f}ms",
+                                   8, Coord2d(0.65, 0.65), [1.0, 0.2, 0.2, 1.0])
                 self.font.draw(f"X: {math.floor(cursor_pos.x * 100) / 100}\nY: {math.floor(cursor_pos.y * 100) / 100}", 10, cursor_pos, [0.81, 0.81, 0.81, 1.0])
             self.profile.end()
 
@@ -152,6 +167,13 @@ class GameJam:
 
             self.profile.begin("cursor")
             self.input.cursor.draw(self.dt)
+            self.graphics.flush_batch()
+            Graphics.end_frame()
+            self.textures.end_frame()
+            self.profile.end()
+
+            self.profile.begin("capture")
+            self.capture.end_frame()
             self.profile.end()
 
             glfw.swap_buffers(self.window)
@@ -170,4 +192,7 @@ class GameJam:
 
     def end(self):
         self.running = False
+        if self.capture is not None:
+            self.capture.close()
+            self.capture = None
         glfw.terminate()
@@ -1,3 +1,4 @@
+import ctypes
 from enum import Enum, auto
 import os
 import numpy as np
@@ -9,8 +10,15 @@ from OpenGL.GL import (
     glGetProgramiv,
     glGetActiveUniform,
     glGetShaderInfoLog, glGetProgramInfoLog,
+    glGenVertexArrays, glBindVertexArray, glDeleteVertexArrays,
+    glUseProgram, glActiveTexture, glBindTexture, glDeleteTextures,
+    glGenBuffers, glBindBuffer, glBufferData,
+    glGetAttribLocation, glVertexAttribPointer, glEnableVertexAttribArray, glVertexAttribDivisor,
     GL_VERTEX_SHADER, GL_FRAGMENT_SHADER,
-    GL_ACTIVE_UNIFORMS
+    GL_ACTIVE_UNIFORMS,
+    GL_ARRAY_BUFFER, GL_ELEMENT_ARRAY_BUFFER, GL_STATIC_DRAW,
+    GL_FLOAT, GL_FALSE,
+    GL_TEXTURE0, GL_TEXTURE_2D
 )
 from OpenGL.GL.shaders import (
     compileProgram, compileShader
@@ -28,6 +36,9 @@ class Shader(Enum):
     PARTICLES = auto()
     ANIM = auto()
     DEBUG = auto()
+    SPRITE_COLOUR = auto()
+    SPRITE_TEXTURE = auto()
+    FONT_SDF = auto()
 
 class ShaderType(Enum):
     VERTEX = 0
@@ -37,6 +48,17 @@ class Graphics:
     SHADER_PATH = "shaders"
     DEFAULT_RECTANGLE = np.array([-0.5, -0.5, 0.5, -0.5, 0.5, 0.5, -0.5, 0.5, 0.0, 1.0, 1.0, 1.0, 1.0, 0.0, 0.0, 0.0], dtype=np.float32)
 
+    # Objects currently bound in the GL context. There is one context per game so the state
+    # is kept on the class, letting code without a Graphics (eg. Texture) bind through it too
+    _bound_program = None
+    _bound_vao = None
+    _active_texture_unit = None
+    _bound_textures = {}
+    state_hits = 0
+    state_misses = 0
+    last_frame_state_hits = 0
+    last_frame_state_misses = 0
+
     def __init__(self, display_width_over_height: float):
         self.display_ratio = 1.0 / display_width_over_height
         self._programs = {}
@@ -45,6 +67,20 @@ class Graphics:
         self.projection_mat = MATRIX_ORTHO
         self.camera = Camera()
 
+        # Created on first use by SpriteBatch.get, see flush_batch
+        self.sprite_batch = None
+        self.active_batch = None
+
+        # One unit quad shared by everything, see get_quad_vao
+        self._quad_vaos = {}
+        self.quad_vbo = glGenBuffers(1)
+        glBindBuffer(GL_ARRAY_BUFFER, self.quad_vbo)
+        glBufferData(GL_ARRAY_BUFFER, Graphics.DEFAULT_RECTANGLE.nbytes, Graphics.DEFAULT_RECTANGLE, GL_STATIC_DRAW)
+        # Filled through the array target, element array bindings belong to whichever vertex array is bound
+        self.quad_ebo = glGenBuffers(1)
+        glBindBuffer(GL_ARRAY_BUFFER, self.quad_ebo)
+        glBufferData(GL_ARRAY_BUFFER, self.default_indices.nbytes, self.default_indices, GL_STATIC_DRAW)
+
         # Pre-compile multiple shaders for general purpose drawing
         self._programs[Shader.TEXTURE] = compileProgram(
             compileShader(self.builtin_shader(Shader.TEXTURE, ShaderType.VERTEX), GL_VERTEX_SHADER), 
@@ -61,11 +97,165 @@ class Graphics:
             compileShader(self.builtin_shader(Shader.FONT, ShaderType.PIXEL), GL_FRAGMENT_SHADER)
         )
 
+        # Distance field fonts share the font vertex shader
+        self._programs[Shader.FONT_SDF] = compileProgram(
+            compileShader(self.builtin_shader(Shader.FONT, ShaderType.VERTEX), GL_VERTEX_SHADER), 
+            compileShader(self.builtin_shader(Shader.FONT_SDF, ShaderType.PIXEL), GL_FRAGMENT_SHADER)
+        )
+
         self._programs[Shader.ANIM] = compileProgram(
             compileShader(self.builtin_shader(Shader.ANIM, ShaderType.VERTEX), GL_VERTEX_SHADER), 
             compileShader(self.builtin_shader(Shader.ANIM, ShaderType.PIXEL), GL_FRAGMENT_SHADER)
         )
 
+        # Shared by every atlas page
+        self._programs[Shader.TEXTURE_ATLAS] = compileProgram(
+            compileShader(self.builtin_shader(Shader.TEXTURE_ATLAS, ShaderType.VERTEX), GL_VERTEX_SHADER), 
+            compileShader(self.builtin_shader(Shader.TEXTURE_ATLAS, ShaderType.PIXEL), GL_FRAGMENT_SHADER)
+        )
+
+        # Instanced variants of the colour and texture shaders used by the sprite batch
+        self._programs[Shader.SPRITE_COLOUR] = compileProgram(
+            compileShader(self.builtin_shader(Shader.SPRITE_COLOUR, ShaderType.VERTEX), GL_VERTEX_SHADER), 
+            compileShader(self.builtin_shader(Shader.SPRITE_COLOUR, ShaderType.PIXEL), GL_FRAGMENT_SHADER)
+        )
+
+        self._programs[Shader.SPRITE_TEXTURE] = compileProgram(
+            compileShader(self.builtin_shader(Shader.SPRITE_TEXTURE, ShaderType.VERTEX), GL_VERTEX_SHADER), 
+            compileShader(self.builtin_shader(Shader.SPRITE_TEXTURE, ShaderType.PIXEL), GL_FRAGMENT_SHADER)
+        )
+
+
+    @staticmethod
+    def use_program(program: int):
+        """glUseProgram, skipped when the program is already in use."""
+        if program == Graphics._bound_program:
+            Graphics.state_hits += 1
+            return
+        Graphics.state_misses += 1
+        Graphics._bound_program = program
+        glUseProgram(program)
+
+
+    @staticmethod
+    def bind_texture(texture_id: int, unit: int=0, target=GL_TEXTURE_2D):
+        """Bind a texture to a texture unit, skipping the glActiveTexture and glBindTexture calls
+        for whichever of the two is already current. The unit is left active even when the texture
+        was already bound, so uploads straight after this go to the texture that was asked for."""
+        if unit != Graphics._active_texture_unit:
+            Graphics._active_texture_unit = unit
+            glActiveTexture(GL_TEXTURE0 + unit)
+        if Graphics._bound_textures.get((unit, target)) == texture_id:
+            Graphics.state_hits += 1
+            return
+        Graphics.state_misses += 1
+        Graphics._bound_textures[(unit, target)] = texture_id
+        glBindTexture(target, texture_id)
+
+
+    @staticmethod
+    def delete_texture(texture_id: int):
+        """Delete a texture and forget any unit it was bound to, GL is free to hand the id out again."""
+        glDeleteTextures([texture_id])
+        for binding, bound_id in list(Graphics._bound_textures.items()):
+            if bound_id == texture_id:
+                del Graphics._bound_textures[binding]
+
+
+    @staticmethod
+    def bind_vao(vao: int):
+        """glBindVertexArray, skipped when the vertex array is already bound."""
+        if vao == Graphics._bound_vao:
+            Graphics.state_hits += 1
+            return
+        Graphics.state_misses += 1
+        Graphics._bound_vao = vao
+        glBindVertexArray(vao)
+
+
+    @staticmethod
+    def reset_state():
+        """Forget what is bound, for after GL state has been changed without going through Graphics."""
+        Graphics._bound_program = None
+        Graphics._bound_vao = None
+        Graphics._active_texture_unit = None
+        Graphics._bound_textures = {}
+
+
+    @staticmethod
+    def end_frame():
+        """Keep this frame's count of skipped (hits) and issued (misses) state changes and start the next."""
+        Graphics.last_frame_state_hits = Graphics.state_hits
+        Graphics.last_frame_state_misses = Graphics.state_misses
+        Graphics.state_hits = 0
+        Graphics.state_misses = 0
+
+
+    def get_quad_vao(self, program: int, instance_buffer: int=None, instance_attributes: list=None) -> int:
+        """Return the vertex array that draws the shared unit quad through a program's VertexPosition
+        and TexCoord inputs. There is one per program, or per program and instance buffer where
+        instance_attributes is a list of (name, num_floats) that advance once per instance.
+        Sprites using the same program share the vertex array rather than owning their own."""
+        key = (program, instance_buffer)
+        if key in self._quad_vaos:
+            return self._quad_vaos[key]
+
+        vao = glGenVertexArrays(1)
+        Graphics.bind_vao(vao)
+        glBindBuffer(GL_ARRAY_BUFFER, self.quad_vbo)
+        glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, self.quad_ebo)
+
+        vertex_pos_id = glGetAttribLocation(program, "VertexPosition")
+        if vertex_pos_id >= 0:
+            glVertexAttribPointer(vertex_pos_id, 2, GL_FLOAT, GL_FALSE, 8, ctypes.c_void_p(0))
+            glEnableVertexAttribArray(vertex_pos_id)
+
+        tex_coord_id = glGetAttribLocation(program, "TexCoord")
+        if tex_coord_id >= 0:
+            glVertexAttribPointer(tex_coord_id, 2, GL_FLOAT, GL_FALSE, 8, ctypes.c_void_p(32))
+            glEnableVertexAttribArray(tex_coord_id)
+
+        if instance_buffer is not None:
+            glBindBuffer(GL_ARRAY_BUFFER, instance_buffer)
+            stride = sum(num_floats for _, num_floats in instance_attributes) * 4
+            offset = 0
+            for attribute_name, num_floats in instance_attributes:
+                attribute_id = glGetAttribLocation(program, attribute_name)
+                if attribute_id >= 0:
+                    glVertexAttribPointer(attribute_id, num_floats, GL_FLOAT, GL_FALSE, stride, ctypes.c_void_p(offset))
+                    glEnableVertexAttribArray(attribute_id)
+                    glVertexAttribDivisor(attribute_id, 1)
+                offset += num_floats * 4
+
+        self._quad_vaos[key] = vao
+        return vao
+
+
+    def release_quad_vao(self, program: int, instance_buffer: int):
+        """Delete the vertex array made for an instance buffer that is about to be deleted."""
+        vao = self._quad_vaos.pop((program, instance_buffer), None)
+        if vao is None:
+            return
+        if vao == Graphics._bound_vao:
+            Graphics._bound_vao = None
+        glDeleteVertexArrays(1, [vao])
+
+
+    def begin_batch(self, batch):
+        """Called by a batch, such as the sprite batch or a font, before it queues a draw.
+        Another batch with draws waiting is flushed first so batches keep the order they were drawn in."""
+        if self.active_batch is not batch:
+            self.flush_batch()
+            self.active_batch = batch
+
+
+    def flush_batch(self):
+        """Draw whatever is waiting in the active batch. Anything that draws without a batch
+        calls this first so it lands on top of the sprites and text submitted before it."""
+        if self.active_batch is not None:
+            self.active_batch.flush()
+            self.active_batch = None
+
 
     def set_perspective(self):
         self.projection_mat = MATRIX_PERSPECTIVE
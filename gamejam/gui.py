@@ -7,6 +7,7 @@ from gamejam.coord import Coord2d
 from gamejam.cursor import Cursor
 from gamejam.font import Font
 from gamejam.graphics import Graphics
+from gamejam.settings import GameSettings
 from gamejam.texture import SpriteTexture
 from gamejam.widget import Widget, Alignment, AlignX, AlignY
 from gamejam.gui_widget import GuiWidget, TouchState
@@ -16,10 +17,19 @@ class Gui(Widget):
     """Manager style functionality for a collection of widget classes.
     Also convenience functions for window handling and display of position hierarchy."""
 
-    def __init__(self, name: str, graphics: Graphics, debug_font: Font, restore_from_file: bool = True):
+    def __init__(self, name: str, graphics: Graphics, debug_font: Font, restore_from_file: bool = True, textures=None, fonts=None):
         super().__init__()
         self.name = name
         self.active_draw = False
+        # Atlas pages this gui draws from, loaded while it is drawn. Defaults to the texture subdirectory named after it
+        self.textures = textures
+        self.texture_pages = [name]
+        # Restored widgets get their fonts from here
+        self.fonts = fonts
+        # Page the text of child widgets is packed into and drawn from, None draws it with the fonts
+        self.text_atlas = None
+        if textures is not None and GameSettings.GUI_TEXT_IN_ATLAS:
+            self.text_atlas = textures.atlases.get(name, textures.atlas)
         self.active_input = False
         self.display_ratio = graphics.display_ratio
         self.debug_font = debug_font
@@ -40,6 +50,12 @@ class Gui(Widget):
         return self.active_draw, self.active_input
 
     def set_active(self, do_draw: bool, do_input: bool):
+        if self.textures is not None and do_draw != self.active_draw:
+            for page in self.texture_pages:
+                if do_draw:
+                    self.textures.acquire_page(page)
+                else:
+                    self.textures.release_page(page)
         self.active_draw = do_draw
         self.active_input = do_input
 
@@ -74,6 +90,11 @@ class Gui(Widget):
         self.add_child(widget)
         return widget
 
+    def add_child(self, child):
+        super().add_child(child)
+        if isinstance(child, GuiWidget) and child in self:
+            child.set_text_atlas(self.text_atlas)
+
     def get_widget(self, name:str) -> Widget:
         for child in self._children:
             if child.name == name:
@@ -83,6 +104,8 @@ class Gui(Widget):
     def delete_widget(self, widget: Widget):
         if widget in self._children:
             self._children.remove(widget)
+            if isinstance(widget, GuiWidget):
+                widget.release()
 
     def dump(self, stream):
         """Write hierachy to a yaml file, called by Gui editor"""
@@ -95,12 +118,12 @@ class Gui(Widget):
         obj = yaml.load(stream, Loader=yaml.Loader)
         if obj is not None and self.name in obj:
             widget_input = obj[self.name]
-            GuiWidget.deserialize(self, widget_input)
+            GuiWidget.deserialize(self, widget_input, self.fonts)
             if "children" in widget_input and type(widget_input["children"]) is list:
                 for child in widget_input["children"]:
                     child_name = next(iter(child))
                     child_widget = GuiWidget(child_name)
-                    GuiWidget.deserialize(child_widget, child[child_name])
+                    GuiWidget.deserialize(child_widget, child[child_name], self.fonts)
                     self.add_child(child_widget)
         else:
             logging.error(f"Widget load error! Trying to restore a widget named {self.name} from a stream called {stream.name}")
@@ -1,3 +1,4 @@
+from collections import OrderedDict
 import os
 from enum import Enum
 from pathlib import Path
@@ -8,7 +9,7 @@ from gamejam.gui_widget import TouchState
 from gamejam.texture import SpriteTexture
 from gamejam.coord import Coord2d
 from gamejam.cursor import Cursor
-from gamejam.font import Font
+from gamejam.font import Font, TextMesh
 from gamejam.input import Input, InputActionKey, InputActionModifier
 from gamejam.graphics import Graphics, Shader, ShaderType
 from gamejam.texture import SpriteTexture, Texture
@@ -42,6 +43,7 @@ class GuiEditMode(Enum):
 class GuiEditor():
     """Editor for a GUI to show properties of child widgets and add remove."""
     NUM_DEBUG_WIDGETS = 128
+    LABEL_CACHE_SIZE = 64
 
     def __init__(self, main_gui: Gui, graphics: Graphics, input: Input, font: Font):
         super().__init__()
@@ -50,6 +52,8 @@ class GuiEditor():
         self.gui = Gui("GuiEditor", graphics, font, False)
         self.display_ratio = graphics.display_ratio
         self.font = font
+        # Retained meshes for the most recently drawn labels by text and size
+        self._label_meshes = OrderedDict()
         self.edit_start_pos = Coord2d()
         self.debug_dirty = False
         self.gui_to_edit = None
@@ -352,6 +356,19 @@ class GuiEditor():
         if mouse.buttons[0] and touched_widget == False:
             self.deselect()
 
+    def _draw_label(self, text: str, size: int, pos: Coord2d, colour: list):
+        key = (text, size)
+        mesh = self._label_meshes.get(key)
+        if mesh is None:
+            mesh = TextMesh(self.font)
+            mesh.set_text(text, size)
+            self._label_meshes[key] = mesh
+            if len(self._label_meshes) > GuiEditor.LABEL_CACHE_SIZE:
+                self._label_meshes.popitem(last=False)[1].release()
+        else:
+            self._label_meshes.move_to_end(key)
+        mesh.draw(pos, colour)
+
     def _draw_gui_selection(self, gui: Gui, selection_draw_pos: Coord2d):
         title_draw_colour = [0.7] * 4
         selected_draw_colour = title_draw_colour[:]
@@ -360,11 +377,11 @@ class GuiEditor():
         # Draw siblings at this level
         start_draw_pos = selection_draw_pos
         if gui._parent is None:
-            self.font.draw(gui.name, 12, selection_draw_pos, selected_draw_colour if gui == self.gui_to_edit else title_draw_colour)
+            self._draw_label(gui.name, 12, selection_draw_pos, selected_draw_colour if gui == self.gui_to_edit else title_draw_colour)
         else:
             for sibling in gui._parent._children:
                 if type(sibling) is Gui:
-                    self.font.draw(sibling.name, 12, selection_draw_pos, selected_draw_colour if sibling == self.gui_to_edit else title_draw_colour)
+                    self._draw_label(sibling.name, 12, selection_draw_pos, selected_draw_colour if sibling == self.gui_to_edit else title_draw_colour)
                     selection_draw_pos += Coord2d(0.2)
 
         # Draw children underneath
@@ -374,7 +391,7 @@ class GuiEditor():
             selection_draw_pos.y -= 0.1
             for child in gui._children:
                 if type(child) is Gui:
-                    self.font.draw(child.name, 12, selection_draw_pos, selected_draw_colour if child == self.gui_to_edit else title_draw_colour)
+                    self._draw_label(child.name, 12, selection_draw_pos, selected_draw_colour if child == self.gui_to_edit else title_draw_colour)
                     selection_draw_pos += Coord2d(0.2)
 
     def draw(self, dt: float):
@@ -392,7 +409,7 @@ class GuiEditor():
             self.gui.draw(dt)
 
         selection_draw_pos = Coord2d(-0.75, 0.75)
-        self.font.draw(self.mode.name, 8, selection_draw_pos + Coord2d(0.0, 0.1), [1.0, 0.75, 1.0, 0.5])
+        self._draw_label(self.mode.name, 8, selection_draw_pos + Coord2d(0.0, 0.1), [1.0, 0.75, 1.0, 0.5])
         self._draw_gui_selection(self.main_gui, selection_draw_pos)
 
         def debug_widget_uniforms():
@@ -416,7 +433,7 @@ class GuiEditor():
             debug_children = {i: w for i, w in enumerate(self.gui_to_edit._children) if type(w) is not Gui}
             idx = 0
             for _, widget in debug_children.items():
-                self.font.draw(widget.name, 8, widget._draw_pos, [0.75] * 4)
+                self._draw_label(widget.name, 8, widget._draw_pos, [0.75] * 4)
                 if widget == self.widget_to_edit:
                     selected_widget_id = idx
                 if widget == self.widget_to_hover:
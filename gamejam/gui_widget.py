@@ -1,11 +1,12 @@
 import enum
 import logging
+from pathlib import Path
 from gamejam.animation import AnimType, Animation
 from gamejam.graphics import Shader
 from gamejam.texture import SpriteTexture
 from gamejam.coord import Coord2d
 from gamejam.cursor import Cursor
-from gamejam.font import Font
+from gamejam.font import Font, TextMesh
 from gamejam.widget import Widget, Alignment, AlignX, AlignY
 
 
@@ -49,8 +50,23 @@ class GuiWidget(Widget):
         self._text_dimensions = None
         # Pen offset relative to widget center; absolute pos is _draw_pos + this.
         self._text_local_pos = Coord2d()
+        self._text_mesh = None
+        # Set by the Gui when text is drawn from its atlas page along with the sprites
+        self.text_atlas = None
         self._size_to_text = False
 
+    def add_child(self, child):
+        super().add_child(child)
+        if isinstance(child, GuiWidget) and child in self:
+            child.set_text_atlas(self.text_atlas)
+
+    def set_text_atlas(self, atlas):
+        """Draw the text of this widget and everything under it from an atlas page, or with the fonts if None."""
+        self.text_atlas = atlas
+        for child in self._children:
+            if isinstance(child, GuiWidget):
+                child.set_text_atlas(atlas)
+
     def set_size_to_text(self, enabled:bool=True):
         if enabled != self._size_to_text:
             self._dirty = True
@@ -81,7 +97,9 @@ class GuiWidget(Widget):
                 output["text_col"] = str(widget.text_col)
                 output["text_offset"] = str(widget.text_offset)
                 output["text_size"] = str(widget.text_size)
-                output["font"] = widget.font.filename
+                # The default font is left out, its path is different on every machine
+                if widget.font.filename != Font.DEFAULT_FILENAME:
+                    output["font"] = Path(widget.font.filename).as_posix()
 
         for child_widget in widget._children:
             child_object = {}
@@ -89,7 +107,7 @@ class GuiWidget(Widget):
             output[widget.name]["children"].append(child_object)
 
     @staticmethod
-    def deserialize(widget: Widget, input):
+    def deserialize(widget: Widget, input, fonts=None):
         if "offset" in input:
             widget._offset.from_string(input["offset"])
         if "size" in input:
@@ -102,8 +120,8 @@ class GuiWidget(Widget):
             gw = widget
             if "text" in input:
                 GuiWidget.text = input["text"]
-            if "font" in input:
-                gw.font
+            if ("font" in input or "text" in input) and fonts is not None:
+                gw.font = fonts.get(input.get("font"))
 
     def set_sprite(self, sprite: SpriteTexture, stretch:bool=False):
         """The widget now controls the sprite's position."""
@@ -329,4 +347,27 @@ class GuiWidget(Widget):
             if self.hover:
                 text_pos += Coord2d(0.005, -0.005)
 
-            self.font.draw(self.text, self.text_size, text_pos, self.text_col)
+            if self.text_atlas is not None and not self.font.sdf:
+                self.release_text()
+                self.text_atlas.draw_text(self.font, self.text, self.text_size, text_pos, self.text_col)
+            else:
+                # The glyphs stay on the GPU and are only laid out again when the text or size change
+                if self._text_mesh is not None and self._text_mesh.font is not self.font:
+                    self.release_text()
+                if self._text_mesh is None:
+                    self._text_mesh = TextMesh(self.font)
+                self._text_mesh.set_text(self.text, self.text_size)
+                self._text_mesh.draw(text_pos, self.text_col)
+
+    def release_text(self):
+        """Free the GPU copy of this widget's text, it is built again if the widget is drawn."""
+        if self._text_mesh is not None:
+            self._text_mesh.release()
+            self._text_mesh = None
+
+    def release(self):
+        """Free what this widget and everything under it holds on the GPU, for when it is removed."""
+        self.release_text()
+        for child in self._children:
+            if isinstance(child, GuiWidget):
+                child.release()
@@ -0,0 +1,74 @@
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+from PIL import Image
+import numpy as np
+
+
+def image_to_rgba(image: Image.Image) -> np.ndarray:
+    """Normalise any PIL image mode (RGB, P, LA, L etc) to a contiguous height x width x 4
+    uint8 array. The pixels are exported through the buffer protocol so there is no per-pixel
+    Python work, the result can be handed straight to glTexImage2D or an atlas blit."""
+    if image.mode != "RGBA":
+        image = image.convert("RGBA")
+    return np.ascontiguousarray(np.asarray(image, dtype=np.uint8))
+
+
+def load_rgba(path: Path) -> np.ndarray:
+    """Decode an image file from disk into a contiguous RGBA array."""
+    with Image.open(path) as image:
+        return image_to_rgba(image)
+
+
+def load_rgba_many(paths: list, workers: int=0, use_processes: bool=False):
+    """Decode files on a pool of threads (PIL releases the GIL while decoding) or processes,
+    workers of 0 uses one per core. Yields the arrays in the same order as paths so anything
+    packed from them is laid out the same way every run. Process pools need the game's entry
+    point to be guarded by if __name__ == "__main__" on platforms that spawn."""
+    if workers == 1 or len(paths) <= 1:
+        for path in paths:
+            yield load_rgba(path)
+        return
+
+    pool_type = ProcessPoolExecutor if use_processes else ThreadPoolExecutor
+    with pool_type(max_workers=workers if workers > 0 else None) as pool:
+        yield from pool.map(load_rgba, paths)
+
+
+def trim_rgba(data: np.ndarray) -> tuple:
+    """Crop away fully transparent rows and columns around an RGBA image.
+    Returns a view of the opaque region and the (x, y) of it's top left in the source.
+    A completely transparent image keeps a single pixel so it still has a size."""
+    alpha = data[..., 3]
+    rows = np.flatnonzero(alpha.any(axis=1))
+    if len(rows) == 0:
+        return data[:1, :1], (0, 0)
+    cols = np.flatnonzero(alpha.any(axis=0))
+    top, bottom = rows[0], rows[-1] + 1
+    left, right = cols[0], cols[-1] + 1
+    return data[top:bottom, left:right], (int(left), int(top))
+
+
+def signed_distance_field(coverage: np.ndarray, spread: int) -> np.ndarray:
+    """Turn an 8 bit coverage bitmap into a distance field padded by spread pixels on every side.
+    Each pixel is the distance to the nearest edge, 128 on the edge, brighter inside and reaching
+    0 or 255 spread pixels away, so it can be scaled up or down and thresholded at 0.5 when drawn."""
+    inside = np.pad(coverage >= 128, spread)
+    height, width = inside.shape
+    far = float(spread + 1)
+    to_inside = np.full((height, width), far, dtype=np.float32)
+    to_outside = np.full((height, width), far, dtype=np.float32)
+
+    # Brute force over every offset within the spread, fine for glyph sized images
+    shifted_from = np.pad(inside, spread)
+    for dy in range(-spread, spread + 1):
+        for dx in range(-spread, spread + 1):
+            distance = np.hypot(dx, dy)
+            if distance == 0.0 or distance > spread:
+                continue
+            shifted = shifted_from[spread + dy:spread + dy + height, spread + dx:spread + dx + width]
+            np.minimum(to_inside, np.where(shifted, distance, far), out=to_inside)
+            np.minimum(to_outside, np.where(shifted, far, distance), out=to_outside)
+
+    # The edge lies half way between an inside pixel and its outside neighbour
+    signed = np.where(inside, to_outside - 0.5, 0.5 - to_inside)
+    return np.clip(np.round(128.0 + signed * (127.0 / spread)), 0, 255).astype(np.uint8)
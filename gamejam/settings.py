@@ -3,3 +3,22 @@ class GameSettings:
 
     DEV_MODE = True
     VSYNC = 0
+    DECODE_WORKERS = 0
+    DECODE_PROCESSES = False
+    CACHE_PATH = ".cache"
+    CAPTURE_PATH = "captures"
+    TEXTURE_BUDGET_BYTES = 256 * 1024 * 1024
+    TEXTURE_UPLOAD_MS = 2.0
+    TEXTURE_UPLOAD_BYTES = 8 * 1024 * 1024
+    ATLAS_COMPACT_MOVES = 4
+    ATLAS_INITIAL_SIZE = 256
+    ATLAS_MAX_SIZE = 4096
+    # MEMORY, MAPPED or NONE to drop the atlas CPU copy once it is uploaded
+    ATLAS_SHADOW = "MEMORY"
+    ATLAS_PAGE_BUDGET_BYTES = 128 * 1024 * 1024
+    # Group batched sprites by program and texture, fewer draws but overlapping sprites can swap order
+    SPRITE_BATCH_SORT = False
+    # Draw text from a signed distance field font that is sharp at any size
+    FONT_SDF = False
+    # Pack glyphs into each Gui's atlas page so its sprites and text draw together in one call
+    GUI_TEXT_IN_ATLAS = False
@@ -1,13 +1,13 @@
 #version 430
 
-in vec2 OutTexCoord;     
+in vec2 OutTexCoord;
+in vec4 OutColour;
 uniform sampler2D SamplerTex;
-uniform vec4 Colour;
 out vec4 outColour;
 
 void main() 
 {
-    vec4 char_col = Colour;
+    vec4 char_col = OutColour;
     char_col.a = texture(SamplerTex, OutTexCoord).r;
     outColour = char_col;
 }
\ No newline at end of file
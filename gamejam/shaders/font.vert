@@ -2,16 +2,22 @@
 
 in vec2 VertexPosition;
 in vec2 TexCoord;
-uniform vec2 Position;
-uniform vec2 Size;
+
+// One instance per glyph, the rect is the glyph's corner and size in the font texture
+in vec2 InstancePosition;
+in vec2 InstanceSize;
+in vec4 InstanceCharRect;
+in vec4 InstanceColour;
+
+// Moves and colours a whole retained text mesh, zero and white for batched text
+uniform vec2 Offset;
+uniform vec4 Tint;
+
 out vec2 OutTexCoord;
-uniform vec2 CharCoord;
-uniform vec2 CharSize;
-uniform mat4 ObjectMatrix;
-uniform mat4 ViewMatrix;
-uniform mat4 ProjectionMatrix;
+out vec4 OutColour;
 void main() 
 {
-    gl_Position = vec4(Position.x + Size.x * VertexPosition.x, Position.y + Size.y * VertexPosition.y, 0.0, 1.0);
-    OutTexCoord = vec2(CharCoord.x + TexCoord.x * CharSize.x, CharCoord.y + TexCoord.y * CharSize.y);
+    gl_Position = vec4(Offset + InstancePosition + InstanceSize * VertexPosition, 0.0, 1.0);
+    OutTexCoord = InstanceCharRect.xy + TexCoord * InstanceCharRect.zw;
+    OutColour = InstanceColour * Tint;
 }
\ No newline at end of file
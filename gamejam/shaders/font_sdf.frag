@@ -0,0 +1,17 @@
+#version 430
+
+in vec2 OutTexCoord;
+in vec4 OutColour;
+uniform sampler2D SamplerTex;
+out vec4 outColour;
+
+void main() 
+{
+    // The texture holds distance to the glyph edge, 0.5 on the edge. Smoothing over one
+    // screen pixel's change in distance keeps edges sharp and anti-aliased at any size
+    float dist = texture(SamplerTex, OutTexCoord).r;
+    float smoothing = max(fwidth(dist) * 0.5, 0.001);
+    vec4 char_col = OutColour;
+    char_col.a = smoothstep(0.5 - smoothing, 0.5 + smoothing, dist);
+    outColour = char_col;
+}
\ No newline at end of file
@@ -0,0 +1,9 @@
+#version 430
+
+in vec4 OutColour;
+out vec4 outColour;
+
+void main() 
+{
+    outColour = OutColour;
+}
\ No newline at end of file
@@ -0,0 +1,18 @@
+#version 430
+
+in vec2 VertexPosition;
+
+// One instance per batched sprite
+in vec2 InstancePosition;
+in vec2 InstanceSize;
+in vec4 InstanceColour;
+
+out vec4 OutColour;
+uniform mat4 ViewMatrix;
+uniform mat4 ProjectionMatrix;
+void main() 
+{
+    vec4 Pos = vec4(InstancePosition + InstanceSize * VertexPosition, 0.0, 1.0);
+    gl_Position = ProjectionMatrix * ViewMatrix * Pos;
+    OutColour = InstanceColour;
+}
\ No newline at end of file
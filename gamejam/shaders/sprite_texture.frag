@@ -0,0 +1,11 @@
+#version 430
+
+in vec2 OutTexCoord;
+in vec4 OutColour;
+uniform sampler2D SamplerTex;
+out vec4 outColour;
+
+void main()
+{
+    outColour = texture(SamplerTex, OutTexCoord) * OutColour;
+}
\ No newline at end of file
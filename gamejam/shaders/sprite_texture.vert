@@ -0,0 +1,18 @@
+#version 430
+
+in vec2 VertexPosition;
+in vec2 TexCoord;
+
+// One instance per batched sprite
+in vec2 InstancePosition;
+in vec2 InstanceSize;
+in vec4 InstanceColour;
+
+out vec2 OutTexCoord;
+out vec4 OutColour;
+void main() 
+{
+    gl_Position = vec4(InstancePosition + InstanceSize * VertexPosition, 0.0, 1.0);
+    OutTexCoord = TexCoord;
+    OutColour = InstanceColour;
+}
\ No newline at end of file
@@ -1,17 +1,34 @@
 #version 430
 
+#define NO_TEXTURE_INDEX -1
+#define PAGE_INDEX -2
+
 in vec2 VertexPosition;
 in vec2 TexCoord;
 
-uniform vec2 Position;
-uniform vec2 Size;
+// One instance per atlas draw, Item indexes the table of item rects
+in vec2 InstancePosition;
+in vec2 InstanceSize;
+in vec4 InstanceColour;
+in float InstanceItem;
+
+// Normalised top left and size of every item in the atlas
+uniform samplerBuffer ItemRects;
+
 out vec2 OutTexCoord;
+out vec4 OutColour;
+flat out int OutTextured;
 
-uniform mat4 ObjectMatrix;
-uniform mat4 ViewMatrix;
-uniform mat4 ProjectionMatrix;
 void main() 
 {
-    gl_Position = vec4(Position.x + Size.x * VertexPosition.x, Position.y + Size.y * VertexPosition.y, 0.0, 1.0);
-    OutTexCoord = TexCoord;
+    int item = int(InstanceItem);
+    vec4 uv_rect = vec4(0.0, 0.0, 1.0, 1.0);
+    if (item >= 0) {
+        uv_rect = texelFetch(ItemRects, item);
+    }
+
+    gl_Position = vec4(InstancePosition + InstanceSize * VertexPosition, 0.0, 1.0);
+    OutTexCoord = uv_rect.xy + TexCoord * uv_rect.zw;
+    OutColour = InstanceColour;
+    OutTextured = item == NO_TEXTURE_INDEX ? 0 : 1;
 }
\ No newline at end of file
@@ -1,14 +1,23 @@
-from copy import copy
+from collections import OrderedDict
+from concurrent.futures import Future
+import ctypes
 from dataclasses import dataclass
+from enum import Enum
+import logging
 from OpenGL.GL import *
 import os.path
 from pathlib import Path
-from PIL import Image
+import tempfile
 import numpy as np
 
+from gamejam.atlas_cache import AtlasCache
+from gamejam.atlas_packer import AtlasPacker, PackRect, PackStats, PackStrategy
 from gamejam.coord import Coord2d
-from gamejam.graphics import Graphics, Shader, ShaderType
+from gamejam.image import load_rgba, load_rgba_many, trim_rgba
+from gamejam.graphics import Graphics, Shader
 from gamejam.settings import GameSettings
+from gamejam.texture_loader import TextureLoader
+from gamejam.texture_residency import ResidencyStats, TextureResidency
 from gamejam.quickmaff import MATRIX_IDENTITY
 
 
@@ -24,45 +33,55 @@ class Texture:
 
     @staticmethod
     def get_random_texture(width:int, height:int) -> np.array:
-        tex = []
-        for _ in range(width * height):
-            tex += Texture.get_random_pixel()
-        return np.array(tex)
-
-    @staticmethod
-    def create_buffers(graphics):
-        # Create array object
-        vao = glGenVertexArrays(1)
-        glBindVertexArray(vao)
-
-        # Create Buffer object in gpu
-        vbo = glGenBuffers(1)
-
-        # Bind the buffer
-        glBindBuffer(GL_ARRAY_BUFFER, vbo)
-        glBufferData(GL_ARRAY_BUFFER, 64, Graphics.DEFAULT_RECTANGLE, GL_STATIC_DRAW)
-
-        # Create EBO
-        ebo = glGenBuffers(1)
-        glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, ebo)
-        glBufferData(GL_ELEMENT_ARRAY_BUFFER, 24, graphics.default_indices, GL_STATIC_DRAW)
-
-        return vao, vbo, ebo
-
-    def __init__(self, texture_path: str, default_width:int=32, default_height:int=32, wrap:bool=True):
-        if os.path.exists(texture_path):
-            self.image = Image.open(texture_path)
-            self.width = self.image.width
-            self.height = self.image.height
-            self.img_data = np.array(list(self.image.getdata()), np.uint8)
-        else:
-            self.img_data = Texture.get_random_texture(default_width, default_height)
-            self.width = default_width
-            self.height = default_height
-        self.texture_id = glGenTextures(1)
-
-        glBindTexture(GL_TEXTURE_2D, self.texture_id)
-        if wrap:
+        return np.random.randint(0, 255, (height, width, 4), dtype=np.uint8)
+
+    def __init__(self, texture_path: str, default_width:int=32, default_height:int=32, wrap:bool=True, residency=None,
+                 defer_load:bool=False):
+        self.path = texture_path
+        self.wrap = wrap
+        self.residency = residency
+        self.width = default_width
+        self.height = default_height
+        self._texture_id = None
+        if not defer_load:
+            self.load()
+
+    @property
+    def texture_id(self) -> int:
+        """The GL texture, loaded again first if it was evicted to stay within the residency budget."""
+        if self._texture_id is None:
+            self.load()
+        elif self.residency is not None:
+            self.residency.touch(self)
+        return self._texture_id
+
+    @property
+    def num_bytes(self) -> int:
+        return self.width * self.height * 4
+
+    @property
+    def loaded(self) -> bool:
+        return self._texture_id is not None
+
+    def load(self):
+        self.upload(self.decode())
+
+    def decode(self) -> np.ndarray:
+        """Read the pixels without touching GL, safe to call from a worker thread.
+        A missing file gets random pixels at the default size."""
+        if os.path.exists(self.path):
+            return load_rgba(self.path)
+        return Texture.get_random_texture(self.width, self.height)
+
+    def upload(self, img_data: np.ndarray):
+        """Create the GL texture from decoded pixels, nothing happens if it is already loaded."""
+        if self._texture_id is not None:
+            return
+        self.height, self.width = img_data.shape[0], img_data.shape[1]
+        self._texture_id = glGenTextures(1)
+
+        Graphics.bind_texture(self._texture_id)
+        if self.wrap:
             glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_S, GL_REPEAT)
             glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_T, GL_REPEAT)
         else:
@@ -70,7 +89,220 @@ class Texture:
             glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_T, GL_CLAMP)
         glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_LINEAR)
         glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
-        glTexImage2D(GL_TEXTURE_2D, 0, GL_RGBA, self.width, self.height, 0, GL_RGBA, GL_UNSIGNED_BYTE, self.img_data)
+        glTexImage2D(GL_TEXTURE_2D, 0, GL_RGBA, self.width, self.height, 0, GL_RGBA, GL_UNSIGNED_BYTE, img_data)
+
+        if self.residency is not None:
+            self.residency.add(self)
+
+    def unload(self):
+        """Free the GL texture, it is loaded again from the file the next time it is used."""
+        if self.residency is not None:
+            self.residency.remove(self)
+        if self._texture_id is not None:
+            Graphics.delete_texture(self._texture_id)
+            self._texture_id = None
+
+class DynamicTexture:
+    """A texture painted on the CPU while the game runs, eg. a minimap or a waveform.
+    Change pixels with write or edit them in place and call mark_dirty, only the dirty regions
+    are streamed to the GPU the next time the texture is used. Uploads alternate between two
+    pixel buffers so filling one never waits for the GPU to finish reading the other."""
+    NumBuffers = 2
+
+    def __init__(self, width: int, height: int, wrap: bool=False):
+        self.width = width
+        self.height = height
+        self.wrap = wrap
+        self.pixels = np.zeros((height, width, 4), dtype=np.uint8)
+        self.num_uploads = 0
+        self.uploaded_bytes = 0
+        self._dirty_rects = []
+        self._buffer_index = 0
+        self._texture_id = None
+        self.pixel_buffers = None
+        self.load()
+
+    @property
+    def texture_id(self) -> int:
+        """The GL texture, created again if it was unloaded and with any dirty regions uploaded first."""
+        if self._texture_id is None or len(self._dirty_rects) > 0:
+            self.upload()
+        return self._texture_id
+
+    @property
+    def loaded(self) -> bool:
+        return self._texture_id is not None
+
+    def load(self):
+        """Create the texture and pixel buffers, the whole texture is sent on the next upload."""
+        if self._texture_id is not None:
+            return
+        self._texture_id = glGenTextures(1)
+        Graphics.bind_texture(self._texture_id)
+        wrap_mode = GL_REPEAT if self.wrap else GL_CLAMP
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_S, wrap_mode)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_T, wrap_mode)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_LINEAR)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
+        glTexImage2D(GL_TEXTURE_2D, 0, GL_RGBA, self.width, self.height, 0, GL_RGBA, GL_UNSIGNED_BYTE, None)
+
+        self.pixel_buffers = glGenBuffers(DynamicTexture.NumBuffers)
+        for buffer in self.pixel_buffers:
+            glBindBuffer(GL_PIXEL_UNPACK_BUFFER, buffer)
+            glBufferData(GL_PIXEL_UNPACK_BUFFER, self.pixels.nbytes, None, GL_STREAM_DRAW)
+        glBindBuffer(GL_PIXEL_UNPACK_BUFFER, 0)
+        self._buffer_index = 0
+        self._dirty_rects = []
+        self.mark_dirty()
+
+    @property
+    def num_bytes(self) -> int:
+        return self.pixels.nbytes
+
+    def write(self, x: int, y: int, pixels: np.ndarray):
+        """Copy a row major height x width x 4 image in with it's top left corner at x, y."""
+        height, width = pixels.shape[0], pixels.shape[1]
+        self.pixels[y:y + height, x:x + width] = pixels
+        self.mark_dirty(x, y, width, height)
+
+    def fill(self, colour: list):
+        self.pixels[:] = colour
+        self.mark_dirty()
+
+    def mark_dirty(self, x: int=0, y: int=0, width: int=None, height: int=None):
+        """Flag a region changed in place through pixels, the whole texture when no size is given."""
+        right = self.width if width is None else min(x + width, self.width)
+        bottom = self.height if height is None else min(y + height, self.height)
+        x, y = max(x, 0), max(y, 0)
+        if right > x and bottom > y:
+            self._dirty_rects.append((x, y, right - x, bottom - y))
+
+    def upload(self) -> int:
+        """Stream the dirty regions into the texture, returns the number of bytes sent."""
+        self.load()
+        if len(self._dirty_rects) == 0:
+            return 0
+
+        # Send the bounding box in one go when the dirty rects mostly fill it, else each on it's own
+        left = min(r[0] for r in self._dirty_rects)
+        top = min(r[1] for r in self._dirty_rects)
+        right = max(r[0] + r[2] for r in self._dirty_rects)
+        bottom = max(r[1] + r[3] for r in self._dirty_rects)
+        dirty_area = sum(r[2] * r[3] for r in self._dirty_rects)
+        rects = self._dirty_rects
+        if dirty_area * 2 >= (right - left) * (bottom - top):
+            rects = [(left, top, right - left, bottom - top)]
+        self._dirty_rects = []
+
+        # Orphan the buffer used two uploads ago so the driver hands back fresh storage rather than waiting
+        buffer = self.pixel_buffers[self._buffer_index]
+        self._buffer_index = (self._buffer_index + 1) % DynamicTexture.NumBuffers
+        glBindBuffer(GL_PIXEL_UNPACK_BUFFER, buffer)
+        glBufferData(GL_PIXEL_UNPACK_BUFFER, self.pixels.nbytes, None, GL_STREAM_DRAW)
+
+        Graphics.bind_texture(self._texture_id)
+        offset = 0
+        for x, y, width, height in rects:
+            region = np.ascontiguousarray(self.pixels[y:y + height, x:x + width])
+            glBufferSubData(GL_PIXEL_UNPACK_BUFFER, offset, region.nbytes, region)
+            glTexSubImage2D(GL_TEXTURE_2D, 0, x, y, width, height, GL_RGBA, GL_UNSIGNED_BYTE, ctypes.c_void_p(offset))
+            offset += region.nbytes
+
+        # Leaving the buffer bound would make every other texture upload read from it
+        glBindBuffer(GL_PIXEL_UNPACK_BUFFER, 0)
+        self.num_uploads += 1
+        self.uploaded_bytes += offset
+        return offset
+
+    def unload(self):
+        """Free the texture and pixel buffers, the CPU pixels are kept and sent again the next time it is used."""
+        if self._texture_id is not None:
+            Graphics.delete_texture(self._texture_id)
+            glDeleteBuffers(DynamicTexture.NumBuffers, self.pixel_buffers)
+            self._texture_id = None
+            self.pixel_buffers = None
+            self._dirty_rects = []
+
+class SpriteBatch:
+    """Collects sprites drawn with the builtin shaders and draws them with one instanced call
+    per run of sprites that share a (program, texture), keeping the order they were submitted in.
+    With sorting on, sprites submitted between two flushes are grouped by state instead, which
+    draws less often but breaks painter's order where they overlap, see GameSettings.SPRITE_BATCH_SORT.
+    Anything drawn outside the batch (custom shaders, custom uniforms) calls Graphics.flush_batch
+    before it draws. Text is batched separately by each Font."""
+    # Per instance floats: position xy, size xy, colour rgba
+    InstanceFloats = 8
+    InstanceAttributes = [("InstancePosition", 2), ("InstanceSize", 2), ("InstanceColour", 4)]
+
+    @staticmethod
+    def get(graphics: Graphics):
+        """The batch shared by everything drawn with a graphics, created on first use."""
+        if graphics.sprite_batch is None:
+            graphics.sprite_batch = SpriteBatch(graphics, GameSettings.SPRITE_BATCH_SORT)
+        return graphics.sprite_batch
+
+    def __init__(self, graphics: Graphics, sort: bool=False):
+        self.graphics = graphics
+        self.sort = sort
+        self.num_sprites = 0
+        self.num_draws = 0
+        self.instance_data = np.zeros((256, SpriteBatch.InstanceFloats), dtype=np.float32)
+        self.state_keys = np.zeros(256, dtype=np.int64)
+
+        self.instance_vbo = glGenBuffers(1)
+        self.programs = {}
+        for shader in [Shader.SPRITE_COLOUR, Shader.SPRITE_TEXTURE]:
+            program = graphics.get_program(shader)
+            vao = graphics.get_quad_vao(program, self.instance_vbo, SpriteBatch.InstanceAttributes)
+            view_mat_id = glGetUniformLocation(program, "ViewMatrix")
+            projection_mat_id = glGetUniformLocation(program, "ProjectionMatrix")
+            self.programs[shader.value] = (program, vao, view_mat_id, projection_mat_id)
+
+    def add(self, shader: Shader, texture_id: int, pos: Coord2d, size: Coord2d, colour: list):
+        """Queue a sprite drawn by one of the batch programs, texture_id is ignored by SPRITE_COLOUR."""
+        self.graphics.begin_batch(self)
+        n = self.num_sprites
+        if n >= len(self.instance_data):
+            self.instance_data = np.concatenate([self.instance_data, np.zeros_like(self.instance_data)])
+            self.state_keys = np.concatenate([self.state_keys, np.zeros_like(self.state_keys)])
+        self.instance_data[n] = (pos.x, pos.y, size.x, size.y, colour[0], colour[1], colour[2], colour[3])
+        # GL hands out ids as numpy.uint32, which numpy 2 refuses to mix with a key wider than 32 bits
+        self.state_keys[n] = (shader.value << 32) | int(texture_id)
+        self.num_sprites += 1
+
+    def flush(self):
+        """Upload every queued sprite in one go then draw each run of the same state from it's slice."""
+        num_sprites = self.num_sprites
+        if num_sprites == 0:
+            return
+
+        instance_data = self.instance_data[:num_sprites]
+        state_keys = self.state_keys[:num_sprites]
+        if self.sort:
+            order = np.argsort(state_keys, kind="stable")
+            instance_data = instance_data[order]
+            state_keys = state_keys[order]
+        bucket_starts = np.concatenate([[0], np.flatnonzero(np.diff(state_keys)) + 1, [num_sprites]])
+
+        # Orphan the previous flush's storage so the driver never waits on draws still in flight
+        glBindBuffer(GL_ARRAY_BUFFER, self.instance_vbo)
+        glBufferData(GL_ARRAY_BUFFER, self.instance_data.nbytes, None, GL_STREAM_DRAW)
+        glBufferSubData(GL_ARRAY_BUFFER, 0, instance_data.nbytes, np.ascontiguousarray(instance_data))
+
+        for start, end in zip(bucket_starts[:-1], bucket_starts[1:]):
+            key = int(state_keys[start])
+            program, vao, view_mat_id, projection_mat_id = self.programs[key >> 32]
+            self.graphics.use_program(program)
+            if view_mat_id >= 0:
+                glUniformMatrix4fv(view_mat_id, 1, GL_TRUE, self.graphics.camera.mat)
+                glUniformMatrix4fv(projection_mat_id, 1, GL_TRUE, self.graphics.projection_mat)
+            if key >> 32 == Shader.SPRITE_TEXTURE.value:
+                self.graphics.bind_texture(key & 0xFFFFFFFF)
+            self.graphics.bind_vao(vao)
+            glDrawElementsInstancedBaseInstance(GL_TRIANGLES, 6, GL_UNSIGNED_INT, None, int(end - start), int(start))
+
+        self.num_draws = len(bucket_starts) - 1
+        self.num_sprites = 0
 
 class Sprite:
     def __init__(self, graphics: Graphics, colour: list, pos: Coord2d, size: Coord2d):
@@ -89,29 +321,9 @@ class Sprite:
 class SpriteShape(Sprite):
     def __init__(self, graphics: Graphics, colour: list, pos: Coord2d, size: Coord2d, shader=None):
         Sprite.__init__(self, graphics, colour, pos, size)
-
-        # Create array object
-        self.VAO = glGenVertexArrays(1)
-        glBindVertexArray(self.VAO)
-
-        # Create Buffer object in gpu
-        self.VBO = glGenBuffers(1)
-        self.rectangle = np.array([-0.5, -0.5, 0.5, -0.5, 0.5, 0.5, -0.5, 0.5], dtype=np.float32)
-
-        # Bind the buffer
-        glBindBuffer(GL_ARRAY_BUFFER, self.VBO)
-        glBufferData(GL_ARRAY_BUFFER, 32, self.rectangle, GL_STATIC_DRAW)
-
-        # Create EBO
-        self.EBO = glGenBuffers(1)
-        glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, self.EBO)
-        glBufferData(GL_ELEMENT_ARRAY_BUFFER, 24, self.graphics.default_indices, GL_STATIC_DRAW)
-
+        self.batched = shader is None
         self.shader = self.graphics.get_program(Shader.COLOUR) if shader is None else shader
-
-        self.vertex_pos_id = glGetAttribLocation(self.shader, "VertexPosition")
-        glVertexAttribPointer(self.vertex_pos_id, 2, GL_FLOAT, GL_FALSE, 8, ctypes.c_void_p(0))
-        glEnableVertexAttribArray(self.vertex_pos_id)
+        self.VAO = self.graphics.get_quad_vao(self.shader)
 
         self.colour_id = glGetUniformLocation(self.shader, "Colour")
         self.pos_id = glGetUniformLocation(self.shader, "Position")
@@ -122,7 +334,13 @@ class SpriteShape(Sprite):
 
 
     def draw(self, custom_uniforms_func=None):
-        glUseProgram(self.shader)
+        # Custom uniforms need a draw of their own, which breaks the batch
+        if self.batched and custom_uniforms_func is None:
+            SpriteBatch.get(self.graphics).add(Shader.SPRITE_COLOUR, 0, self.pos, self.size, self.colour)
+            return
+
+        self.graphics.flush_batch()
+        self.graphics.use_program(self.shader)
         glUniformMatrix4fv(self.object_mat_id, 1, GL_TRUE, self.object_mat)
         glUniformMatrix4fv(self.view_mat_id, 1, GL_TRUE, self.graphics.camera.mat)
         glUniformMatrix4fv(self.projection_mat, 1, GL_TRUE, self.graphics.projection_mat)
@@ -131,7 +349,7 @@ class SpriteShape(Sprite):
         glUniform2f(self.size_id, self.size.x, self.size.y)
         if custom_uniforms_func is not None:
             custom_uniforms_func()
-        glBindVertexArray(self.VAO)
+        self.graphics.bind_vao(self.VAO)
         glDrawElements(GL_TRIANGLES, 6, GL_UNSIGNED_INT, None)
 
 class SpriteTexture(Sprite):
@@ -142,17 +360,9 @@ class SpriteTexture(Sprite):
 
 
     def bind(self, shader=None):
+        self.batched = shader is None
         self.shader = self.graphics.get_program(Shader.TEXTURE) if shader is None else shader
-
-        self.VAO, self.VBO, self.EBO = Texture.create_buffers(self.graphics)
-
-        self.vertex_pos_id = glGetAttribLocation(self.shader, "VertexPosition")
-        glVertexAttribPointer(self.vertex_pos_id, 2, GL_FLOAT, GL_FALSE, 8, ctypes.c_void_p(0))
-        glEnableVertexAttribArray(self.vertex_pos_id)
-
-        self.tex_coord_id = glGetAttribLocation(self.shader, "TexCoord")
-        glVertexAttribPointer(self.tex_coord_id, 2, GL_FLOAT, GL_FALSE, 8, ctypes.c_void_p(32))
-        glEnableVertexAttribArray(self.tex_coord_id)
+        self.VAO = self.graphics.get_quad_vao(self.shader)
 
         self.colour_id = glGetUniformLocation(self.shader, "Colour")
         self.pos_id = glGetUniformLocation(self.shader, "Position")
@@ -163,7 +373,12 @@ class SpriteTexture(Sprite):
 
 
     def draw(self, custom_uniforms_func=None):
-        glUseProgram(self.shader)
+        if self.batched and custom_uniforms_func is None:
+            SpriteBatch.get(self.graphics).add(Shader.SPRITE_TEXTURE, self.texture.texture_id, self.pos, self.size, self.colour)
+            return
+
+        self.graphics.flush_batch()
+        self.graphics.use_program(self.shader)
         glUniformMatrix4fv(self.object_mat_id, 1, GL_TRUE, self.object_mat)
         glUniformMatrix4fv(self.view_mat_id, 1, GL_TRUE, self.graphics.camera.mat)
         glUniformMatrix4fv(self.projection_mat, 1, GL_TRUE, self.graphics.projection_mat)
@@ -172,9 +387,8 @@ class SpriteTexture(Sprite):
         glUniform2f(self.size_id, self.size.x, self.size.y)
         if custom_uniforms_func is not None:
             custom_uniforms_func()
-        glActiveTexture(GL_TEXTURE0)
-        glBindTexture(GL_TEXTURE_2D, self.texture.texture_id)
-        glBindVertexArray(self.VAO)
+        self.graphics.bind_texture(self.texture.texture_id)
+        self.graphics.bind_vao(self.VAO)
         glDrawElements(GL_TRIANGLES, 6, GL_UNSIGNED_INT, None)
 
 @dataclass(init=True)
@@ -183,89 +397,111 @@ class TextureAtlasItem:
     size: Coord2d
     pos: Coord2d
     index: int
+    source_size: Coord2d = None
+    trim_pos: Coord2d = None
+
+    def get_trimmed_rect(self, pos: Coord2d, size: Coord2d) -> tuple:
+        """Items have transparent borders trimmed away when packed, so shrink and move a draw
+        of the whole source image to cover only the part that is stored in the atlas."""
+        if self.source_size is None or self.source_size == self.size:
+            return pos, size
+        scale = Coord2d(size.x / self.source_size.x, size.y / self.source_size.y)
+        centre_x = self.trim_pos.x + (self.size.x - self.source_size.x) * 0.5
+        centre_y = self.trim_pos.y + (self.size.y - self.source_size.y) * 0.5
+        return Coord2d(pos.x + centre_x * scale.x, pos.y - centre_y * scale.y), self.size * scale
+
+class AtlasShadow(Enum):
+    """Where an atlas keeps the CPU copy of it's page that items are composited into.
+    MAPPED backs it with a temporary file so the OS can page it out, NONE drops it after
+    each commit and later edits are made on the GPU."""
+    MEMORY = 0
+    MAPPED = 1
+    NONE = 2
 
-@dataclass(init=True)
-class TextureAtlasDraw:
-    item: TextureAtlasItem
-    size: Coord2d
-    pos: Coord2d
-    col: list
 
 class TextureAtlas:
     """A texture atlas is a composite of multiple textures into one larger composite. 
-    The orignal textures can be accessed and drawn by name."""
-    MaxItems = 64
-    MaxDraws = 128
-    NoTextureIndex = MaxDraws + 1
-    
-    def __init__(self, graphics: Graphics, default_width:int=4096, default_height:int=4096):
+    The orignal textures can be accessed and drawn by name. The page starts small and
+    doubles in size as items are packed, up to the maximum size. Text can be drawn from a page
+    too, glyphs are packed as items when first used so a whole Gui renders in one draw."""
+    # Per instance floats: position xy, size xy, colour rgba, item index
+    InstanceFloats = 9
+    InstanceAttributes = [("InstancePosition", 2), ("InstanceSize", 2), ("InstanceColour", 4), ("InstanceItem", 1)]
+    # Item indices the shader treats specially, a plain coloured rect and the whole page
+    NoTextureIndex = -1
+    PageIndex = -2
+    ItemRectTextureUnit = 1
+
+    def __init__(self, graphics: Graphics, max_width:int=4096, max_height:int=4096,
+                 strategy: PackStrategy=PackStrategy.MAXRECTS, padding:int=1, trim:bool=True,
+                 initial_width:int=256, initial_height:int=256, shadow: AtlasShadow=AtlasShadow.MEMORY,
+                 allocate: bool=True):
+        """Without allocate the page texture and CPU copy are only created when the page first loads."""
         self.graphics = graphics
-        self.size = Coord2d(default_width, default_height)
-        self.img_data = np.zeros(4 * self.size.x * self.size.y, dtype=np.uint8)
+        self.max_size = Coord2d(max_width, max_height)
+        self.initial_size = Coord2d(min(initial_width, max_width), min(initial_height, max_height))
+        self.size = self.initial_size
+        self.strategy = strategy
+        self.packer = AtlasPacker.create(strategy, self.size.x, self.size.y, padding)
+        self.trim = trim
+        self.shadow = shadow
+        self.img_data = self._create_shadow(self.size.x, self.size.y) if allocate else None
+
+        # Files packed by load, unload frees everything and load packs them again
+        self.sources = {}
+        self.cache = None
+        self.loaded = False
 
         self.debug_atlas = False
         if self.debug_atlas:
-            fg_shape = Coord2d(int(self.size.x / 2), int(self.size.y))
             fg_col = np.array([255, 0, 0, 255], dtype=np.uint8)
-            debug_img_data = np.full((fg_shape.x, fg_shape.y, 4), fg_col, dtype=np.uint8)
-            TextureAtlas.blit(self.img_data, self.size, debug_img_data, fg_shape, Coord2d(0.0, 0.0))
+            debug_img_data = np.full((self.size.y, self.size.x // 2, 4), fg_col, dtype=np.uint8)
+            TextureAtlas.blit(self.img_data, debug_img_data, Coord2d(0, 0))
 
-        self.texture_id = glGenTextures(1)
+        self.texture_id = self._create_page_texture() if allocate else None
 
         self.texture_items: dict[TextureAtlasItem] = {}
-        self.item_pos = np.zeros(TextureAtlas.MaxDraws * 2, dtype=np.float32)
-        self.item_size = np.zeros(TextureAtlas.MaxDraws * 2, dtype=np.float32)
-
+        self._next_index = 0
+        self._free_indices = []
+        self._compacting = False
+        # Normalised x, y, width, height of each item, mirrored in a texture buffer for the shader
+        self.item_rects = np.zeros((256, 4), dtype=np.float32)
+        self._item_rects_dirty = True
+
+        # Draws recorded this frame, one row per instance. Doubles in size when full
         self.texture_draw_count = 0
-        self.draw_index = np.zeros(TextureAtlas.MaxDraws, dtype=np.int32)
-        self.draw_index.fill(-1)
-        self.draw_pos = np.zeros(TextureAtlas.MaxDraws * 2, dtype=np.float32)
-        self.draw_size = np.zeros(TextureAtlas.MaxDraws * 2, dtype=np.float32)
-        self.draw_col = np.zeros(TextureAtlas.MaxDraws * 4, dtype=np.float32)
-
-        self._next_pos = Coord2d()
-        self._next_largest = 0.0
+        self.draw_data = np.zeros((256, TextureAtlas.InstanceFloats), dtype=np.float32)
 
-        glBindTexture(GL_TEXTURE_2D, self.texture_id)
-        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_S, GL_CLAMP)
-        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_T, GL_CLAMP)
-        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_LINEAR)
-        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
-        glTexImage2D(GL_TEXTURE_2D, 0, GL_RGBA, self.size.x, self.size.y, 0, GL_RGBA, GL_UNSIGNED_BYTE, self.img_data)
-
-        self.object_mat = MATRIX_IDENTITY[:]
+        # Images waiting to be packed at commit and regions of the CPU image not uploaded yet
+        self._building = False
+        self._pending = []
+        self._pending_aliases = []
+        self._dirty_rects = []
 
-        shader_substitutes = {
-            "MAX_ATLAS_ITEMS": TextureAtlas.MaxItems,
-            "MAX_ATLAS_DRAWS": TextureAtlas.MaxDraws,
-        }
+        # Item index of each glyph slot of fonts drawn with draw_text, -1 for glyphs not packed yet
+        self._glyph_items = {}
 
-        atlas_shader = Graphics.process_shader_source(graphics.builtin_shader(Shader.TEXTURE_ATLAS, ShaderType.PIXEL), shader_substitutes)
-        self.shader = Graphics.create_program(graphics.builtin_shader(Shader.TEXTURE_ATLAS, ShaderType.VERTEX), atlas_shader)
-        self.graphics.set_program(Shader.TEXTURE_ATLAS, self.shader)
-
-        self.VAO, self.VBO, self.EBO = Texture.create_buffers(self.graphics)
+        if self.debug_atlas:
+            self._dirty_rects.append((0, 0, self.size.x, self.size.y))
+            self._flush_dirty_rects()
 
-        self.vertex_pos_id = glGetAttribLocation(self.shader, "VertexPosition")
-        glVertexAttribPointer(self.vertex_pos_id, 2, GL_FLOAT, GL_FALSE, 8, ctypes.c_void_p(0))
-        glEnableVertexAttribArray(self.vertex_pos_id)
+        # Every page draws with the one program compiled by Graphics
+        self.shader = self.graphics.get_program(Shader.TEXTURE_ATLAS)
 
-        self.tex_coord_id = glGetAttribLocation(self.shader, "TexCoord")
-        glVertexAttribPointer(self.tex_coord_id, 2, GL_FLOAT, GL_FALSE, 8, ctypes.c_void_p(32))
-        glEnableVertexAttribArray(self.tex_coord_id)
+        # The quad is shared by every instance, the per draw attributes advance once per instance
+        self.instance_vbo = glGenBuffers(1)
+        self.VAO = self.graphics.get_quad_vao(self.shader, self.instance_vbo, TextureAtlas.InstanceAttributes)
 
-        self.pos_id = glGetUniformLocation(self.shader, "Position")
-        self.size_id = glGetUniformLocation(self.shader, "Size")
-        self.object_mat_id = glGetUniformLocation(self.shader, "ObjectMatrix")
-        self.view_mat_id = glGetUniformLocation(self.shader, "ViewMatrix")
-        self.projection_mat = glGetUniformLocation(self.shader, "ProjectionMatrix")
+        self.item_rect_buffer = glGenBuffers(1)
+        glBindBuffer(GL_TEXTURE_BUFFER, self.item_rect_buffer)
+        glBufferData(GL_TEXTURE_BUFFER, self.item_rects.nbytes, None, GL_STATIC_DRAW)
+        self.item_rect_texture = glGenTextures(1)
+        self.graphics.bind_texture(self.item_rect_texture, TextureAtlas.ItemRectTextureUnit, GL_TEXTURE_BUFFER)
+        glTexBuffer(GL_TEXTURE_BUFFER, GL_RGBA32F, self.item_rect_buffer)
 
-        self.draw_index_id = glGetUniformLocation(self.shader, "DrawIndices")
-        self.draw_pos_id = glGetUniformLocation(self.shader, "DrawPositions")
-        self.draw_size_id = glGetUniformLocation(self.shader, "DrawSizes")
-        self.draw_col_id = glGetUniformLocation(self.shader, "DrawColours")
-        self.item_pos_id = glGetUniformLocation(self.shader, "ItemPositions")
-        self.item_size_id = glGetUniformLocation(self.shader, "ItemSizes")
+        self.graphics.use_program(self.shader)
+        glUniform1i(glGetUniformLocation(self.shader, "SamplerTex"), 0)
+        glUniform1i(glGetUniformLocation(self.shader, "ItemRects"), TextureAtlas.ItemRectTextureUnit)
 
         # Also bind a debug shader for drawing the complete atlas
         self.debug_shader = self.graphics.get_program(Shader.TEXTURE)
@@ -276,113 +512,473 @@ class TextureAtlas:
         self.debug_view_mat_id = glGetUniformLocation(self.debug_shader, "ViewMatrix")
         self.debug_projection_mat = glGetUniformLocation(self.debug_shader, "ProjectionMatrix")
 
-    @staticmethod
-    def blit(dst_image, dst_size: Coord2d, src_image, src_size: Coord2d, pos: Coord2d):
-        dst = np.reshape(dst_image, (dst_size.x, dst_size.y, 4), order="A")
-        src = np.reshape(src_image, (src_size.x, src_size.y, 4), order="F")
-        src = np.flip(src, axis=0)
-        dst[int(pos.x):int(pos.x + src_size.x), int(pos.y):int(pos.y + src_size.y)] = src
-        return dst.reshape((4 * dst_size.x * dst_size.y), order="A")
+    @property
+    def num_bytes(self) -> int:
+        return self.size.x * self.size.y * 4
 
-    def add(self, texture_path: Path, name: str=None) -> str:
-        """Composite a texture into the atlas an add it to the dictionary of textures."""
+    def set_sources(self, sources: dict, cache_path: Path=None):
+        """Set the files load packs into the page as a dict of item name to path. With a cache
+        path the packed page is kept on disk so only new or changed files are decoded next time."""
+        self.sources = sources
+        self.cache = AtlasCache(cache_path) if cache_path is not None and len(sources) > 0 else None
 
-        if texture_path.exists():
-            tex = Image.open(texture_path)
-            size = Coord2d(tex.width, tex.height)
+    def load(self):
+        """Pack every source file into the page and upload it, the page is allocated if it was unloaded or never used."""
+        self._allocate_page()
 
-            if name is None:
-                name = texture_path.stem
+        # Pick up the page packed on a previous run so only changed files are decoded
+        if self.cache is not None:
+            self.cache.load(self)
 
-            avail = self.size - self._next_pos - size
+        if GameSettings.DEV_MODE:
+            print(f"Building atlas for {len(self.sources)} textures: ", end='')
 
-            if avail.x < size.x:
-                self._next_pos.x = 0
-                self._next_pos.y += self._next_largest
-                self._next_largest = 0
-                avail = self.size - self._next_pos - size
+        self.begin_build()
+        if self.cache is not None:
+            self.cache.update(self, self.sources)
+            if GameSettings.DEV_MODE:
+                print(f"{self.cache.num_reused} cached", end='')
+        else:
+            decoded = load_rgba_many(list(self.sources.values()), GameSettings.DECODE_WORKERS, GameSettings.DECODE_PROCESSES)
+            for name, tex_data in zip(self.sources.keys(), decoded):
+                if GameSettings.DEV_MODE:
+                    print(f"▓", end='')
+                self.add_image(tex_data, name)
+        self.commit()
 
-            if avail.x >= size.x and avail.y >= size.y:
-                tex_data = np.array(list(tex.getdata()), np.uint8)
-                pos = copy(self._next_pos)
+        if self.cache is not None:
+            self.cache.save(self)
 
-                # Add a new item to the list of items, writing the a sequence of items for the shader to lookup
-                index = len(self.texture_items)
-                self.texture_items[name] = TextureAtlasItem(name, size, pos, index)
-                self.item_pos[index * 2] = pos.x / self.size.x
-                self.item_pos[(index * 2) + 1] = pos.y / self.size.y
-                self.item_size[index * 2] = size.x / self.size.x
-                self.item_size[(index * 2) + 1] = size.y / self.size.y
+        if GameSettings.DEV_MODE:
+            print(f" OK! {self.stats()}")
+        self.loaded = True
+
+    def unload(self):
+        """Free the page and the CPU copy, forgetting every item. Draws recorded this frame are dropped."""
+        if self.texture_id is not None:
+            Graphics.delete_texture(self.texture_id)
+            self.texture_id = None
+        self.img_data = None
+        self.size = self.initial_size
+        self.packer = AtlasPacker.create(self.strategy, self.size.x, self.size.y, self.packer.padding)
+        self.texture_items = {}
+        self._next_index = 0
+        self._free_indices = []
+        self._compacting = False
+        self.item_rects[:] = 0
+        self._item_rects_dirty = True
+        self._dirty_rects = []
+        self._glyph_items = {}
+        self.texture_draw_count = 0
+        self.loaded = False
 
-                if not self.debug_atlas:
-                    TextureAtlas.blit(self.img_data, self.size, tex_data, size, pos)
+    @staticmethod
+    def blit(dst_image: np.ndarray, src_image: np.ndarray, pos: Coord2d) -> np.ndarray:
+        """Copy a row major height x width x 4 image into the atlas with it's top left corner at pos."""
+        x, y = int(pos.x), int(pos.y)
+        height, width = src_image.shape[0], src_image.shape[1]
+        dst_image[y:y + height, x:x + width] = src_image
+        return dst_image
+
+    def _create_shadow(self, width: int, height: int) -> np.ndarray:
+        if self.shadow is AtlasShadow.MAPPED:
+            return np.memmap(tempfile.TemporaryFile(), dtype=np.uint8, mode="w+", shape=(height, width, 4))
+        return np.zeros((height, width, 4), dtype=np.uint8)
+
+    def _allocate_page(self):
+        if self.texture_id is None:
+            self.img_data = self._create_shadow(self.size.x, self.size.y)
+            self.texture_id = self._create_page_texture()
+
+    def _create_page_texture(self) -> int:
+        texture_id = glGenTextures(1)
+        self.graphics.bind_texture(texture_id)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_S, GL_CLAMP)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_T, GL_CLAMP)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_LINEAR)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
+        # Allocate storage only, content arrives in sub rectangles as items are added
+        glTexImage2D(GL_TEXTURE_2D, 0, GL_RGBA, self.size.x, self.size.y, 0, GL_RGBA, GL_UNSIGNED_BYTE, None)
+        return texture_id
+
+    def _set_page_size(self, width: int, height: int):
+        # Items keep their pixel positions so only the normalised rects change
+        scale = (self.size.x / width, self.size.y / height)
+        self.item_rects *= np.array([scale[0], scale[1], scale[0], scale[1]], dtype=np.float32)
+        self._item_rects_dirty = True
+        self.size = Coord2d(width, height)
+        self.packer.grow(width, height)
+        self.texture_id = self._create_page_texture()
+
+    def grow(self) -> bool:
+        """Double the page along it's shorter side, returns False once it is at the maximum size."""
+        width, height = self.size.x, self.size.y
+        if width <= height and width < self.max_size.x:
+            width = min(width * 2, self.max_size.x)
+        elif height < self.max_size.y:
+            height = min(height * 2, self.max_size.y)
+        elif width < self.max_size.x:
+            width = min(width * 2, self.max_size.x)
+        else:
+            return False
+        self.resize(width, height)
+        return True
+
+    def resize(self, width: int, height: int):
+        """Enlarge the page and move what is already packed into the new storage."""
+        old_size, old_texture_id = self.size, self.texture_id
+        self._set_page_size(width, height)
+        if self.img_data is not None:
+            img_data = self._create_shadow(width, height)
+            img_data[:old_size.y, :old_size.x] = self.img_data
+            self.img_data = img_data
+            self._dirty_rects.append((0, 0, old_size.x, old_size.y))
+            if not self._building:
+                self._flush_dirty_rects()
+        else:
+            glCopyImageSubData(old_texture_id, GL_TEXTURE_2D, 0, 0, 0, 0,
+                               self.texture_id, GL_TEXTURE_2D, 0, 0, 0, 0, old_size.x, old_size.y, 1)
+        Graphics.delete_texture(old_texture_id)
+
+    def read_page(self) -> np.ndarray:
+        """The pixels of the whole page, read back from the GPU when there is no CPU copy."""
+        if self.img_data is not None:
+            return self.img_data
+        self.graphics.bind_texture(self.texture_id)
+        glPixelStorei(GL_PACK_ALIGNMENT, 1)
+        pixels = glGetTexImage(GL_TEXTURE_2D, 0, GL_RGBA, GL_UNSIGNED_BYTE)
+        return np.frombuffer(pixels, dtype=np.uint8).reshape(self.size.y, self.size.x, 4)
+
+    def begin_build(self):
+        """Start a batch of adds that are composited on the CPU only, call commit to upload them."""
+        self._building = True
+
+    def commit(self):
+        """Pack everything added since begin_build largest first, upload the changed regions
+        and return to placing and uploading on each add."""
+        sizes = [(p[1].shape[1], p[1].shape[0]) for p in self._pending]
+        for i in AtlasPacker.sort_for_batch(sizes):
+            self._place(*self._pending[i])
+        self._pending = []
+        self._building = False
+
+        # Aliases are resolved once their targets are placed, a target that did not fit takes them with it
+        pending_aliases, self._pending_aliases = self._pending_aliases, []
+        for name, target in pending_aliases:
+            if self.add_alias(name, target) is None:
+                logging.warning(f"Texture atlas dropped alias {name}, its target {target} was not added.")
+        self._flush_dirty_rects()
+        if self.shadow is AtlasShadow.NONE:
+            self.img_data = None
+
+    def stats(self) -> PackStats:
+        return self.packer.stats()
+
+    def _upload_pixels(self, x: int, y: int, pixels: np.ndarray):
+        self.graphics.bind_texture(self.texture_id)
+        height, width = pixels.shape[0], pixels.shape[1]
+        glTexSubImage2D(GL_TEXTURE_2D, 0, x, y, width, height, GL_RGBA, GL_UNSIGNED_BYTE, np.ascontiguousarray(pixels))
+
+    def _upload_rect(self, x: int, y: int, width: int, height: int):
+        self._upload_pixels(x, y, self.img_data[y:y + height, x:x + width])
+
+    def _flush_dirty_rects(self):
+        if len(self._dirty_rects) == 0:
+            return
+
+        # Without a CPU copy items go straight to the GPU when they are placed
+        if self.img_data is None:
+            self._dirty_rects = []
+            return
+
+        # Upload the bounding box in one call when the dirty rects mostly fill it, else upload each
+        left = min(r[0] for r in self._dirty_rects)
+        top = min(r[1] for r in self._dirty_rects)
+        right = max(r[0] + r[2] for r in self._dirty_rects)
+        bottom = max(r[1] + r[3] for r in self._dirty_rects)
+        dirty_area = sum(r[2] * r[3] for r in self._dirty_rects)
+        if dirty_area * 2 >= (right - left) * (bottom - top):
+            self._upload_rect(left, top, right - left, bottom - top)
+        else:
+            for rect in self._dirty_rects:
+                self._upload_rect(*rect)
+        self._dirty_rects = []
 
-                glTexImage2D(GL_TEXTURE_2D, 0, GL_RGBA, self.size.x, self.size.y, 0, GL_RGBA, GL_UNSIGNED_BYTE, self.img_data)
-                self._next_pos.x += size.x
-                if size.y > self._next_largest:
-                    self._next_largest = size.y
+    def add(self, texture_path: Path, name: str=None) -> str:
+        """Composite a texture into the atlas an add it to the dictionary of textures.
+        Returns the name of the new item or None if it could not be added."""
+        if not texture_path.exists():
+            return None
 
-    def draw(self, name, pos: Coord2d, size: Coord2d, col: list):
-        i = -1
         if name is None:
-            i = TextureAtlas.NoTextureIndex
-        else:
-            draw_item = self.texture_items[name]
-            i = draw_item.index
+            name = texture_path.stem
+
+        return self.add_image(load_rgba(texture_path), name)
+
+    def add_image(self, tex_data: np.ndarray, name: str) -> str:
+        """Add already decoded RGBA pixels. During a build the image is only queued,
+        it is packed and given an index on commit."""
+        source_size = Coord2d(tex_data.shape[1], tex_data.shape[0])
+        trim_pos = Coord2d()
+        if self.trim:
+            tex_data, (trim_x, trim_y) = trim_rgba(tex_data)
+            trim_pos = Coord2d(trim_x, trim_y)
+
+        if self._building:
+            self._pending.append((name, tex_data, source_size, trim_pos))
+            return name
+        return self._place(name, tex_data, source_size, trim_pos)
+
+    def add_packed(self, name: str, rect: PackRect, source_size: Coord2d, trim_pos: Coord2d) -> str:
+        """Add an item whose pixels are already in the page at rect, eg. after restore_page."""
+        self.packer.reserve(rect)
+        self._register_item(name, rect, source_size, trim_pos)
+        return name
+
+    def add_alias(self, name: str, target: str) -> str:
+        """Make name draw an existing item, used to store identical images once."""
+        if target not in self.texture_items:
+            if self._building:
+                self._pending_aliases.append((name, target))
+                return name
+            return None
+
+        item = self.texture_items[target]
+        self.texture_items[name] = TextureAtlasItem(name, item.size, item.pos, item.index, item.source_size, item.trim_pos)
+        return name
+
+    def restore_page(self, img_data: np.ndarray):
+        """Adopt previously packed pixels as the CPU image, eg. a memory mapped cache, before any
+        items are added. Nothing is uploaded until items are added to say which regions are in use."""
+        height, width = img_data.shape[0], img_data.shape[1]
+        if width != self.size.x or height != self.size.y:
+            old_texture_id = self.texture_id
+            # The packer only ever grows, start it again at the page's size in case that is smaller
+            self.packer = AtlasPacker.create(self.strategy, width, height, self.packer.padding)
+            self._set_page_size(width, height)
+            Graphics.delete_texture(old_texture_id)
+        self.img_data = img_data
+
+    def remove(self, name: str) -> bool:
+        """Remove an item by name. Its space and index are given back for reuse once no alias
+        still shares them, later frames compact the page into the gap."""
+        item = self.texture_items.pop(name, None)
+        if item is None:
+            return False
+        self._glyph_items = {}
+        if any(other.index == item.index for other in self.texture_items.values()):
+            return True
+
+        self.packer.free(PackRect(item.pos.x, item.pos.y, item.size.x, item.size.y))
+        self._free_indices.append(item.index)
+        self._compacting = True
+        return True
+
+    def compact(self, max_moves: int=4) -> int:
+        """Move up to max_moves items, furthest into the page first, into free space nearer the
+        start so gaps left by removals join up. Only the moved regions are uploaded and indices do
+        not change, so recorded draws and existing sprites are unaffected. Returns how many moved."""
+        if not self._compacting:
+            return 0
+
+        items = {item.index: item for item in self.texture_items.values()}
+        num_moved = 0
+        pad = self.packer.padding
+        for item in sorted(items.values(), key=lambda i: (i.pos.y + i.size.y, i.pos.x), reverse=True):
+            if num_moved >= max_moves:
+                break
+            old = PackRect(item.pos.x, item.pos.y, item.size.x, item.size.y)
+            new = self.packer.relocate(old)
+            if new is None:
+                continue
+
+            if self.img_data is not None:
+                pixels = self.img_data[old.y:old.bottom, old.x:old.right].copy()
+                self.img_data[new.y:new.bottom + pad, new.x:new.right + pad] = 0
+                TextureAtlas.blit(self.img_data, pixels, Coord2d(new.x, new.y))
+            else:
+                _, _, padded_width, padded_height = self._padded_rect(new)
+                self._upload_pixels(new.x, new.y, np.zeros((padded_height, padded_width, 4), dtype=np.uint8))
+                glCopyImageSubData(self.texture_id, GL_TEXTURE_2D, 0, old.x, old.y, 0,
+                                   self.texture_id, GL_TEXTURE_2D, 0, new.x, new.y, 0, old.width, old.height, 1)
+            for other in self.texture_items.values():
+                if other.index == item.index:
+                    other.pos = Coord2d(new.x, new.y)
+            self._set_item_rect(item.index, new)
+            num_moved += 1
+
+        self._compacting = num_moved > 0
+        self._flush_dirty_rects()
+        return num_moved
+
+    def _allocate_index(self, name: str) -> int:
+        if name in self.texture_items:
+            return self.texture_items[name].index
+        if len(self._free_indices) > 0:
+            return self._free_indices.pop()
+        self._next_index += 1
+        return self._next_index - 1
+
+    def _register_item(self, name: str, rect: PackRect, source_size: Coord2d, trim_pos: Coord2d):
+        # Add a new item to the list of items, writing the a sequence of items for the shader to lookup
+        index = self._allocate_index(name)
+        pos = Coord2d(rect.x, rect.y)
+        size = Coord2d(rect.width, rect.height)
+        self.texture_items[name] = TextureAtlasItem(name, size, pos, index, source_size, trim_pos)
+        self._set_item_rect(index, rect)
+
+    def _set_item_rect(self, index: int, rect: PackRect):
+        if index >= len(self.item_rects):
+            self.item_rects = np.concatenate([self.item_rects, np.zeros_like(self.item_rects)])
+        self.item_rects[index] = (rect.x / self.size.x, rect.y / self.size.y, rect.width / self.size.x, rect.height / self.size.y)
+        self._item_rects_dirty = True
+        self._dirty_rects.append(self._padded_rect(rect))
+        if not self._building:
+            self._flush_dirty_rects()
+
+    def _padded_rect(self, rect: PackRect) -> tuple:
+        # Include the padding so filtering at the item edges never reads stale or uninitialised texels
+        pad = self.packer.padding
+        return rect.x, rect.y, min(rect.width + pad, self.size.x - rect.x), min(rect.height + pad, self.size.y - rect.y)
+
+    def _place(self, name: str, tex_data: np.ndarray, source_size: Coord2d, trim_pos: Coord2d) -> str:
+        self._allocate_page()
+        height, width = tex_data.shape[0], tex_data.shape[1]
+        rect = self.packer.insert(width, height)
+        while rect is None and self.grow():
+            rect = self.packer.insert(width, height)
+        if rect is None:
+            logging.warning(f"Texture atlas is full, cannot fit {name} at {width}x{height}. {self.stats()}")
+            return None
+
+        if self.img_data is None:
+            _, _, padded_width, padded_height = self._padded_rect(rect)
+            pixels = np.zeros((padded_height, padded_width, 4), dtype=np.uint8)
+            self._upload_pixels(rect.x, rect.y, TextureAtlas.blit(pixels, tex_data, Coord2d(0, 0)))
+        elif not self.debug_atlas:
+            pad = self.packer.padding
+            self.img_data[rect.y:rect.bottom + pad, rect.x:rect.right + pad] = 0
+            TextureAtlas.blit(self.img_data, tex_data, Coord2d(rect.x, rect.y))
+
+        self._register_item(name, rect, source_size, trim_pos)
+        return name
+
+    def _add_instance(self, pos: Coord2d, size: Coord2d, col: list, index: int):
+        self.graphics.begin_batch(self)
         n = self.texture_draw_count
-        self.draw_index[n] = i
-        self.draw_pos[(n * 2)] = pos.x
-        self.draw_pos[(n * 2) + 1] = pos.y
-        self.draw_size[(n * 2)] = size.x
-        self.draw_size[(n * 2) + 1] = size.y
-        self.draw_col[(n * 4)] = col[0]
-        self.draw_col[(n * 4) + 1] = col[1]
-        self.draw_col[(n * 4) + 2] = col[2]
-        self.draw_col[(n * 4) + 3] = col[3]
+        if n >= len(self.draw_data):
+            self.draw_data = np.concatenate([self.draw_data, np.zeros_like(self.draw_data)])
+        self.draw_data[n] = (pos.x, pos.y, size.x, size.y, col[0], col[1], col[2], col[3], index)
         self.texture_draw_count += 1
 
-    def draw_debug_atlas_item(self, item_index: int, pos: Coord2d, size: Coord2d):
-        if item_index < 0:
-            self.draw_index[0] = 0
-            self.item_pos[0] = 0.0
-            self.item_pos[1] = 0.0
-            self.item_size[0] = 1.0
-            self.item_size[1] = 1.0
-        else:
-            self.draw_index[0] = item_index
-
-        self.draw_pos[0] = pos.x
-        self.draw_pos[1] = pos.y
-        self.draw_size[0] = size.x
-        self.draw_size[1] = size.y
-        self.draw_col[0] = 1.0
-        self.draw_col[1] = 1.0
-        self.draw_col[2] = 1.0
-        self.draw_col[3] = 1.0
-        self.texture_draw_count = 1
+    def _upload_item_rects(self):
+        """Items only change when textures are added so the table is re-sent then, not every frame."""
+        glBindBuffer(GL_TEXTURE_BUFFER, self.item_rect_buffer)
+        glBufferData(GL_TEXTURE_BUFFER, self.item_rects.nbytes, self.item_rects, GL_STATIC_DRAW)
+        self._item_rects_dirty = False
 
-    def draw_final(self):
-        glUseProgram(self.shader)
-        glUniformMatrix4fv(self.object_mat_id, 1, GL_TRUE, MATRIX_IDENTITY[:])
-        glUniformMatrix4fv(self.view_mat_id, 1, GL_TRUE, self.graphics.camera.mat)
-        glUniformMatrix4fv(self.projection_mat, 1, GL_TRUE, self.graphics.projection_mat)
-        glUniform2f(self.pos_id, 0.0, 0.0)
-        glUniform2f(self.size_id, 2.0, 2.0)
+    def draw(self, name, pos: Coord2d, size: Coord2d, col: list):
+        """Record a draw of an item by name, or a plain coloured rect if name is None.
+        The page is a batch like the sprite batch, everything recorded is drawn in one call
+        when something else draws after it or the frame ends."""
+        index = TextureAtlas.NoTextureIndex
+        if name is not None:
+            if not self.loaded:
+                self.load()
+            draw_item = self.texture_items[name]
+            index = draw_item.index
+            pos, size = draw_item.get_trimmed_rect(pos, size)
+        self._add_instance(pos, size, col, index)
 
-        glUniform2fv(self.item_pos_id, TextureAtlas.MaxItems, self.item_pos)
-        glUniform2fv(self.item_size_id, TextureAtlas.MaxItems, self.item_size)
+    @staticmethod
+    def glyph_name(font, c: int) -> str:
+        """Fonts rasterised from the same file at the same size share glyph items."""
+        return f"glyph:{font.filename}:{font.char_size}:{c}"
+
+    def _get_glyph_items(self, font) -> np.ndarray:
+        # Slots are reused when a font evicts a glyph so the table is rebuilt whenever that happens
+        generation, items = self._glyph_items.get(font, (None, None))
+        if generation != font.glyph_generation or len(items) < len(font.glyph_table):
+            items = np.full(len(font.glyph_table), TextureAtlas.NoTextureIndex, dtype=np.float32)
+            for c, slot in font.glyph_slots.items():
+                item = self.texture_items.get(TextureAtlas.glyph_name(font, c))
+                if item is not None:
+                    items[slot] = item.index
+            self._glyph_items[font] = (font.glyph_generation, items)
+        return items
+
+    def _add_glyphs(self, font, slots: np.ndarray, items: np.ndarray):
+        """Pack glyphs as white with their coverage in alpha so the atlas shader tints them like any item."""
+        slot_chars = {slot: c for c, slot in font.glyph_slots.items()}
+        for slot in np.unique(slots).tolist():
+            name = TextureAtlas.glyph_name(font, slot_chars[slot])
+            if name not in self.texture_items:
+                coverage = font.glyph_image(slot_chars[slot])
+                tex_data = np.full((coverage.shape[0], coverage.shape[1], 4), 255, dtype=np.uint8)
+                tex_data[:, :, 3] = coverage
+                # Never trimmed, the quads from the font's layout have to cover the whole glyph
+                if self._place(name, tex_data, Coord2d(coverage.shape[1], coverage.shape[0]), Coord2d()) is None:
+                    continue
+            items[slot] = self.texture_items[name].index
+
+    def draw_text(self, font, string: str, font_size: int, pos: Coord2d, colour: list) -> Coord2d:
+        """Record a string like Font.draw does, with the bottom left of the first glyph at pos.
+        Glyphs are packed into this page the first time they are drawn, so text and sprites on
+        the page go out together in one draw with one program and one texture. Only plain fonts
+        work, the atlas shader has no edge threshold for distance fields."""
+        if not self.loaded:
+            self.load()
+        slots, quads, text_dim = font.place(string, font_size, pos)
+        items = self._get_glyph_items(font)
+        missing = items[slots] < 0
+        if missing.any():
+            self._add_glyphs(font, slots[missing], items)
+        glyph_items = items[slots]
+        self.graphics.begin_batch(self)
+
+        # Glyphs that did not fit in the page are left out rather than drawn as solid rects
+        packed = glyph_items >= 0
+        num_glyphs = int(packed.sum())
+        n = self.texture_draw_count
+        while n + num_glyphs > len(self.draw_data):
+            self.draw_data = np.concatenate([self.draw_data, np.zeros_like(self.draw_data)])
+        self.draw_data[n:n + num_glyphs, 0:4] = quads[packed]
+        self.draw_data[n:n + num_glyphs, 4:8] = colour[:4]
+        self.draw_data[n:n + num_glyphs, 8] = glyph_items[packed]
+        self.texture_draw_count += num_glyphs
+        return text_dim
 
-        glUniform1iv(self.draw_index_id, TextureAtlas.MaxDraws, self.draw_index)
-        glUniform2fv(self.draw_pos_id, TextureAtlas.MaxDraws, self.draw_pos)
-        glUniform2fv(self.draw_size_id, TextureAtlas.MaxDraws, self.draw_size)
-        glUniform4fv(self.draw_col_id, TextureAtlas.MaxDraws, self.draw_col)
+    def draw_debug_atlas_item(self, item_index: int, pos: Coord2d, size: Coord2d):
+        self.texture_draw_count = 0
+        self._add_instance(pos, size, [1.0] * 4, TextureAtlas.PageIndex if item_index < 0 else item_index)
 
-        glActiveTexture(GL_TEXTURE0)
-        glBindTexture(GL_TEXTURE_2D, self.texture_id)
-        glBindVertexArray(self.VAO)
-        glDrawElements(GL_TRIANGLES, 6, GL_UNSIGNED_INT, None)
+    def draw_final(self):
+        """Draw everything recorded so far now, after anything batched before it."""
+        if self.texture_draw_count > 0:
+            self.graphics.begin_batch(self)
+            self.graphics.flush_batch()
+
+    def flush(self):
+        """Called through Graphics.flush_batch to draw the recorded items with one instanced call."""
+        num_draws = self.texture_draw_count
+        if num_draws == 0:
+            return
+
+        if self._item_rects_dirty:
+            self._upload_item_rects()
+
+        self.graphics.use_program(self.shader)
+        self.graphics.bind_texture(self.item_rect_texture, TextureAtlas.ItemRectTextureUnit, GL_TEXTURE_BUFFER)
+        self.graphics.bind_texture(self.texture_id)
+        self.graphics.bind_vao(self.VAO)
+
+        # Orphan last frame's storage so the driver never waits on draws still in flight
+        glBindBuffer(GL_ARRAY_BUFFER, self.instance_vbo)
+        glBufferData(GL_ARRAY_BUFFER, self.draw_data.nbytes, None, GL_STREAM_DRAW)
+        glBufferSubData(GL_ARRAY_BUFFER, 0, num_draws * TextureAtlas.InstanceFloats * 4, self.draw_data[:num_draws])
+
+        glDrawElementsInstanced(GL_TRIANGLES, 6, GL_UNSIGNED_INT, None, num_draws)
         self.texture_draw_count = 0
-        self.draw_index.fill(-1)
 
 class SpriteAtlasTexture(Sprite):
     def __init__(self, graphics: Graphics, atlas: TextureAtlas, name: str, colour: list, pos: Coord2d, size: Coord2d, shader=None):
@@ -396,42 +992,130 @@ class SpriteAtlasTexture(Sprite):
 class TextureManager:
     """The textures class handles loading and management of all image resources for the game.
     The idea is that textures are loaded on demand and stay loaded until explicitly unloaded
-    or the game is shutdown."""
+    or the game is shutdown. Textures under the base path are packed into one atlas page per
+    subdirectory, files directly in the base path go on the root page which is always loaded.
+    Other pages load when a Gui that uses them is activated or an item on them is drawn."""
+    # Drawn by sprites whose texture is still loading in the background
+    PLACEHOLDER_COLOUR = [255, 255, 255, 0]
 
-    def __init__(self, base: Path, graphics):
+    def __init__(self, base: Path, graphics, use_cache: bool=True):
         self.base_path = Path(base)
         self.graphics = graphics
         self.raw_textures = {}
-        self.atlas = TextureAtlas(graphics)
-
-        textures = list()
+        self.residency = TextureResidency(GameSettings.TEXTURE_BUDGET_BYTES)
+        self.loader = TextureLoader(GameSettings.DECODE_WORKERS, GameSettings.TEXTURE_UPLOAD_MS, GameSettings.TEXTURE_UPLOAD_BYTES)
+        self._loading = {}
+        self.placeholder = Texture("", 1, 1, defer_load=True)
+        self.placeholder.upload(np.full((1, 1, 4), TextureManager.PLACEHOLDER_COLOUR, dtype=np.uint8))
+        self.atlases = {}
+        self._item_pages = {}
+        self._page_users = {}
+        # Pages no active Gui uses, in the order they were released
+        self._released_pages = OrderedDict()
+
+        pages = {"": {}}
         for e in Texture.FILE_EXTENSIONS:
-            textures.extend(self.base_path.rglob(f"*{e}"))
-
-        if GameSettings.DEV_MODE:
-            print(f"Building atlas for {len(textures)} textures: ", end='')
-
-        for tex in textures:
-            if GameSettings.DEV_MODE:
-                print(f"▓", end='')
-            rel_name = str(tex.relative_to(self.base_path).as_posix())
-            self.atlas.add(tex, name=rel_name)
-
-        if GameSettings.DEV_MODE:
-            print(' OK!')
+            for tex in sorted(self.base_path.rglob(f"*{e}")):
+                rel_name = str(tex.relative_to(self.base_path).as_posix())
+                page = rel_name.split("/")[0] if "/" in rel_name else ""
+                pages.setdefault(page, {})[rel_name] = tex
+                self._item_pages[rel_name] = page
+
+        for page, sources in sorted(pages.items()):
+            # Pages are allocated when a Gui first acquires them, the root page by the load below
+            atlas = TextureAtlas(graphics, GameSettings.ATLAS_MAX_SIZE, GameSettings.ATLAS_MAX_SIZE,
+                                 initial_width=GameSettings.ATLAS_INITIAL_SIZE, initial_height=GameSettings.ATLAS_INITIAL_SIZE,
+                                 shadow=AtlasShadow[GameSettings.ATLAS_SHADOW], allocate=False)
+            atlas.set_sources(sources, AtlasCache.get_cache_path(self.base_path / page) if use_cache else None)
+            self.atlases[page] = atlas
+        self.atlas = self.atlases[""]
+        self.atlas.load()
 
     def get_raw(self, texture_name: str, wrap:bool=True) -> SpriteTexture:
         if texture_name in self.raw_textures:
             return self.raw_textures[texture_name]
         else:
             texture_path = os.path.join(self.base_path, texture_name)
-            new_texture = Texture(texture_path, wrap=wrap)
+            new_texture = Texture(texture_path, wrap=wrap, residency=self.residency)
             self.raw_textures[texture_name] = new_texture
             return new_texture
 
+    def get_raw_async(self, texture_name: str, wrap:bool=True) -> Future:
+        """Start loading a texture in the background. The future resolves to the Texture once
+        update_loads has uploaded it, straight away if it is already loaded."""
+        if texture_name in self._loading:
+            return self._loading[texture_name]
+
+        if texture_name in self.raw_textures:
+            future = Future()
+            future.set_result(self.raw_textures[texture_name])
+            return future
+
+        texture_path = os.path.join(self.base_path, texture_name)
+        new_texture = Texture(texture_path, wrap=wrap, residency=self.residency, defer_load=True)
+        self.raw_textures[texture_name] = new_texture
+        future = self.loader.load(new_texture)
+        self._loading[texture_name] = future
+        future.add_done_callback(lambda _: self._loading.pop(texture_name, None))
+        return future
+
+    def update_loads(self) -> int:
+        """Upload textures that finished decoding, within the per frame budget. Call once a frame."""
+        return self.loader.update()
+
+    def wait(self, future: Future, timeout: float=None) -> Texture:
+        """Block until a texture from get_raw_async is ready, for when a game cannot carry on without it."""
+        return self.loader.wait(future, timeout)
+
+    def end_frame(self):
+        self.residency.end_frame()
+        for atlas in self.atlases.values():
+            if atlas.loaded:
+                atlas.compact(GameSettings.ATLAS_COMPACT_MOVES)
+        self.evict_pages()
+
+    def get_atlas(self, name: str) -> TextureAtlas:
+        """The atlas page an item is packed into, the root page for names not found at startup."""
+        return self.atlases[self._item_pages.get(name, "")]
+
+    def acquire_page(self, page: str):
+        """Load a page for a Gui that has become active, it stays loaded until every user has released it."""
+        atlas = self.atlases.get(page)
+        if atlas is None:
+            return
+        self._page_users[page] = self._page_users.get(page, 0) + 1
+        self._released_pages.pop(page, None)
+        if not atlas.loaded:
+            atlas.load()
+
+    def release_page(self, page: str):
+        """A Gui using a page has gone inactive, once nothing uses it the page can be evicted."""
+        if page not in self._page_users:
+            return
+        self._page_users[page] -= 1
+        if self._page_users[page] <= 0:
+            del self._page_users[page]
+            self._released_pages[page] = True
+
+    def evict_pages(self):
+        """Unload released pages, least recently released first, until loaded pages fit the budget.
+        Released pages stay loaded while there is room so switching back to a Gui is free."""
+        loaded_bytes = sum(a.num_bytes for a in self.atlases.values() if a.loaded)
+        for page in list(self._released_pages):
+            if loaded_bytes <= GameSettings.ATLAS_PAGE_BUDGET_BYTES:
+                break
+            del self._released_pages[page]
+            atlas = self.atlases[page]
+            if atlas.loaded:
+                loaded_bytes -= atlas.num_bytes
+                atlas.unload()
+
+    def stats(self) -> ResidencyStats:
+        return self.residency.stats()
+
     def create(self, name: str, pos: Coord2d, size: Coord2d, colour = [1.0, 1.0, 1.0, 1.0]):
         """Create a texture by name from the atlas. This is the most resource-friendly way to draw."""
-        return SpriteAtlasTexture(self.graphics, self.atlas, name, colour, pos, size)
+        return SpriteAtlasTexture(self.graphics, self.get_atlas(name), name, colour, pos, size)
     
     def create_sprite_shape(self, colour: list, pos: Coord2d, size: Coord2d, shader=None):
         return SpriteShape(self.graphics, colour, pos, size, shader)
@@ -442,6 +1126,21 @@ class TextureManager:
     def create_sprite_texture_tinted(self, name: str, colour: list, pos: Coord2d, size: Coord2d, shader=None, wrap:bool=True):
         return SpriteTexture(self.graphics, self.get_raw(name, wrap=wrap), colour, pos, size, shader)
 
+    def create_sprite_texture_async(self, name: str, pos: Coord2d, size: Coord2d, shader=None, wrap:bool=True,
+                                    colour: list=None, callback=None) -> SpriteTexture:
+        """Create a sprite that draws the placeholder until it's texture has loaded in the background.
+        The texture is swapped in and callback is called with the sprite when it is ready."""
+        sprite = SpriteTexture(self.graphics, self.placeholder, [1.0] * 4 if colour is None else colour, pos, size, shader)
+
+        def swap_texture(future: Future):
+            if future.exception() is None:
+                sprite.texture = future.result()
+                if callback is not None:
+                    callback(sprite)
+
+        self.get_raw_async(name, wrap=wrap).add_done_callback(swap_texture)
+        return sprite
+
     def draw_debug_atlas(self):
         self.atlas.draw_debug_atlas_item(-1, Coord2d(0.0, 0.0), Coord2d(1.0, 1.0))
 
@@ -449,4 +1148,5 @@ class TextureManager:
         self.atlas.draw_debug_atlas_item(item_index, pos, size)
 
     def draw_atlas(self):
-        self.atlas.draw_final()
+        for atlas in self.atlases.values():
+            atlas.draw_final()
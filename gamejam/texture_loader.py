@@ -0,0 +1,76 @@
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+import logging
+import time
+
+
+@dataclass(init=True)
+class PendingUpload:
+    texture: object
+    decoded: Future
+    done: Future
+
+
+class TextureLoader:
+    """Decodes textures on a background pool so the frame never waits on file IO or PNG
+    decoding. GL calls have to stay on the main thread, so decoded pixels wait until update
+    is called once a frame and only a budget of time and bytes is uploaded each time.
+    Textures need a decode method that is safe to call from a worker and an upload method."""
+
+    def __init__(self, workers: int=0, budget_ms: float=2.0, budget_bytes: int=8 * 1024 * 1024):
+        self.workers = workers
+        self.budget_ms = budget_ms
+        self.budget_bytes = budget_bytes
+        self.num_uploaded = 0
+        self._pool = None
+        self._pending = []
+
+    @property
+    def num_pending(self) -> int:
+        return len(self._pending)
+
+    def load(self, texture) -> Future:
+        """Start decoding a texture, the returned future resolves to it once it is uploaded."""
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=self.workers if self.workers > 0 else None)
+        done = Future()
+        self._pending.append(PendingUpload(texture, self._pool.submit(texture.decode), done))
+        return done
+
+    def update(self) -> int:
+        """Upload decoded textures in the order they were requested until this frame's budget is spent.
+        At least one is uploaded per call so a texture bigger than the budget still gets through."""
+        start = time.perf_counter()
+        uploaded_bytes = 0
+        num_uploaded = 0
+        for pending in [p for p in self._pending if p.decoded.done()]:
+            out_of_time = (time.perf_counter() - start) * 1000.0 >= self.budget_ms
+            if num_uploaded > 0 and (out_of_time or uploaded_bytes >= self.budget_bytes):
+                break
+            uploaded_bytes += self._upload(pending)
+            num_uploaded += 1
+        return num_uploaded
+
+    def wait(self, future: Future, timeout: float=None):
+        """Block until a load has finished, uploading it straight away regardless of the budget.
+        Call from the main thread, the upload only happens here or in update."""
+        for pending in self._pending:
+            if pending.done is future:
+                pending.decoded.exception(timeout)
+                self._upload(pending)
+                break
+        return future.result()
+
+    def _upload(self, pending: PendingUpload) -> int:
+        self._pending.remove(pending)
+        try:
+            img_data = pending.decoded.result()
+            pending.texture.upload(img_data)
+        except Exception as e:
+            logging.warning(f"Failed to load texture {getattr(pending.texture, 'path', '')}: {e}")
+            pending.done.set_exception(e)
+            return 0
+
+        self.num_uploaded += 1
+        pending.done.set_result(pending.texture)
+        return img_data.nbytes
@@ -0,0 +1,82 @@
+from collections import OrderedDict
+from dataclasses import dataclass
+
+
+@dataclass(init=True)
+class ResidencyStats:
+    """How much texture memory is in use and how well the budget is holding up."""
+    resident_bytes: int
+    budget_bytes: int
+    num_resident: int
+    hits: int
+    misses: int
+    evictions: int
+
+    def __str__(self) -> str:
+        return (f"{self.num_resident} textures, {self.resident_bytes / (1024 * 1024):.1f}/"
+                f"{self.budget_bytes / (1024 * 1024):.1f}MB, {self.hits} hits, {self.misses} misses, "
+                f"{self.evictions} evictions")
+
+
+class TextureResidency:
+    """Keeps the most recently used textures loaded while the total stays under a byte budget.
+    Textures report each use with touch and each load with add, the least recently used are
+    unloaded when the budget is exceeded and load themselves again the next time they are drawn.
+    Anything used in the current frame is never evicted as it may still be waiting in a batch,
+    so a single frame that needs more than the budget goes over it until the frame ends."""
+
+    def __init__(self, budget_bytes: int):
+        self.budget_bytes = budget_bytes
+        self.resident_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.frame = 0
+        # Texture to the frame it was last used, least recently used first
+        self._resident = OrderedDict()
+
+    def add(self, texture):
+        """Record a texture that has just been loaded, then evict others to fit it in the budget."""
+        if texture in self._resident:
+            self.touch(texture)
+            return
+        self.misses += 1
+        self._resident[texture] = self.frame
+        self.resident_bytes += texture.num_bytes
+        self.evict()
+
+    def touch(self, texture):
+        self.hits += 1
+        self._resident[texture] = self.frame
+        self._resident.move_to_end(texture)
+
+    def remove(self, texture):
+        """Stop tracking a texture, eg. one unloaded by hand."""
+        if texture in self._resident:
+            del self._resident[texture]
+            self.resident_bytes -= texture.num_bytes
+
+    def evict(self):
+        for texture, last_used in list(self._resident.items()):
+            if self.resident_bytes <= self.budget_bytes:
+                break
+            if last_used == self.frame:
+                continue
+            self.remove(texture)
+            texture.unload()
+            self.evictions += 1
+
+    def end_frame(self):
+        """Textures used in the frame that ended can now be evicted if the budget was exceeded."""
+        self.frame += 1
+        self.evict()
+
+    def stats(self) -> ResidencyStats:
+        return ResidencyStats(
+            resident_bytes=self.resident_bytes,
+            budget_bytes=self.budget_bytes,
+            num_resident=len(self._resident),
+            hits=self.hits,
+            misses=self.misses,
+            evictions=self.evictions,
+        )
@@ -0,0 +1,64 @@
+import itertools
+import pytest
+
+import gamejam.capture
+import gamejam.font
+import gamejam.graphics
+import gamejam.texture
+from gamejam.font import Font
+from gamejam.graphics import Graphics
+from gamejam.settings import GameSettings
+
+# Modules whose GL calls the gl fixture replaces
+GL_MODULES = [gamejam.capture, gamejam.font, gamejam.graphics, gamejam.texture]
+
+
+class FakeGL:
+    """Stands in for every GL call, recording them and handing out a new id for each object generated."""
+    def __init__(self):
+        self.calls = []
+        self._ids = itertools.count(1)
+
+    def stub(self, name: str):
+        def call(*args):
+            self.calls.append((name, args))
+            if name.startswith("glGen"):
+                count = args[0] if len(args) > 0 else 1
+                return next(self._ids) if count == 1 else [next(self._ids) for _ in range(count)]
+            return 1
+        return call
+
+    def called(self, name: str) -> list:
+        return [args for call_name, args in self.calls if call_name == name]
+
+    def draws(self) -> list:
+        return [name for name, _ in self.calls if name.startswith("glDraw")]
+
+
+@pytest.fixture
+def gl(monkeypatch) -> FakeGL:
+    """Run a test without a GL context, the calls it makes are in the returned FakeGL."""
+    fake = FakeGL()
+    for module in GL_MODULES:
+        for name in dir(module):
+            if (name.startswith("gl") and name != "glfw") or name in ("compileProgram", "compileShader"):
+                if callable(getattr(module, name)):
+                    monkeypatch.setattr(module, name, fake.stub(name))
+    Graphics.reset_state()
+    yield fake
+    Graphics.reset_state()
+
+
+@pytest.fixture(scope="session")
+def font_cache_dir(tmp_path_factory):
+    """Shared so the font is only rasterised by the first test that uses it."""
+    return tmp_path_factory.mktemp("font_cache")
+
+
+@pytest.fixture
+def font(gl, monkeypatch, font_cache_dir) -> Font:
+    """The default font on stubbed GL, its cache is written under a temporary directory."""
+    monkeypatch.chdir(font_cache_dir)
+    monkeypatch.setattr(gamejam.font.glfw, "get_framebuffer_size", lambda window: (1920, 1080))
+    monkeypatch.setattr(GameSettings, "DEV_MODE", False)
+    return Font(Graphics(1.0), None)
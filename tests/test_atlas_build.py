@@ -0,0 +1,26 @@
+import numpy as np
+
+from gamejam.graphics import Graphics
+from gamejam.texture import TextureAtlas
+
+
+def solid(colour: list, width: int, height: int) -> np.ndarray:
+    return np.full((height, width, 4), colour, dtype=np.uint8)
+
+
+def test_commit_resolves_aliases(gl):
+    atlas = TextureAtlas(Graphics(1.0), 64, 64)
+    atlas.begin_build()
+    assert atlas.add_alias("copy", "tile") == "copy"
+    atlas.add_image(solid([255, 0, 0, 255], 16, 16), "tile")
+    atlas.commit()
+    assert atlas.texture_items["copy"].index == atlas.texture_items["tile"].index
+
+
+def test_commit_drops_alias_of_unplaced_target(gl):
+    atlas = TextureAtlas(Graphics(1.0), 64, 64)
+    atlas.begin_build()
+    atlas.add_image(solid([255, 0, 0, 255], 100, 100), "huge")
+    atlas.add_alias("huge_copy", "huge")
+    atlas.commit()
+    assert "huge" not in atlas.texture_items and "huge_copy" not in atlas.texture_items
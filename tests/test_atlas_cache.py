@@ -0,0 +1,99 @@
+import os
+import numpy as np
+from PIL import Image
+
+import gamejam.atlas_cache
+from gamejam.atlas_cache import AtlasCache
+from gamejam.graphics import Graphics
+from gamejam.settings import GameSettings
+from gamejam.texture import TextureAtlas
+
+
+def write_png(path, colour: list, size: int=8):
+    Image.fromarray(np.full((size, size, 4), colour, dtype=np.uint8), "RGBA").save(path)
+
+
+def load_atlas(sources: dict, cache_path, initial_size: int=64) -> TextureAtlas:
+    atlas = TextureAtlas(Graphics(1.0), 1024, 1024, initial_width=initial_size, initial_height=initial_size)
+    atlas.set_sources(sources, cache_path)
+    atlas.load()
+    return atlas
+
+
+def item_pixels(atlas: TextureAtlas, name: str) -> np.ndarray:
+    item = atlas.texture_items[name]
+    return atlas.img_data[item.pos.y:item.pos.y + item.size.y, item.pos.x:item.pos.x + item.size.x]
+
+
+def create_sources(path) -> dict:
+    sources = {}
+    for name, colour in [("red", [255, 0, 0, 255]), ("green", [0, 255, 0, 255]), ("blue", [0, 0, 255, 255])]:
+        sources[name] = path / f"{name}.png"
+        write_png(sources[name], colour)
+    return sources
+
+
+def count_decodes(monkeypatch) -> list:
+    decoded = []
+    load_rgba_many = gamejam.atlas_cache.load_rgba_many
+    def count(paths, *args):
+        decoded.extend(paths)
+        return load_rgba_many(paths, *args)
+    monkeypatch.setattr(gamejam.atlas_cache, "load_rgba_many", count)
+    return decoded
+
+
+def test_hit_reuses_packed_items(gl, monkeypatch, tmp_path):
+    monkeypatch.setattr(GameSettings, "DEV_MODE", False)
+    sources = create_sources(tmp_path)
+    first = load_atlas(sources, tmp_path / "cache")
+
+    decoded = count_decodes(monkeypatch)
+    second = load_atlas(sources, tmp_path / "cache")
+    assert decoded == [] and second.cache.num_reused == 3
+    for name in sources:
+        new_pos, old_pos = second.texture_items[name].pos, first.texture_items[name].pos
+        assert (new_pos.x, new_pos.y) == (old_pos.x, old_pos.y)
+        assert np.array_equal(item_pixels(second, name), item_pixels(first, name))
+
+
+def test_changed_source_is_decoded_again(gl, monkeypatch, tmp_path):
+    monkeypatch.setattr(GameSettings, "DEV_MODE", False)
+    sources = create_sources(tmp_path)
+    load_atlas(sources, tmp_path / "cache")
+
+    write_png(sources["green"], [255, 255, 0, 255], 12)
+    stat = sources["green"].stat()
+    os.utime(sources["green"], ns=(stat.st_atime_ns, stat.st_mtime_ns + 1000000))
+    decoded = count_decodes(monkeypatch)
+    atlas = load_atlas(sources, tmp_path / "cache")
+    assert decoded == [sources["green"]] and atlas.cache.num_reused == 2
+    assert (item_pixels(atlas, "green") == [255, 255, 0, 255]).all()
+    assert (item_pixels(atlas, "red") == [255, 0, 0, 255]).all()
+
+
+def test_identical_sources_stored_once(gl, monkeypatch, tmp_path):
+    monkeypatch.setattr(GameSettings, "DEV_MODE", False)
+    sources = create_sources(tmp_path)
+    sources["copy"] = tmp_path / "copy.png"
+    write_png(sources["copy"], [255, 0, 0, 255])
+    atlas = load_atlas(sources, tmp_path / "cache")
+    assert atlas.texture_items["copy"].index == atlas.texture_items["red"].index
+
+    atlas = load_atlas(sources, tmp_path / "cache")
+    assert atlas.texture_items["copy"].index == atlas.texture_items["red"].index
+    assert len({item.index for item in atlas.texture_items.values()}) == 3
+
+
+def test_initial_size_is_part_of_the_key(gl, monkeypatch, tmp_path):
+    monkeypatch.setattr(GameSettings, "DEV_MODE", False)
+    sources = create_sources(tmp_path)
+    load_atlas(sources, tmp_path / "cache", initial_size=64)
+    atlas = load_atlas(sources, tmp_path / "cache", initial_size=256)
+    assert atlas.cache.num_reused == 0
+
+    # A page restored smaller than the atlas never has items packed outside it
+    atlas = TextureAtlas(Graphics(1.0), 1024, 1024, initial_width=256, initial_height=256)
+    atlas.restore_page(np.zeros((64, 64, 4), dtype=np.uint8))
+    assert (atlas.size.x, atlas.size.y) == (64, 64)
+    assert (atlas.packer.width, atlas.packer.height) == (64, 64)
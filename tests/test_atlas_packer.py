@@ -0,0 +1,103 @@
+import numpy as np
+
+from gamejam.atlas_packer import AtlasPacker, PackRect, PackStrategy
+from gamejam.image import trim_rgba
+
+
+def pack_random(strategy: PackStrategy, padding: int, count: int=200):
+    rng = np.random.default_rng(7)
+    sizes = [(int(w), int(h)) for w, h in rng.integers(4, 96, (count, 2))]
+    packer = AtlasPacker.create(strategy, 1024, 1024, padding)
+    rects = [packer.insert(*sizes[i]) for i in AtlasPacker.sort_for_batch(sizes)]
+    return packer, [r for r in rects if r is not None]
+
+
+def test_packers_do_not_overlap():
+    for strategy in PackStrategy:
+        for padding in [0, 2]:
+            packer, rects = pack_random(strategy, padding)
+            assert len(rects) > 0
+            for i, rect in enumerate(rects):
+                assert rect.x >= 0 and rect.y >= 0
+                assert rect.right <= 1024 and rect.bottom <= 1024
+                padded = PackRect(rect.x, rect.y, rect.width + padding, rect.height + padding)
+                for other in rects[i + 1:]:
+                    assert not padded.intersects(other)
+                    assert not PackRect(other.x, other.y, other.width + padding, other.height + padding).intersects(rect)
+
+            stats = packer.stats()
+            assert stats.num_rects == len(rects)
+            assert 0.0 < stats.occupancy <= 1.0
+            assert 0.0 <= stats.fragmentation <= 1.0
+
+
+def test_maxrects_fills_page():
+    packer = AtlasPacker.create(PackStrategy.MAXRECTS, 64, 64)
+    for _ in range(16):
+        assert packer.insert(16, 16) is not None
+    assert packer.insert(1, 1) is None
+    assert packer.stats().occupancy == 1.0
+
+
+def test_skyline_places_lowest_first():
+    packer = AtlasPacker.create(PackStrategy.SKYLINE, 64, 64)
+    assert packer.insert(32, 40) == PackRect(0, 0, 32, 40)
+    assert packer.insert(32, 10) == PackRect(32, 0, 32, 10)
+    assert packer.insert(32, 10) == PackRect(32, 10, 32, 10)
+    assert packer.insert(64, 30) is None
+
+
+def test_trim_rgba():
+    data = np.zeros((10, 12, 4), dtype=np.uint8)
+    data[3:5, 2:9, 3] = 255
+    trimmed, offset = trim_rgba(data)
+    assert trimmed.shape == (2, 7, 4)
+    assert offset == (2, 3)
+    empty, offset = trim_rgba(np.zeros((4, 4, 4), dtype=np.uint8))
+    assert empty.shape == (1, 1, 4)
+
+
+def test_freed_space_is_reused():
+    for strategy in PackStrategy:
+        packer = AtlasPacker.create(strategy, 64, 64, 1)
+        rects = [packer.insert(15, 15) for _ in range(16)]
+        assert all(r is not None for r in rects)
+        assert packer.insert(15, 15) is None
+
+        left = rects[5]
+        right = next(r for r in rects if r.y == left.y and r.x == left.x + 16)
+        packer.free(left)
+        packer.free(right)
+        assert packer.insert(31, 15) == PackRect(left.x, left.y, 31, 15)
+        assert packer.insert(1, 1) is None
+
+
+def test_relocate_moves_into_earlier_space():
+    packer = AtlasPacker.create(PackStrategy.SHELF, 64, 64)
+    first = packer.insert(32, 32)
+    packer.insert(32, 32)
+    last = packer.insert(16, 16)
+    assert last == PackRect(0, 32, 16, 16)
+    assert packer.relocate(last) is None
+
+    packer.free(first)
+    moved = packer.relocate(last)
+    assert moved == PackRect(0, 0, 16, 16)
+    assert packer.insert(16, 32) == PackRect(16, 0, 16, 32)
+    assert packer.stats().num_rects == 3
+
+
+def test_grow_keeps_rects_and_adds_space():
+    for strategy in PackStrategy:
+        packer = AtlasPacker.create(strategy, 32, 32, 1)
+        rects = [packer.insert(15, 15) for _ in range(4)]
+        assert packer.insert(15, 15) is None
+
+        packer.grow(64, 32)
+        assert packer.rects == rects
+        grown = [packer.insert(15, 15) for _ in range(4)]
+        assert all(r is not None and r.x >= 32 and r.right <= 64 for r in grown)
+
+        packer.grow(64, 64)
+        assert packer.insert(63, 31) == PackRect(0, 32, 63, 31)
+        assert packer.stats().width == 64 and packer.stats().height == 64
@@ -0,0 +1,46 @@
+import numpy as np
+
+from gamejam.graphics import Graphics
+from gamejam.texture import TextureAtlas
+
+
+def solid(colour: list, width: int, height: int) -> np.ndarray:
+    return np.full((height, width, 4), colour, dtype=np.uint8)
+
+
+def covers(upload: tuple, item) -> bool:
+    _, _, x, y, width, height = upload[:6]
+    return x <= item.pos.x and y <= item.pos.y and x + width >= item.pos.x + item.size.x and y + height >= item.pos.y + item.size.y
+
+
+def test_compact_keeps_other_items(gl):
+    atlas = TextureAtlas(Graphics(1.0), 256, 256, initial_width=64, initial_height=64)
+    colours = {"wide": [255, 0, 0, 255], "a": [0, 255, 0, 255], "b": [0, 0, 255, 255], "c": [255, 255, 0, 255]}
+    atlas.add_image(solid(colours["wide"], 60, 30), "wide")
+    for name in ["a", "b", "c"]:
+        atlas.add_image(solid(colours[name], 16, 16), name)
+    before = {name: (item.pos.x, item.pos.y) for name, item in atlas.texture_items.items()}
+
+    assert atlas.remove("wide")
+    num_uploads = len(gl.called("glTexSubImage2D"))
+    assert atlas.compact(max_moves=8) > 0
+    moved = [name for name, item in atlas.texture_items.items() if (item.pos.x, item.pos.y) != before[name]]
+    assert len(moved) > 0
+
+    for name, item in atlas.texture_items.items():
+        pixels = atlas.img_data[item.pos.y:item.pos.y + item.size.y, item.pos.x:item.pos.x + item.size.x]
+        assert (pixels == colours[name]).all()
+        expected = [item.pos.x / atlas.size.x, item.pos.y / atlas.size.y, item.size.x / atlas.size.x, item.size.y / atlas.size.y]
+        assert np.allclose(atlas.item_rects[item.index], expected)
+
+    # Every moved item's new region went up to the page
+    uploads = gl.called("glTexSubImage2D")[num_uploads:]
+    assert all(any(covers(upload, atlas.texture_items[name]) for upload in uploads) for name in moved)
+
+    # Later frames carry on until nothing can move nearer the start
+    rounds = 0
+    while atlas.compact(max_moves=8) > 0:
+        rounds += 1
+        assert rounds < 10
+    for name, item in atlas.texture_items.items():
+        assert (atlas.img_data[item.pos.y:item.pos.y + item.size.y, item.pos.x:item.pos.x + item.size.x] == colours[name]).all()
@@ -0,0 +1,44 @@
+import numpy as np
+from PIL import Image
+
+import gamejam.capture
+from gamejam.capture import CapturedFrame, CaptureFormat, FrameCapture, FrameWriter
+
+
+def make_frames(count: int) -> list:
+    frames = []
+    for i in range(count):
+        pixels = np.zeros((6, 8, 4), dtype=np.uint8)
+        pixels[0, :, 0] = 255
+        pixels[..., 1] = i
+        frames.append(CapturedFrame(i, pixels))
+    return frames
+
+
+def test_png_sequence(tmp_path):
+    writer = FrameWriter(tmp_path / "png", CaptureFormat.PNG)
+    frames = make_frames(3)
+    assert all(writer.write(frame) for frame in frames)
+    writer.close()
+    assert writer.num_written == 3 and writer.num_dropped == 0
+    for frame in frames:
+        written = np.asarray(Image.open(tmp_path / "png" / f"frame_{frame.index:05}.png"))
+        assert np.array_equal(written, frame.pixels)
+
+
+def test_raw_frames(tmp_path):
+    writer = FrameWriter(tmp_path / "raw", CaptureFormat.RAW)
+    frames = make_frames(4)
+    for frame in frames:
+        writer.write(frame)
+    writer.close()
+    raw = np.fromfile(tmp_path / "raw" / "frames.rgba", dtype=np.uint8).reshape(4, 6, 8, 4)
+    assert np.array_equal(raw, np.stack([frame.pixels for frame in frames]))
+
+
+def test_failed_map_is_not_unmapped(gl, monkeypatch, tmp_path, caplog):
+    monkeypatch.setattr(gamejam.capture, "glMapBufferRange", lambda *args: None)
+    capture = FrameCapture(8, 6, tmp_path)
+    capture._map_buffer(capture.pack_buffers[0], 0)
+    assert gl.called("glUnmapBuffer") == []
+    assert "Could not map" in caplog.text
@@ -0,0 +1,80 @@
+import numpy as np
+
+from gamejam.texture import DynamicTexture
+
+
+def sub_images(gl) -> list:
+    """The x, y, width, height of each region sent with glTexSubImage2D."""
+    return [tuple(args[2:6]) for args in gl.called("glTexSubImage2D")]
+
+
+def test_first_upload_sends_whole_texture(gl):
+    texture = DynamicTexture(64, 32)
+    assert texture.upload() == 64 * 32 * 4
+    assert sub_images(gl) == [(0, 0, 64, 32)]
+    assert texture.upload() == 0
+
+
+def test_close_rects_merge_into_bounding_box(gl):
+    texture = DynamicTexture(64, 64)
+    texture.upload()
+    gl.calls.clear()
+
+    texture.write(0, 0, np.full((8, 8, 4), 255, dtype=np.uint8))
+    texture.write(8, 0, np.full((8, 8, 4), 255, dtype=np.uint8))
+    texture.mark_dirty(0, 8, 12, 8)
+    assert texture.upload() == 16 * 16 * 4
+    assert sub_images(gl) == [(0, 0, 16, 16)]
+
+
+def test_far_apart_rects_upload_separately(gl):
+    texture = DynamicTexture(64, 64)
+    texture.upload()
+    gl.calls.clear()
+
+    texture.mark_dirty(0, 0, 4, 4)
+    texture.mark_dirty(60, 60, 4, 4)
+    assert texture.upload() == 2 * 4 * 4 * 4
+    assert sub_images(gl) == [(0, 0, 4, 4), (60, 60, 4, 4)]
+    # The second region is read from after the first in the pixel buffer
+    offsets = [args[-1].value for args in gl.called("glTexSubImage2D")]
+    assert offsets == [None, 4 * 4 * 4]
+
+
+def test_mark_dirty_clips_to_texture(gl):
+    texture = DynamicTexture(32, 32)
+    texture.upload()
+    gl.calls.clear()
+
+    texture.mark_dirty(-4, 28, 8, 8)
+    texture.mark_dirty(40, 40, 4, 4)
+    texture.upload()
+    assert sub_images(gl) == [(0, 28, 4, 4)]
+
+
+def test_uploads_alternate_pixel_buffers(gl):
+    texture = DynamicTexture(16, 16)
+    buffers = []
+    for _ in range(3):
+        gl.calls.clear()
+        texture.fill([255, 0, 0, 255])
+        texture.upload()
+        buffers.append(gl.called("glBindBuffer")[0][1])
+    assert buffers[0] != buffers[1] and buffers[0] == buffers[2]
+    assert set(buffers) == set(texture.pixel_buffers)
+
+
+def test_unload_reloads_on_use(gl):
+    texture = DynamicTexture(16, 16)
+    texture.write(2, 2, np.full((4, 4, 4), 128, dtype=np.uint8))
+    first_id = texture.texture_id
+    texture.unload()
+    assert not texture.loaded and texture.pixel_buffers is None
+    assert len(gl.called("glDeleteBuffers")) == 1
+
+    gl.calls.clear()
+    assert texture.texture_id not in (None, first_id)
+    assert texture.loaded
+    # The GL texture is empty after being created again so all the kept pixels are sent
+    assert sub_images(gl) == [(0, 0, 16, 16)]
+    assert texture.pixels[2, 2, 0] == 128
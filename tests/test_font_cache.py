@@ -0,0 +1,44 @@
+from types import SimpleNamespace
+import numpy as np
+
+from gamejam.font_cache import FontCache
+
+
+def make_font() -> SimpleNamespace:
+    image_data = np.zeros((64, 32), dtype=np.uint8)
+    image_data[4:10, 2:6] = 255
+    glyph_table = np.full((4, 9), np.nan)
+    glyph_table[0, :5] = (600, 0, 0, 0, 0)
+    glyph_table[2] = (610, 500, 700, 20, 700, 0.0625, 0.125, 0.25, 0.5)
+    return SimpleNamespace(
+        filename="test.ttf", tex_width=64, tex_height=32, line_height=1234.5, image_data=image_data,
+        glyph_slots={32: 0, 65: 2}, glyph_table=glyph_table)
+
+
+def test_round_trip(tmp_path):
+    font = make_font()
+    FontCache(tmp_path).save(font)
+
+    loaded = SimpleNamespace()
+    assert FontCache(tmp_path).load(loaded)
+    assert isinstance(loaded.image_data, np.memmap)
+    assert np.array_equal(loaded.image_data, font.image_data)
+    assert loaded.line_height == font.line_height
+    assert loaded.glyph_slots == {32: 0, 65: 1}
+    for c, slot in font.glyph_slots.items():
+        assert np.array_equal(loaded.glyph_table[loaded.glyph_slots[c]], font.glyph_table[slot], equal_nan=True)
+    assert np.isnan(loaded.glyph_table[0, 5:]).all()
+
+
+def test_key_changes_with_settings(tmp_path):
+    font_path = tmp_path / "test.ttf"
+    font_path.write_bytes(b"font")
+    chars = ["a", "b"]
+    key = FontCache.get_key(font_path, 9000, chars)
+    assert key == FontCache.get_key(font_path, 9000, chars)
+    assert key != FontCache.get_key(font_path, 8000, chars)
+    assert key != FontCache.get_key(font_path, 9000, chars + ["½"])
+    assert key != FontCache.get_key(font_path, 9000, chars, "sdf8")
+    font_path.write_bytes(b"other font")
+    assert key != FontCache.get_key(font_path, 9000, chars)
+    assert not FontCache(tmp_path / "missing").load(SimpleNamespace())
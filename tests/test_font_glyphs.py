@@ -0,0 +1,59 @@
+from gamejam.atlas_packer import AtlasPacker, PackStrategy
+from gamejam.coord import Coord2d
+
+
+def test_missing_glyph_rasterised_once(gl, font):
+    assert ord("é") not in font.glyph_slots
+    font.layout("é", 12, Coord2d(), [1.0] * 4)
+    uploads = len(gl.called("glTexSubImage2D"))
+    assert uploads == 1 and ord("é") in font.glyph_slots
+    font.layout("éé", 12, Coord2d(), [1.0] * 4)
+    font.measure("é", 12)
+    assert len(gl.called("glTexSubImage2D")) == uploads
+
+    # A character the font has no glyph for is only looked up once
+    font.layout("日", 12, Coord2d(), [1.0] * 4)
+    font.layout("日", 12, Coord2d(), [1.0] * 4)
+    assert ord("日") in font._missing_glyphs and len(gl.called("glTexSubImage2D")) == uploads
+
+
+def test_least_recently_used_glyph_evicted(font):
+    chars = "àáâ"
+    face = font.get_face()
+    sizes = []
+    for char in chars:
+        face.load_char(char)
+        sizes.append(font.glyph_pixels(face.glyph).shape)
+    # Only room for two of the on demand glyphs
+    font._glyph_packer = AtlasPacker.create(PackStrategy.MAXRECTS, 2 * (max(s[1] for s in sizes) + 1), max(s[0] for s in sizes) + 1, padding=1)
+
+    font.layout("à", 12, Coord2d(), [1.0] * 4)
+    font.layout("á", 12, Coord2d(), [1.0] * 4)
+    generation = font.glyph_generation
+    font.layout("â", 12, Coord2d(), [1.0] * 4)
+    assert ord("à") not in font.glyph_slots and ord("á") in font.glyph_slots and ord("â") in font.glyph_slots
+    assert font.glyph_generation == generation + 1
+
+    # Glyphs of the layout in progress are never evicted to make room for each other
+    glyphs, _ = font.layout("âáà", 12, Coord2d(), [1.0] * 4)
+    assert ord("â") in font.glyph_slots and ord("á") in font.glyph_slots and ord("à") not in font.glyph_slots
+    assert len(glyphs) == 2
+
+
+def test_blank_glyph_not_evicted(font):
+    chars = "àáâ"
+    face = font.get_face()
+    sizes = []
+    for char in chars:
+        face.load_char(char)
+        sizes.append(font.glyph_pixels(face.glyph).shape)
+    font._glyph_packer = AtlasPacker.create(PackStrategy.MAXRECTS, 2 * (max(s[1] for s in sizes) + 1), max(s[0] for s in sizes) + 1, padding=1)
+
+    # A no-break space is loaded on demand but has no pixels, so takes no room in the page
+    font.layout("à", 12, Coord2d(), [1.0] * 4)
+    font.layout("\u00a0", 12, Coord2d(), [1.0] * 4)
+    font.layout("\u00a0", 12, Coord2d(), [1.0] * 4)
+    assert 0xA0 in font.glyph_slots
+    for char in "áâà":
+        font.layout(char, 12, Coord2d(), [1.0] * 4)
+    assert ord("à") in font.glyph_slots and 0xA0 in font.glyph_slots
@@ -0,0 +1,79 @@
+import math
+import numpy as np
+
+from gamejam.coord import Coord2d
+from gamejam.font import Font
+
+STRINGS = ["Hello, World! ½", "", "a\nbc", "tab\there é ñ 日", "  x  ", "line1\nline2 longer\nthree", "end\n"]
+
+
+def reference_layout(font: Font, string: str, font_size: int, pos: Coord2d, colour: list) -> tuple:
+    """Layout one character at a time the way Font did before it was vectorised."""
+    font.get_slots(string)
+    display_size = font_size * 0.0000005
+    line_height = font.line_height * display_size
+    space = font.glyph_table[font.glyph_slots[32], Font.GLYPH_ADVANCE]
+    pen_x, pen_y = pos.x, pos.y
+    glyphs = []
+    for char in string:
+        c = ord(char)
+        if c == 10 or c == 13:
+            pen_x, pen_y = pos.x, pen_y - line_height
+            continue
+        slot = font.glyph_slots.get(c)
+        if slot is None:
+            pen_x += (space * display_size) / font.window_ratio
+            continue
+
+        row = font.glyph_table[slot]
+        if not math.isnan(row[Font.GLYPH_POSITION]):
+            size_x = (row[Font.GLYPH_OFFSET] * display_size) / font.window_ratio
+            size_y = row[Font.GLYPH_OFFSET + 1] * display_size
+            bearing_x = (row[Font.GLYPH_BEARING] * display_size) / font.window_ratio
+            bearing_y = row[Font.GLYPH_BEARING + 1] * display_size
+            glyphs.append((pen_x + bearing_x + size_x * 0.5, pen_y + bearing_y - size_y * 0.5, size_x, size_y,
+                           *row[Font.GLYPH_POSITION:Font.GLYPH_SIZE + 2], *colour))
+        pen_x += (row[Font.GLYPH_ADVANCE] * display_size) / font.window_ratio
+
+    text_dim = Coord2d(pen_x - pos.x, max(abs(pen_y - pos.y), line_height))
+    return np.array(glyphs, dtype=np.float32).reshape(-1, Font.InstanceFloats), text_dim
+
+
+def reference_measure(font: Font, string: str, font_size: int) -> Coord2d:
+    font.get_slots(string)
+    display_size = font_size * 0.0000005
+    space = font.glyph_table[font.glyph_slots[32], Font.GLYPH_ADVANCE]
+    widths, line_width = [], 0.0
+    for char in string:
+        c = ord(char)
+        if c == 10 or c == 13:
+            widths.append(line_width)
+            line_width = 0.0
+            continue
+        slot = font.glyph_slots.get(c)
+        advance = font.glyph_table[slot, Font.GLYPH_ADVANCE] if slot is not None else space
+        line_width += (advance * display_size) / font.window_ratio
+    widths.append(line_width)
+    return Coord2d(max(widths), font.line_height * display_size * len(widths))
+
+
+def test_layout_and_measure_match_per_character(font):
+    colour = [1.0, 0.5, 0.25, 1.0]
+    for string in STRINGS:
+        for font_size in [8, 12]:
+            glyphs, text_dim = font.layout(string, font_size, Coord2d(0.1, -0.2), colour)
+            expected, expected_dim = reference_layout(font, string, font_size, Coord2d(0.1, -0.2), colour)
+            assert glyphs.shape == expected.shape
+            assert np.allclose(glyphs, expected, atol=1e-6)
+            assert math.isclose(text_dim.x, expected_dim.x, abs_tol=1e-6) and math.isclose(text_dim.y, expected_dim.y)
+
+            size, expected_size = font.measure(string, font_size), reference_measure(font, string, font_size)
+            assert math.isclose(size.x, expected_size.x, abs_tol=1e-6) and math.isclose(size.y, expected_size.y)
+
+
+def test_wrap_fits_width(font):
+    wrapped = font.wrap("the quick brown fox jumps over the lazy dog", 12, 0.3)
+    lines = wrapped.split("\n")
+    assert len(lines) > 1 and " ".join(lines) == "the quick brown fox jumps over the lazy dog"
+    assert all(font.measure(line, 12).x <= 0.3 for line in lines)
+    assert font.wrap("the quick brown fox jumps over the lazy dog", 12, 0.3) is wrapped
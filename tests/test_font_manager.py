@@ -0,0 +1,27 @@
+import os
+
+from gamejam.font import Font, FontManager
+
+
+def test_key_matches_same_font():
+    default = FontManager.get_key()
+    assert FontManager.get_key(Font.DEFAULT_FILENAME) == default
+    assert FontManager.get_key(os.path.relpath(Font.DEFAULT_FILENAME)) == default
+    assert FontManager.get_key(char_size=Font.CHAR_SIZE, chars=Font.DEFAULT_CHARS) == default
+    assert FontManager.get_key(sdf=True) != default
+    assert FontManager.get_key(char_size=4096) != default
+    assert FontManager.get_key(chars="abc") != default
+
+
+def test_get_shares_fonts_and_faces(font):
+    fonts = FontManager(font.graphics, None)
+    relative = os.path.relpath(Font.DEFAULT_FILENAME)
+    default = fonts.get(relative)
+    assert fonts.get() is default and fonts.get(Font.DEFAULT_FILENAME) is default
+    # The caller's relative path is kept for saving, the key only resolves it
+    assert default.filename == relative
+
+    subset = fonts.get(chars="abc")
+    assert subset is not default
+    assert subset.get_face() is default.get_face()
+    assert fonts.get(char_size=4096).get_face() is not default.get_face()
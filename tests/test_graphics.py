@@ -0,0 +1,25 @@
+from OpenGL.GL import GL_TEXTURE0, GL_TEXTURE_BUFFER
+
+import gamejam.graphics
+from gamejam.graphics import Graphics
+
+
+def test_bind_texture_selects_unit_when_already_bound(monkeypatch):
+    calls = []
+    monkeypatch.setattr(gamejam.graphics, "glActiveTexture", lambda unit: calls.append(("active", unit)))
+    monkeypatch.setattr(gamejam.graphics, "glBindTexture", lambda target, texture_id: calls.append(("bind", target, texture_id)))
+    Graphics.reset_state()
+
+    Graphics.bind_texture(7)
+    Graphics.bind_texture(9, 1, GL_TEXTURE_BUFFER)
+    calls.clear()
+
+    # The page is still bound on unit 0 but unit 1 is active, an upload has to land on unit 0
+    Graphics.bind_texture(7)
+    assert calls == [("active", GL_TEXTURE0)]
+    calls.clear()
+    Graphics.bind_texture(7)
+    assert calls == []
+    Graphics.bind_texture(9, 1, GL_TEXTURE_BUFFER)
+    assert calls == [("active", GL_TEXTURE0 + 1)]
+    Graphics.reset_state()
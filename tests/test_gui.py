@@ -2,7 +2,6 @@ import os
 import time
 
 from gamejam.coord import Coord2d
-from gamejam.font import Font
 from gamejam.gui import Gui
 from gamejam.gamejam import GameJam
 
@@ -16,7 +15,7 @@ class GameWithGui(GameJam):
     def prepare(self):
         super().prepare()
 
-        self.font = Font(self.graphics, self.window, os.path.join("gamejam", "res", "consola.ttf"))
+        self.font = self.fonts.get(os.path.join("gamejam", "res", "consola.ttf"))
         test_gui = Gui("test_gui", self.graphics, self.font)
         test_gui.set_active(True, True)
 
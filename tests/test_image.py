@@ -0,0 +1,45 @@
+import numpy as np
+from PIL import Image
+
+from gamejam.image import image_to_rgba, load_rgba, signed_distance_field
+
+
+def test_image_to_rgba_modes():
+    rgba = np.zeros((3, 5, 4), dtype=np.uint8)
+    rgba[..., 0] = 200
+    rgba[..., 3] = 255
+    rgba[1, 2] = [10, 20, 30, 128]
+    source = Image.fromarray(rgba, "RGBA")
+
+    for mode in ["RGBA", "RGB", "P", "LA", "L"]:
+        data = image_to_rgba(source.convert(mode))
+        assert data.shape == (3, 5, 4)
+        assert data.dtype == np.uint8
+        assert data.flags["C_CONTIGUOUS"]
+
+    assert np.array_equal(image_to_rgba(source), rgba)
+    assert np.array_equal(image_to_rgba(source.convert("RGB"))[..., 3], np.full((3, 5), 255))
+
+
+def test_load_rgba(tmp_path):
+    rgba = np.random.randint(0, 255, (16, 8, 4), dtype=np.uint8)
+    Image.fromarray(rgba, "RGBA").save(tmp_path / "test.png")
+    assert np.array_equal(load_rgba(tmp_path / "test.png"), rgba)
+
+
+
+def test_signed_distance_field():
+    coverage = np.zeros((9, 9), dtype=np.uint8)
+    coverage[2:7, 2:7] = 255
+    field = signed_distance_field(coverage, 4)
+    assert field.shape == (17, 17)
+    assert field.dtype == np.uint8
+    # Padded square spans 6 to 10, brightest in the middle and darkest in the corners
+    assert field[8, 8] == field.max() and field[0, 0] == 0
+    assert field[8, 6] > 128 > field[8, 5]
+    assert np.array_equal(field, field.T)
+    assert np.array_equal(field, np.flipud(field))
+
+
+if __name__ == "__main__":
+    test_image_to_rgba_modes()
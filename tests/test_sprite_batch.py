@@ -0,0 +1,78 @@
+import numpy as np
+
+import gamejam.texture
+from gamejam.coord import Coord2d
+from gamejam.graphics import Shader
+from gamejam.texture import SpriteBatch
+
+
+class FakeGraphics:
+    """Records the state each batch draw is made with instead of calling GL."""
+    def __init__(self):
+        self.draws = []
+        self.program = None
+        self.texture_id = None
+        self.active_batch = None
+
+    def get_program(self, shader: Shader) -> int:
+        return shader.value
+
+    def get_quad_vao(self, *args) -> int:
+        return 1
+
+    def begin_batch(self, batch):
+        self.active_batch = batch
+
+    def use_program(self, program: int):
+        self.program = program
+
+    def bind_texture(self, texture_id: int):
+        self.texture_id = texture_id
+
+    def bind_vao(self, vao: int):
+        pass
+
+
+def create_batch(monkeypatch, sort: bool) -> tuple:
+    graphics = FakeGraphics()
+    for name in ["glGenBuffers", "glBindBuffer", "glBufferData", "glBufferSubData", "glUniformMatrix4fv"]:
+        monkeypatch.setattr(gamejam.texture, name, lambda *args: 1)
+    monkeypatch.setattr(gamejam.texture, "glGetUniformLocation", lambda *args: -1)
+
+    def draw(mode, count, index_type, indices, num_instances, base_instance):
+        texture_id = graphics.texture_id if graphics.program == Shader.SPRITE_TEXTURE.value else None
+        graphics.draws.append((graphics.program, texture_id, num_instances, base_instance))
+    monkeypatch.setattr(gamejam.texture, "glDrawElementsInstancedBaseInstance", draw)
+    return graphics, SpriteBatch(graphics, sort)
+
+
+def add_sprites(batch: SpriteBatch):
+    for shader, texture_id in [(Shader.SPRITE_TEXTURE, 5), (Shader.SPRITE_COLOUR, 0), (Shader.SPRITE_COLOUR, 0),
+                               (Shader.SPRITE_TEXTURE, 3), (Shader.SPRITE_TEXTURE, 5)]:
+        batch.add(shader, texture_id, Coord2d(), Coord2d(1.0, 1.0), [1.0] * 4)
+
+
+def test_submission_order_kept(monkeypatch):
+    graphics, batch = create_batch(monkeypatch, sort=False)
+    add_sprites(batch)
+    batch.flush()
+    textured, colour = Shader.SPRITE_TEXTURE.value, Shader.SPRITE_COLOUR.value
+    # Only the two adjacent colour sprites share a draw
+    assert graphics.draws == [(textured, 5, 1, 0), (colour, None, 2, 1), (textured, 3, 1, 3), (textured, 5, 1, 4)]
+    assert batch.num_draws == 4 and batch.num_sprites == 0
+
+
+def test_sort_groups_by_state(monkeypatch):
+    graphics, batch = create_batch(monkeypatch, sort=True)
+    add_sprites(batch)
+    batch.flush()
+    assert [(program, texture_id, count) for program, texture_id, count, _ in graphics.draws] == [
+        (Shader.SPRITE_COLOUR.value, None, 2), (Shader.SPRITE_TEXTURE.value, 3, 1), (Shader.SPRITE_TEXTURE.value, 5, 2)]
+
+
+def test_numpy_texture_id(monkeypatch):
+    # PyOpenGL returns texture ids as numpy.uint32 rather than int
+    graphics, batch = create_batch(monkeypatch, sort=False)
+    batch.add(Shader.SPRITE_TEXTURE, np.uint32(7), Coord2d(), Coord2d(1.0, 1.0), [1.0] * 4)
+    batch.flush()
+    assert graphics.draws == [(Shader.SPRITE_TEXTURE.value, 7, 1, 0)]
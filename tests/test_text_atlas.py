@@ -0,0 +1,45 @@
+import numpy as np
+
+from gamejam.coord import Coord2d
+from gamejam.graphics import Graphics, Shader
+from gamejam.gui import Gui
+from gamejam.gui_widget import GuiWidget
+from gamejam.settings import GameSettings
+from gamejam.texture import SpriteBatch, TextureAtlas
+
+
+def test_atlas_draws_keep_submission_order(gl):
+    graphics = Graphics(1.0)
+    atlas = TextureAtlas(graphics)
+    atlas.loaded = True
+    atlas.add_image(np.full((4, 4, 4), 255, dtype=np.uint8), "item")
+    batch = SpriteBatch.get(graphics)
+
+    batch.add(Shader.SPRITE_COLOUR, 0, Coord2d(), Coord2d(1.0, 1.0), [1.0] * 4)
+    atlas.draw("item", Coord2d(), Coord2d(0.1, 0.1), [1.0] * 4)
+    atlas.draw(None, Coord2d(), Coord2d(0.1, 0.1), [1.0] * 4)
+    batch.add(Shader.SPRITE_COLOUR, 0, Coord2d(), Coord2d(1.0, 1.0), [1.0] * 4)
+    graphics.flush_batch()
+    assert gl.draws() == ["glDrawElementsInstancedBaseInstance", "glDrawElementsInstanced", "glDrawElementsInstancedBaseInstance"]
+    assert gl.called("glDrawElementsInstanced")[0][4] == 2
+
+    atlas.draw("item", Coord2d(), Coord2d(0.1, 0.1), [1.0] * 4)
+    atlas.draw_final()
+    assert len(gl.called("glDrawElementsInstanced")) == 2 and atlas.texture_draw_count == 0
+
+
+class FakeTextures:
+    def __init__(self):
+        self.atlas = object()
+        self.atlases = {}
+
+
+def test_text_atlas_reaches_nested_widgets(gl, monkeypatch):
+    monkeypatch.setattr(GameSettings, "GUI_TEXT_IN_ATLAS", True)
+    textures = FakeTextures()
+    gui = Gui("text_atlas", Graphics(1.0), None, False, textures)
+    parent, child, grandchild = GuiWidget("parent"), GuiWidget("child"), GuiWidget("grandchild")
+    parent.add_child(child)
+    gui.add_child(parent)
+    child.add_child(grandchild)
+    assert all(w.text_atlas is textures.atlas for w in [parent, child, grandchild])
@@ -0,0 +1,58 @@
+from OpenGL.GL import GL_STATIC_DRAW
+
+from gamejam.coord import Coord2d
+from gamejam.font import TextMesh
+from gamejam.graphics import Shader
+from gamejam.texture import SpriteBatch
+
+
+def num_uploads(gl) -> int:
+    return len([args for args in gl.called("glBufferData") if args[-1] == GL_STATIC_DRAW])
+
+
+def test_colour_and_position_do_not_rebuild(gl, font):
+    mesh = TextMesh(font)
+    mesh.set_text("Label", 12)
+    uploads = num_uploads(gl)
+    mesh.draw(Coord2d(0.1, 0.1), [1.0, 0.0, 0.0, 1.0])
+    mesh.set_text("Label", 12)
+    mesh.draw(Coord2d(0.2, 0.2), [0.0, 1.0, 0.0, 1.0])
+    font.graphics.flush_batch()
+    assert num_uploads(gl) == uploads
+    assert gl.called("glUniform4f")[-2:] == [(font.tint_id, 1.0, 0.0, 0.0, 1.0), (font.tint_id, 0.0, 1.0, 0.0, 1.0)]
+
+    mesh.set_text("Other label", 12)
+    assert num_uploads(gl) == uploads + 1
+
+
+def test_labels_batch_with_text(gl, font):
+    graphics = font.graphics
+    batch = SpriteBatch.get(graphics)
+    meshes = [TextMesh(font) for _ in range(3)]
+    for i, mesh in enumerate(meshes):
+        mesh.set_text(f"Label {i}", 12)
+
+    batch.add(Shader.SPRITE_COLOUR, 0, Coord2d(), Coord2d(1.0, 1.0), [1.0] * 4)
+    meshes[0].draw(Coord2d(), [1.0] * 4)
+    font.draw("batched", 12, Coord2d(), [1.0] * 4)
+    meshes[1].draw(Coord2d(), [1.0] * 4)
+    meshes[2].draw(Coord2d(), [1.0] * 4)
+    graphics.flush_batch()
+    # One flush of the sprites, then the labels and batched glyphs in the order they were drawn
+    assert gl.draws() == ["glDrawElementsInstancedBaseInstance", "glDrawElementsInstanced",
+                          "glDrawElementsInstancedBaseInstance", "glDrawElementsInstanced", "glDrawElementsInstanced"]
+
+
+def test_release_frees_buffer_and_vertex_array(gl, font):
+    mesh = TextMesh(font)
+    mesh.set_text("Label", 12)
+    mesh.draw(Coord2d(), [1.0] * 4)
+    vbo = mesh.instance_vbo
+    assert (mesh.program, vbo) in font.graphics._quad_vaos
+
+    mesh.release()
+    assert (mesh.program, vbo) not in font.graphics._quad_vaos
+    assert gl.called("glDeleteBuffers") == [(1, [vbo])]
+    assert len(gl.called("glDeleteVertexArrays")) == 1
+    # The queued draw went out before the buffer was deleted
+    assert gl.draws()[-1] == "glDrawElementsInstanced"
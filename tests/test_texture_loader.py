@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+
+from gamejam.texture_loader import TextureLoader
+
+
+class FakeTexture:
+    """Stands in for a Texture, decoding to a blank image of a fixed size."""
+    def __init__(self, size: int, path: str=""):
+        self.size = size
+        self.path = path
+        self.uploaded = None
+
+    def decode(self) -> np.ndarray:
+        if self.path == "missing":
+            raise OSError("cannot open")
+        return np.zeros((self.size, self.size, 4), dtype=np.uint8)
+
+    def upload(self, img_data: np.ndarray):
+        self.uploaded = img_data.shape
+
+
+def test_upload_budget_spreads_uploads():
+    loader = TextureLoader(workers=2, budget_bytes=64 * 64 * 4)
+    textures = [FakeTexture(64) for _ in range(4)]
+    futures = [loader.load(t) for t in textures]
+    for future in futures:
+        loader.wait(future)
+    assert all(t.uploaded == (64, 64, 4) for t in textures)
+    assert [f.result() for f in futures] == textures
+
+    textures = [FakeTexture(64) for _ in range(4)]
+    futures = [loader.load(t) for t in textures]
+    for pending in loader._pending:
+        pending.decoded.result()
+    assert loader.update() == 1
+    assert loader.num_pending == 3
+    assert textures[0].uploaded is not None and textures[1].uploaded is None
+    while loader.num_pending > 0:
+        loader.update()
+    assert all(f.done() for f in futures)
+
+
+def test_failed_decode_sets_exception():
+    loader = TextureLoader(workers=1)
+    future = loader.load(FakeTexture(8, "missing"))
+    with pytest.raises(OSError):
+        loader.wait(future)
+    assert loader.num_pending == 0
@@ -0,0 +1,30 @@
+import numpy as np
+from PIL import Image
+
+from gamejam.graphics import Graphics
+from gamejam.settings import GameSettings
+from gamejam.texture import TextureManager
+
+
+def write_png(path, colour: list):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    Image.fromarray(np.full((8, 8, 4), colour, dtype=np.uint8), "RGBA").save(path)
+
+
+def test_pages_allocate_on_first_acquire(gl, monkeypatch, tmp_path):
+    monkeypatch.setattr(GameSettings, "DEV_MODE", False)
+    write_png(tmp_path / "root.png", [255, 0, 0, 255])
+    write_png(tmp_path / "menu" / "button.png", [0, 255, 0, 255])
+    write_png(tmp_path / "level" / "tile.png", [0, 0, 255, 255])
+    graphics = Graphics(1.0)
+    programs = len(gl.called("compileProgram"))
+
+    textures = TextureManager(tmp_path, graphics, use_cache=False)
+    assert len(gl.called("compileProgram")) == programs
+    assert [page for page, atlas in textures.atlases.items() if atlas.texture_id is not None] == [""]
+    assert textures.atlases["menu"].img_data is None
+
+    textures.acquire_page("menu")
+    assert textures.atlases["menu"].loaded and textures.atlases["menu"].texture_id is not None
+    assert textures.atlases["level"].texture_id is None
+    assert "menu/button.png" in textures.atlases["menu"].texture_items
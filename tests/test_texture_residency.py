@@ -0,0 +1,56 @@
+from gamejam.texture_residency import TextureResidency
+
+
+class FakeTexture:
+    """Stands in for a Texture, reloading through the residency when used after eviction."""
+    def __init__(self, residency: TextureResidency, num_bytes: int):
+        self.residency = residency
+        self.num_bytes = num_bytes
+        self.loaded = False
+        self.load()
+
+    def load(self):
+        self.loaded = True
+        self.residency.add(self)
+
+    def use(self):
+        if not self.loaded:
+            self.load()
+        else:
+            self.residency.touch(self)
+
+    def unload(self):
+        self.loaded = False
+
+
+def test_evicts_least_recently_used():
+    residency = TextureResidency(300)
+    a, b, c = [FakeTexture(residency, 100) for _ in range(3)]
+    residency.end_frame()
+    a.use()
+    residency.end_frame()
+
+    d = FakeTexture(residency, 100)
+    assert not b.loaded
+    assert a.loaded and c.loaded and d.loaded
+    assert residency.resident_bytes == 300
+
+    b.use()
+    assert b.loaded and not c.loaded
+    stats = residency.stats()
+    assert stats.misses == 5
+    assert stats.hits == 1
+    assert stats.evictions == 2
+    assert stats.num_resident == 3
+
+
+def test_keeps_textures_used_this_frame():
+    residency = TextureResidency(100)
+    a = FakeTexture(residency, 100)
+    b = FakeTexture(residency, 100)
+    assert a.loaded and b.loaded
+    assert residency.resident_bytes == 200
+
+    residency.end_frame()
+    assert not a.loaded and b.loaded
+    assert residency.resident_bytes == 100